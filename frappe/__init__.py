@@ -492,13 +492,16 @@ whitelisted = []
 guest_methods = []
 xss_safe_methods = []
 allowed_http_methods_for_whitelisted_func = {}
+rate_limited_methods = {}
 
-def whitelist(allow_guest=False, xss_safe=False, methods=None):
+def whitelist(allow_guest=False, xss_safe=False, methods=None, rate_limit=None):
 	"""
 	Decorator for whitelisting a function and making it accessible via HTTP.
 	Standard request will be `/api/method/[path.to.method]`
 
 	:param allow_guest: Allow non logged-in user to access this method.
+	:param rate_limit: Limit the number of calls, e.g. `{"limit": 5, "window": 60, "key": "ip"}`.
+		`key` is "user" (default), "ip", "api_key" or "endpoint" (all calls), see `frappe.rate_limiter`.
 
 	Use as:
 
@@ -516,6 +519,9 @@ def whitelist(allow_guest=False, xss_safe=False, methods=None):
 
 		allowed_http_methods_for_whitelisted_func[fn] = methods
 
+		if rate_limit:
+			rate_limited_methods[fn] = rate_limit
+
 		if allow_guest:
 			guest_methods.append(fn)
 
@@ -583,7 +589,6 @@ def clear_cache(user=None, doctype=None):
 	import frappe.cache_manager
 	if doctype:
 		frappe.cache_manager.clear_doctype_cache(doctype)
-		reset_metadata_version()
 	elif user:
 		frappe.cache_manager.clear_user_cache(user)
 	else: # everything
@@ -591,7 +596,6 @@ def clear_cache(user=None, doctype=None):
 		frappe.cache_manager.clear_user_cache()
 		frappe.cache_manager.clear_domain_cache()
 		translate.clear_cache()
-		reset_metadata_version()
 		local.cache = {}
 		local.new_doc_templates = {}
 
@@ -701,19 +705,39 @@ def set_value(doctype, docname, fieldname, value=None):
 	return frappe.client.set_value(doctype, docname, fieldname, value)
 
 def get_cached_doc(*args, **kwargs):
+	"""Return a cached `Document` of the given type and name. The document is looked
+	up in the request, then the worker process, then Redis before the database.
+
+	The worker process keeps the document as a dict, shared by its requests, and
+	each request gets its own `Document`."""
 	if args and len(args) > 1 and isinstance(args[1], text_type):
+		from frappe.utils.process_cache import get_process_cache
+
 		key = get_document_cache_key(args[0], args[1])
 		# local cache
 		doc = local.document_cache.get(key)
 		if doc:
 			return doc
 
-		# redis cache
-		doc = cache().hget('document_cache', key)
-		if doc:
-			doc = get_doc(doc)
-			local.document_cache[key] = doc
-			return doc
+		# process cache
+		process_cache = get_process_cache('document_cache')
+		doc_dict = process_cache.get(key)
+
+		if not doc_dict:
+			# redis cache
+			doc_dict = cache().hget('document_cache', key)
+
+		if doc_dict:
+			doc = get_doc(doc_dict)
+		else:
+			# database
+			doc = get_doc(*args, **kwargs)
+			doc_dict = doc.as_dict()
+			cache().hset('document_cache', key, doc_dict)
+
+		local.document_cache[key] = doc
+		process_cache.set(key, doc_dict)
+		return doc
 
 	# database
 	doc = get_doc(*args, **kwargs)
@@ -724,11 +748,14 @@ def get_document_cache_key(doctype, name):
 	return '{0}::{1}'.format(doctype, name)
 
 def clear_document_cache(doctype, name):
+	from frappe.utils.process_cache import invalidate
+
 	cache().hdel("last_modified", doctype)
 	key = get_document_cache_key(doctype, name)
 	if key in local.document_cache:
 		del local.document_cache[key]
 	cache().hdel('document_cache', key)
+	invalidate('document_cache', key)
 
 def get_cached_value(doctype, name, fieldname, as_dict=False):
 	doc = get_cached_doc(doctype, name)
@@ -761,14 +788,42 @@ def get_doc(*args, **kwargs):
 	import frappe.model.document
 	doc = frappe.model.document.get_doc(*args, **kwargs)
 
-	# set in cache
+	# set in request cache, redis and process caches are only filled by `get_cached_doc`
 	if args and len(args) > 1:
 		key = get_document_cache_key(args[0], args[1])
 		local.document_cache[key] = doc
-		cache().hset('document_cache', key, doc.as_dict())
 
 	return doc
 
+def get_docs(doctype, names):
+	"""Return `frappe.model.document.Document` objects of the given type and names.
+	Loads the documents with one query for the parents and one per child table,
+	instead of calling `get_doc` for each name.
+
+	:param doctype: DocType name.
+	:param names: List of document names.
+
+	Example:
+
+		for invoice in frappe.get_docs("Sales Invoice", names):
+			invoice.repost()
+	"""
+	import frappe.model.document
+	docs = frappe.model.document.get_docs(doctype, names)
+
+	for doc in docs:
+		local.document_cache[get_document_cache_key(doctype, doc.name)] = doc
+
+	return docs
+
+def insert_many(docs, **kwargs):
+	"""Insert a list of new documents using multi-row INSERTs.
+	Calls `frappe.model.document.bulk_insert`.
+
+	:param docs: list of documents or document dicts."""
+	import frappe.model.document
+	return frappe.model.document.bulk_insert(docs, **kwargs)
+
 def get_last_doc(doctype):
 	"""Get last created document of this type."""
 	d = get_all(doctype, ["name"], order_by="creation desc", limit_page_length=1)
@@ -1316,12 +1371,19 @@ def get_all(doctype, *args, **kwargs):
 	:param order_by: Order By e.g. `modified desc`.
 	:param limit_start: Start results at record #. Default 0.
 	:param limit_page_length: No of records in the page. Default 20.
+	:param as_iterator: Return a generator that reads the rows from the database as they are
+		consumed, see `frappe.db.sql_iter`. On MariaDB, rows are read in memory at once if
+		the current transaction has uncommitted writes.
 
 	Example usage:
 
 		# simple dict filter
 		frappe.get_all("ToDo", fields=["name", "description"], filters = {"owner":"test@example.com"})
 
+		# iterate over a large table
+		for todo in frappe.get_all("ToDo", fields=["name", "description"], as_iterator=True):
+			...
+
 		# filter as a list of lists
 		frappe.get_all("ToDo", fields=["*"], filters = [["modified", ">", "2014-01-01"]])
 
@@ -12,6 +12,7 @@ from six.moves.urllib.parse import urlencode, urlparse
 import frappe
 import frappe.client
 import frappe.handler
+import frappe.rate_limiter
 from frappe import _
 from frappe.utils.response import build_response
 
@@ -235,3 +236,5 @@ def validate_api_key_secret(api_key, api_secret):
 	if api_secret == user_secret:
 		frappe.set_user(user)
 		frappe.local.form_dict = form_dict
+		frappe.local.api_key = api_key
+		frappe.rate_limiter.apply_for_api_key()
@@ -131,8 +131,7 @@ def process_response(response):
 		frappe.local.cookie_manager.flush_cookies(response=response)
 
 	# rate limiter headers
-	if hasattr(frappe.local, 'rate_limiter'):
-		response.headers.extend(frappe.local.rate_limiter.headers())
+	response.headers.extend(frappe.rate_limiter.headers())
 
 	# CORS headers
 	if hasattr(frappe.local, 'conf') and frappe.conf.allow_cors:
@@ -9,6 +9,11 @@ from six import iteritems, text_type
 bootstrap client session
 """
 
+import copy
+import json
+import hashlib
+from collections import OrderedDict
+
 import frappe
 import frappe.defaults
 import frappe.desk.desk_page
@@ -20,71 +25,219 @@ from frappe.social.doctype.energy_point_settings.energy_point_settings import is
 from frappe.social.doctype.energy_point_log.energy_point_log import get_energy_points
 from frappe.social.doctype.post.post import frequently_visited_links
 
-def get_bootinfo():
+# Boot info is built from sections that are cached separately. "site" sections
+# are shared by all users and "user" sections are cached per user. A section is
+# cleared when a document of one of its `doctypes` is changed, or explicitly with
+# `clear_boot_section`. Each cached section carries the hash of its content, so
+# clients can fetch only the sections that changed (`frappe.sessions.get_boot_sections`).
+boot_sections = (
+	frappe._dict(name="user", scope="user", doctypes=("System Settings",)),
+	frappe._dict(name="translations", scope="user", doctypes=("Translation", "Language")),
+	frappe._dict(name="desk", scope="user", doctypes=("Page", "Print Settings", "Print Style")),
+	frappe._dict(name="pages", scope="user", doctypes=("Page", "Report", "Custom Role")),
+	frappe._dict(name="site", scope="site", doctypes=("Letter Head", "Domain", "DocType",
+		"Success Action")),
+	frappe._dict(name="user_info", scope="site", doctypes=("User",), skip_for_guest=True),
+	frappe._dict(name="activity", scope="user", doctypes=("Email Account", "User Email",
+		"Energy Point Settings")),
+	# values changed by `boot_session` hooks, rebuilt with any other section
+	frappe._dict(name="boot_session", scope="user", doctypes=(), depends_on_all=True),
+)
+
+def get_bootinfo(use_cache=True):
 	"""build and return boot info"""
-	frappe.set_user_lang(frappe.session.user)
-	bootinfo = frappe._dict()
-	hooks = frappe.get_hooks()
-	doclist = []
+	bootinfo, sections, rebuilt = load_boot_sections(use_cache)
 
-	# user
-	get_user(bootinfo)
+	bootinfo.boot_hashes = {name: entry["hash"] for name, entry in iteritems(sections)}
+	if not rebuilt:
+		bootinfo.from_cache = 1
 
-	# system info
+	if "user" not in rebuilt:
+		bootinfo.user["recent"] = json.dumps(frappe.cache().hget("user_recent", frappe.session.user))
+
+	# not cached
 	bootinfo.sitename = frappe.local.site
-	bootinfo.sysdefaults = frappe.defaults.get_defaults()
 	bootinfo.server_date = frappe.utils.nowdate()
 
 	if frappe.session['user'] != 'Guest':
-		bootinfo.user_info = get_fullnames()
 		bootinfo.sid = frappe.session['sid']
 
-	bootinfo.modules = {}
-	bootinfo.module_list = []
-	load_desktop_icons(bootinfo)
-	bootinfo.letter_heads = get_letter_heads()
-	bootinfo.active_domains = frappe.get_active_domains()
-	bootinfo.all_domains = [d.get("name") for d in frappe.get_all("Domain")]
-
-	bootinfo.module_app = frappe.local.module_app
-	bootinfo.single_types = [d.name for d in frappe.get_all('DocType', {'issingle': 1})]
-	bootinfo.nested_set_doctypes = [d.parent for d in frappe.get_all('DocField', {'fieldname': 'lft'}, ['parent'])]
-	add_home_page(bootinfo, doclist)
-	bootinfo.page_info = get_allowed_pages()
-	load_translations(bootinfo)
-	add_timezone_info(bootinfo)
-	load_conf_settings(bootinfo)
-	load_print(bootinfo, doclist)
-	doclist.extend(get_meta_bundle("Page"))
-	bootinfo.home_folder = frappe.db.get_value("File", {"is_home_folder": 1})
-
-	# ipinfo
 	if frappe.session.data.get('ipinfo'):
 		bootinfo.ipinfo = frappe.session['data']['ipinfo']
 
-	# add docs
-	bootinfo.docs = doclist
-
-	for method in hooks.boot_session or []:
-		frappe.get_attr(method)(bootinfo)
-
 	if bootinfo.lang:
 		bootinfo.lang = text_type(bootinfo.lang)
-	bootinfo.versions = {k: v['version'] for k, v in get_versions().items()}
-
-	bootinfo.error_report_email = frappe.conf.error_report_email
-	bootinfo.calendars = sorted(frappe.get_hooks("calendars"))
-	bootinfo.treeviews = frappe.get_hooks("treeviews") or []
-	bootinfo.lang_dict = get_lang_dict()
-	bootinfo.success_action = get_success_action()
-	bootinfo.update(get_email_accounts(user=frappe.session.user))
-	bootinfo.energy_points_enabled = is_energy_point_enabled()
-	bootinfo.points = get_energy_points(frappe.session.user)
-	bootinfo.frequently_visited_links = frequently_visited_links()
-	bootinfo.link_preview_doctypes = get_link_preview_doctypes()
 
 	return bootinfo
 
+def load_boot_sections(use_cache=True):
+	"""Returns `(bootinfo, sections, rebuilt)`: boot info made of all sections, the
+	cache entries of the sections (`{"hash": ..., "data": ...}` by name) and the names
+	of sections that were not cached"""
+	bootinfo = frappe._dict()
+	sections = OrderedDict()
+	rebuilt = []
+
+	with frappe.cache().pipeline_writes():
+		prefetch_cached_values()
+		frappe.set_user_lang(frappe.session.user)
+
+		for section in boot_sections:
+			if section.skip_for_guest and frappe.session.user == "Guest":
+				continue
+
+			entry = use_cache and not (section.depends_on_all and rebuilt) and get_cached_section(section)
+			if not entry:
+				# sections can use values of the sections built before them
+				data = section_builders[section.name](bootinfo)
+				entry = {"hash": get_content_hash(data), "data": data}
+				frappe.cache().hset(get_section_key(section.name), get_section_cache_field(section), entry)
+				rebuilt.append(section.name)
+
+			bootinfo.update(entry["data"])
+			sections[section.name] = entry
+
+	return bootinfo, sections, rebuilt
+
+def prefetch_cached_values():
+	"""load cached values used while building boot info in as few round trips as possible"""
+	user = frappe.session.user
+	cache = frappe.cache()
+
+	cache.get_values(("app_hooks", "all_apps", "is_table", "active_domains", "active_modules",
+		"metadata_version", "languages"))
+	cache.hget_many("defaults", (user, "__default", "__global"))
+
+def get_cached_section(section):
+	return frappe.cache().hget(get_section_key(section.name), get_section_cache_field(section))
+
+def get_section_key(name):
+	return "bootinfo:" + name
+
+def get_section_cache_field(section):
+	return frappe.session.user if section.scope == "user" else "__site"
+
+def get_content_hash(data):
+	return hashlib.md5(frappe.safe_encode(frappe.as_json(data))).hexdigest() #nosec
+
+def get_user_section(bootinfo):
+	section = frappe._dict(modules={}, module_list=[])
+	get_user(section)
+	section.sysdefaults = frappe.defaults.get_defaults()
+	load_desktop_icons(section)
+	add_timezone_info(section)
+	return section
+
+def get_translations_section(bootinfo):
+	section = frappe._dict(user=bootinfo.user)
+	load_translations(section)
+	del section["user"]
+	section.lang_dict = get_lang_dict()
+	return section
+
+def get_desk_section(bootinfo):
+	section = frappe._dict()
+	doclist = []
+	add_home_page(section, doclist)
+	load_print(section, doclist)
+	doclist.extend(get_meta_bundle("Page"))
+	section.docs = doclist
+	return section
+
+def get_pages_section(bootinfo):
+	return {"page_info": get_allowed_pages()}
+
+def get_site_section(bootinfo):
+	section = frappe._dict()
+	section.letter_heads = get_letter_heads()
+	section.active_domains = frappe.get_active_domains()
+	section.all_domains = [d.get("name") for d in frappe.get_all("Domain")]
+	section.module_app = frappe.local.module_app
+	section.single_types = [d.name for d in frappe.get_all('DocType', {'issingle': 1})]
+	section.nested_set_doctypes = [d.parent for d in frappe.get_all('DocField', {'fieldname': 'lft'}, ['parent'])]
+	section.home_folder = frappe.db.get_value("File", {"is_home_folder": 1})
+	load_conf_settings(section)
+	section.versions = {k: v['version'] for k, v in get_versions().items()}
+	section.error_report_email = frappe.conf.error_report_email
+	section.calendars = sorted(frappe.get_hooks("calendars"))
+	section.treeviews = frappe.get_hooks("treeviews") or []
+	section.success_action = get_success_action()
+	section.link_preview_doctypes = get_link_preview_doctypes()
+	return section
+
+def get_user_info_section(bootinfo):
+	return {"user_info": get_fullnames()}
+
+def get_activity_section(bootinfo):
+	section = frappe._dict(get_email_accounts(user=frappe.session.user))
+	section.energy_points_enabled = is_energy_point_enabled()
+	section.points = get_energy_points(frappe.session.user)
+	section.frequently_visited_links = frequently_visited_links()
+	return section
+
+def get_boot_session_section(bootinfo):
+	"""Returns the values changed or added by `boot_session` hooks"""
+	extended = frappe._dict(copy.deepcopy(bootinfo))
+	for method in frappe.get_hooks("boot_session"):
+		frappe.get_attr(method)(extended)
+
+	return {key: value for key, value in iteritems(extended)
+		if key not in bootinfo or bootinfo[key] != value}
+
+section_builders = {
+	"user": get_user_section,
+	"translations": get_translations_section,
+	"desk": get_desk_section,
+	"pages": get_pages_section,
+	"site": get_site_section,
+	"user_info": get_user_info_section,
+	"activity": get_activity_section,
+	"boot_session": get_boot_session_section
+}
+
+def clear_boot_section(name, user=None):
+	"""Clear cached boot info section `name` of `user` (or of all users), along with
+	the sections that depend on all others"""
+	names = [name] + [section.name for section in boot_sections
+		if section.depends_on_all and section.name != name]
+
+	for name in names:
+		if user:
+			frappe.cache().hdel(get_section_key(name), user)
+		else:
+			frappe.cache().delete_value(get_section_key(name))
+
+def clear_boot_cache(user=None):
+	"""Clear cached boot info sections of `user`, or all sections"""
+	for section in boot_sections:
+		if not user:
+			clear_boot_section(section.name)
+		elif section.scope == "user":
+			clear_boot_section(section.name, user)
+
+def clear_boot_sections_for_doc(doc, method=None, *args, **kwargs):
+	"""Clear the boot info sections that depend on the doctype of `doc` (doc event)"""
+	names = sections_by_doctype.get(doc.doctype)
+	if not names:
+		return
+
+	for name in names:
+		clear_boot_section(name)
+
+	if not (frappe.flags.in_install or frappe.flags.in_migrate or frappe.flags.in_patch
+		or frappe.flags.in_import or frappe.flags.in_test):
+		# open desks fetch the changed sections
+		frappe.publish_realtime("boot_sections_changed", names, after_commit=True)
+
+def get_sections_by_doctype():
+	out = {}
+	for section in boot_sections:
+		for doctype in section.doctypes:
+			out.setdefault(doctype, []).append(section.name)
+	return out
+
+sections_by_doctype = get_sections_by_doctype()
+
 def get_letter_heads():
 	letter_heads = {}
 	for letter_head in frappe.get_all("Letter Head", fields = ["name", "content", "footer"]):
@@ -14,7 +14,8 @@ global_cache_keys = ("app_hooks", "installed_apps",
 		"app_modules", "module_app", "system_settings",
 		'scheduler_events', 'time_zone', 'webhooks', 'active_domains',
 		'active_modules', 'assignment_rule', 'server_script_map', 'wkhtmltopdf_version',
-		'domain_restricted_doctypes', 'domain_restricted_pages', 'information_schema:counts')
+		'domain_restricted_doctypes', 'domain_restricted_pages', 'information_schema:counts',
+		'report_cache_doctypes')
 
 user_cache_keys = ("bootinfo", "user_recent", "roles", "user_doc", "lang",
 		"defaults", "user_permissions", "home_page", "linked_with",
@@ -42,6 +43,10 @@ def clear_user_cache(user=None):
 		clear_defaults_cache()
 		clear_global_cache()
 
+	# boot info sections shared by all users are kept when clearing the cache of a user
+	from frappe.boot import clear_boot_cache
+	clear_boot_cache(user)
+
 def clear_domain_cache(user=None):
 	cache = frappe.cache()
 	domain_cache_keys = ('domain_restricted_doctypes', 'domain_restricted_pages')
@@ -63,8 +68,11 @@ def clear_defaults_cache(user=None):
 		frappe.cache().delete_key("defaults")
 
 def clear_document_cache():
+	from frappe.utils.process_cache import invalidate
+
 	frappe.local.document_cache = {}
 	frappe.cache().delete_key("document_cache")
+	invalidate("document_cache")
 
 def clear_doctype_cache(doctype=None):
 	cache = frappe.cache()
@@ -99,6 +107,9 @@ def clear_doctype_cache(doctype=None):
 	# Clear all document's cache. To clear documents of a specific DocType document_cache should be restructured
 	clear_document_cache()
 
+	# invalidates meta cached in worker processes
+	frappe.reset_metadata_version()
+
 def get_doctype_map(doctype, name, filters, order_by=None):
 	cache = frappe.cache()
 	cache_key = frappe.scrub(doctype) + '_map'
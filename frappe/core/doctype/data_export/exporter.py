@@ -8,6 +8,8 @@ from frappe import _
 import frappe.permissions
 import re, csv, os
 from frappe.utils.csvutils import UnicodeWriter
+from frappe.utils.file_export import (write_export_file, build_file_response,
+	open_csv_file, get_temp_file_path)
 from frappe.utils import cstr, formatdate, format_datetime, parse_json, cint
 from frappe.core.doctype.data_import_legacy.importer import get_data_keys
 from six import string_types
@@ -75,7 +77,10 @@ class DataExporter:
 				self.child_doctypes.append(dict(doctype=df.options, parentfield=df.fieldname))
 
 	def build_response(self):
-		self.writer = UnicodeWriter()
+		# rows are written to a temporary file as they are read
+		self.csv_path = get_temp_file_path("CSV")
+		self.writer = UnicodeWriter(file=open_csv_file(self.csv_path))
+		self.has_data = False
 		self.name_field = 'parent' if self.parent_doctype != self.doctype else 'name'
 
 		if self.template:
@@ -100,17 +105,19 @@ class DataExporter:
 					self.build_field_columns(d['doctype'], d['parentfield'])
 
 		self.add_field_headings()
-		self.add_data()
-		if self.with_data and not self.data:
+		try:
+			self.add_data()
+		finally:
+			self.writer.queue.close()
+
+		if self.with_data and not self.has_data:
 			frappe.respond_as_web_page(_('No Data'), _('There is no data to be exported'), indicator_color='orange')
 
 		if self.file_type == 'Excel':
 			self.build_response_as_excel()
 		else:
-			# write out response as a type csv
-			frappe.response['result'] = cstr(self.writer.getvalue())
-			frappe.response['type'] = 'csv'
-			frappe.response['doctype'] = self.doctype
+			# stream the csv file
+			build_file_response(self.csv_path, self.doctype + '.csv')
 
 	def add_main_header(self):
 		self.writer.writerow([_('Data Import Template')])
@@ -266,10 +273,8 @@ class DataExporter:
 		table_columns = frappe.db.get_table_columns(self.parent_doctype)
 		if 'lft' in table_columns and 'rgt' in table_columns:
 			order_by = '`tab{doctype}`.`lft` asc'.format(doctype=self.parent_doctype)
-		# get permitted data only
-		self.data = frappe.get_list(self.doctype, fields=["*"], filters=self.filters, limit_page_length=None, order_by=order_by)
-
-		for doc in self.data:
+		for doc in self.get_data(order_by):
+			self.has_data = True
 			op = self.docs_to_export.get("op")
 			names = self.docs_to_export.get("name")
 
@@ -308,6 +313,11 @@ class DataExporter:
 			for row in rows:
 				self.writer.writerow(row)
 
+	def get_data(self, order_by=None):
+		"""Yields the permitted records as they are read from the database"""
+		return frappe.get_list(self.doctype, fields=["*"], filters=self.filters,
+			limit_page_length=None, order_by=order_by, as_iterator=True)
+
 	def add_data_row(self, rows, dt, parentfield, doc, rowidx):
 		d = doc.copy()
 		meta = frappe.get_meta(dt)
@@ -334,22 +344,12 @@ class DataExporter:
 				row[_column_start_end.start + i + 1] = value
 
 	def build_response_as_excel(self):
-		filename = frappe.generate_hash("", 10)
-		with open(filename, 'wb') as f:
-			f.write(cstr(self.writer.getvalue()).encode('utf-8'))
-		f = open(filename)
-		reader = csv.reader(f)
-
-		from frappe.utils.xlsxutils import make_xlsx
-		xlsx_file = make_xlsx(reader, "Data Import Template" if self.template else 'Data Export')
-
-		f.close()
-		os.remove(filename)
-
-		# write out response as a xlsx type
-		frappe.response['filename'] = self.doctype + '.xlsx'
-		frappe.response['filecontent'] = xlsx_file.getvalue()
-		frappe.response['type'] = 'binary'
+		with open_csv_file(self.csv_path, "r") as f:
+			xlsx_path = write_export_file(csv.reader(f), "Excel",
+				"Data Import Template" if self.template else 'Data Export')
+		os.remove(self.csv_path)
+
+		build_file_response(xlsx_path, self.doctype + '.xlsx')
 
 	def _append_name_column(self, dt=None):
 		self.append_field_column(frappe._dict({
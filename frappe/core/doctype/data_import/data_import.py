@@ -10,6 +10,7 @@ from frappe.core.doctype.data_import.exporter import Exporter
 from frappe.core.doctype.data_import.importer import Importer
 from frappe.model.document import Document
 from frappe.modules.import_file import import_file_by_path
+from frappe.utils import cint
 from frappe.utils.background_jobs import enqueue
 from frappe.utils.csvutils import validate_google_sheets_url
 
@@ -113,7 +114,12 @@ def start_import(data_import):
 
 @frappe.whitelist()
 def download_template(
-	doctype, export_fields=None, export_records=None, export_filters=None, file_type="CSV"
+	doctype,
+	export_fields=None,
+	export_records=None,
+	export_filters=None,
+	file_type="CSV",
+	export_in_background=False,
 ):
 	"""
 	Download template from Exporter
@@ -122,12 +128,30 @@ def download_template(
 		:param export_records=None: One of 'all', 'by_filter', 'blank_template'
 		:param export_filters: Filter dict
 		:param file_type: File type to export into
+		:param export_in_background: Export in a background job and attach the file for the user
 	"""
 
 	export_fields = frappe.parse_json(export_fields)
 	export_filters = frappe.parse_json(export_filters)
 	export_data = export_records != "blank_template"
 
+	if cint(export_in_background):
+		frappe.permissions.can_export(doctype, raise_exception=True)
+		enqueue(
+			export_template_to_file,
+			queue="long",
+			doctype=doctype,
+			export_fields=export_fields,
+			export_data=export_data,
+			export_filters=export_filters,
+			file_type=file_type,
+			export_page_length=5 if export_records == "5_records" else None,
+		)
+		frappe.msgprint(
+			_("Export started, you will be notified with a link to the file once it is ready")
+		)
+		return
+
 	e = Exporter(
 		doctype,
 		export_fields=export_fields,
@@ -139,6 +163,10 @@ def download_template(
 	e.build_response()
 
 
+def export_template_to_file(doctype, **kwargs):
+	Exporter(doctype, **kwargs).attach_file()
+
+
 @frappe.whitelist()
 def download_errored_template(data_import_name):
 	data_import = frappe.get_doc("Data Import", data_import_name)
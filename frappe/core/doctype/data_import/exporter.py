@@ -2,17 +2,27 @@
 # Copyright (c) 2019, Frappe Technologies Pvt. Ltd. and Contributors
 # MIT License. See license.txt
 
+from collections import defaultdict
+
 import frappe
+from frappe.utils import cint
 from frappe.model import (
 	display_fieldtypes,
 	no_value_fields,
 	table_fields as table_fieldtypes,
 )
-from frappe.utils.csvutils import build_csv_response
-from frappe.utils.xlsxutils import build_xlsx_response
+from frappe.utils.file_export import (
+	write_export_file,
+	build_file_response,
+	attach_export_file,
+	get_export_filename,
+)
 
 
 class Exporter:
+	# number of parents fetched (along with their child rows) at a time
+	child_fetch_size = 1000
+
 	def __init__(
 		self,
 		doctype,
@@ -36,6 +46,7 @@ class Exporter:
 		self.export_filters = export_filters
 		self.export_page_length = export_page_length
 		self.file_type = file_type
+		self.export_data = export_data
 
 		# this will contain the csv content
 		self.csv_array = []
@@ -45,11 +56,8 @@ class Exporter:
 		self.fields = self.serialize_exportable_fields()
 		self.add_header()
 
-		if export_data:
-			self.data = self.get_data_to_export()
-		else:
-			self.data = []
-		self.add_data()
+		# data rows are loaded in `get_csv_array` or streamed to a file in `build_response`
+		self.data = None
 
 	def get_all_exportable_fields(self):
 		child_table_fields = [
@@ -114,8 +122,10 @@ class Exporter:
 		return fields or []
 
 	def get_data_to_export(self):
+		return list(self.iter_data_to_export())
+
+	def iter_data_to_export(self):
 		frappe.permissions.can_export(self.doctype, raise_exception=True)
-		data_to_export = []
 
 		table_fields = [f for f in self.exportable_fields if f != self.doctype]
 		data = self.get_data_as_docs()
@@ -132,9 +142,8 @@ class Exporter:
 						child_doctype = table_df.options
 						rows = self.add_data_row(child_doctype, child_row.parentfield, child_row, rows, i)
 
-			data_to_export += rows
-
-		return data_to_export
+			for row in rows:
+				yield row
 
 	def add_data_row(self, doctype, parentfield, doc, rows, row_idx):
 		if len(rows) < row_idx + 1:
@@ -151,6 +160,7 @@ class Exporter:
 		return rows
 
 	def get_data_as_docs(self):
+		"""Yields parents with their child rows, `child_fetch_size` parents at a time"""
 		def format_column_name(df):
 			return "`tab{0}`.`{1}`".format(df.parent, df.fieldname)
 
@@ -164,46 +174,69 @@ class Exporter:
 		parent_fields = [
 			format_column_name(df) for df in self.fields if df.parent == self.doctype
 		]
-		parent_data = frappe.db.get_list(
-			self.doctype,
-			filters=filters,
-			fields=["name"] + parent_fields,
-			limit_page_length=self.export_page_length,
-			order_by=order_by,
-			as_list=0,
-		)
-		parent_names = [p.name for p in parent_data]
 
-		child_data = {}
+		child_fields = {}
 		for key in self.exportable_fields:
 			if key == self.doctype:
 				continue
-			child_table_df = self.meta.get_field(key)
-			child_table_doctype = child_table_df.options
-			child_fields = ["name", "idx", "parent", "parentfield"] + list(
+			child_table_doctype = self.meta.get_field(key).options
+			child_fields[key] = ["name", "idx", "parent", "parentfield"] + list(
 				set(
 					[format_column_name(df) for df in self.fields if df.parent == child_table_doctype]
 				)
 			)
-			data = frappe.db.get_list(
-				child_table_doctype,
+
+		limit = cint(self.export_page_length)
+		start = 0
+		while not limit or start < limit:
+			page_length = min(self.child_fetch_size, limit - start) if limit else self.child_fetch_size
+			parent_data = frappe.db.get_list(
+				self.doctype,
+				filters=filters,
+				fields=["name"] + parent_fields,
+				limit_start=start,
+				limit_page_length=page_length,
+				order_by=order_by,
+				as_list=0,
+			)
+			if not parent_data:
+				break
+
+			child_data = self.get_child_data(child_fields, [p.name for p in parent_data])
+			for doc in self.merge_data(parent_data, child_data):
+				yield doc
+
+			if len(parent_data) < page_length:
+				break
+			start += page_length
+
+	def get_child_data(self, child_fields, parent_names):
+		child_data = {}
+		for key, fields in child_fields.items():
+			child_table_df = self.meta.get_field(key)
+			child_data[key] = frappe.db.get_list(
+				child_table_df.options,
 				filters={
 					"parent": ("in", parent_names),
 					"parentfield": child_table_df.fieldname,
 					"parenttype": self.doctype,
 				},
-				fields=child_fields,
+				fields=fields,
 				order_by="idx asc",
 				as_list=0,
 			)
-			child_data[key] = data
 
-		return self.merge_data(parent_data, child_data)
+		return child_data
 
 	def merge_data(self, parent_data, child_data):
-		for doc in parent_data:
-			for table_field, table_rows in child_data.items():
-				doc[table_field] = [row for row in table_rows if row.parent == doc.name]
+		for table_field, table_rows in child_data.items():
+			# group rows by parent in one pass, rows stay in idx order
+			rows_by_parent = defaultdict(list)
+			for row in table_rows:
+				rows_by_parent[row.parent].append(row)
+
+			for doc in parent_data:
+				doc[table_field] = rows_by_parent.get(doc.name, [])
 
 		return parent_data
 
@@ -233,10 +266,14 @@ class Exporter:
 		self.csv_array += self.data
 
 	def get_csv_array(self):
+		if self.data is None:
+			self.data = self.get_data_to_export() if self.export_data else []
+			self.add_data()
+
 		return self.csv_array
 
 	def get_csv_array_for_export(self):
-		csv_array = self.csv_array
+		csv_array = self.get_csv_array()
 
 		if not self.data:
 			# add 2 empty rows
@@ -244,14 +281,32 @@ class Exporter:
 
 		return csv_array
 
-	def build_response(self):
-		if self.file_type == "CSV":
-			self.build_csv_response()
-		elif self.file_type == "Excel":
-			self.build_xlsx_response()
+	def iter_rows_for_export(self):
+		"""Yields the header and data rows without holding all of them in memory"""
+		for row in self.csv_array:
+			yield row
 
-	def build_csv_response(self):
-		build_csv_response(self.get_csv_array_for_export(), self.doctype)
+		has_data = False
+		if self.export_data:
+			for row in self.iter_data_to_export():
+				has_data = True
+				yield row
+
+		if not has_data:
+			# add 2 empty rows
+			yield []
+			yield []
+
+	def write_file(self):
+		"""Writes the export to a temporary file and returns its path"""
+		return write_export_file(self.iter_rows_for_export(), self.file_type, self.doctype)
+
+	def get_filename(self):
+		return get_export_filename(self.doctype, self.file_type)
+
+	def build_response(self):
+		build_file_response(self.write_file(), self.get_filename())
 
-	def build_xlsx_response(self):
-		build_xlsx_response(self.get_csv_array_for_export(), self.doctype)
+	def attach_file(self):
+		"""Writes the export and attaches it as a private File, used for background exports"""
+		return attach_export_file(self.write_file(), self.get_filename())
@@ -4,6 +4,8 @@
 from __future__ import unicode_literals
 import os
 import io
+import math
+import time
 import frappe
 import timeit
 import json
@@ -17,16 +19,30 @@ from frappe.utils.xlsxutils import (
 )
 from frappe.model import no_value_fields, table_fields as table_fieldtypes
 from frappe.core.doctype.version.version import get_diff
+from frappe.model.base_document import get_link_key
+from six import iteritems
 
 INVALID_VALUES = ("", None)
 MAX_ROWS_IN_PREVIEW = 10
+# seconds between progress updates
+progress_interval = 0.5
+# seconds after which rows of chunks of a parallel import that did not report back
+# are logged as failed, see `fail_timed_out_imports`
+default_parallel_import_timeout = 6 * 60 * 60
+PARALLEL_IMPORTS_KEY = "data_import_parallel_imports"
 INSERT = "Insert New Records"
 UPDATE = "Update Existing Records"
 
 
 class Importer:
 	def __init__(
-		self, doctype, data_import=None, file_path=None, import_type=None, console=False
+		self,
+		doctype,
+		data_import=None,
+		file_path=None,
+		import_type=None,
+		console=False,
+		parse_file=True,
 	):
 		self.doctype = doctype
 		self.console = console
@@ -40,24 +56,21 @@ class Importer:
 		self.template_options = frappe.parse_json(self.data_import.template_options or "{}")
 		self.import_type = self.data_import.import_type
 
-		self.import_file = ImportFile(
-			doctype,
-			file_path or data_import.google_sheets_url or data_import.import_file,
-			self.template_options,
-			self.import_type,
-		)
+		# workers of a parallel import get their payloads from the job that parsed the file
+		self.import_file = None
+		if parse_file:
+			self.import_file = ImportFile(
+				doctype,
+				file_path or data_import.google_sheets_url or data_import.import_file,
+				self.template_options,
+				self.import_type,
+			)
 
 	def get_data_for_import_preview(self):
 		return self.import_file.get_data_for_import_preview()
 
 	def before_import(self):
-		# set user lang for translations
-		frappe.cache().hdel("lang", frappe.session.user)
-		frappe.set_user_lang(frappe.session.user)
-
-		# set flags
-		frappe.flags.in_import = True
-		frappe.flags.mute_emails = self.data_import.mute_emails
+		self.set_import_flags()
 
 		self.data_import.db_set("status", "Pending")
 		self.data_import.db_set("template_warnings", "")
@@ -95,78 +108,134 @@ class Importer:
 			if log.success:
 				imported_rows += log.row_indexes
 
+		imported_rows = set(imported_rows)
+
 		# start import
 		total_payload_count = len(payloads)
-		batch_size = frappe.conf.data_import_batch_size or 1000
-
-		for batch_index, batched_payloads in enumerate(
-			frappe.utils.create_batch(payloads, batch_size)
-		):
-			for i, payload in enumerate(batched_payloads):
-				doc = payload.doc
-				row_indexes = [row.row_number for row in payload.rows]
-				current_index = (i + 1) + (batch_index * batch_size)
-
-				if set(row_indexes).intersection(set(imported_rows)):
-					print("Skipping imported rows", row_indexes)
-					if total_payload_count > 5:
-						frappe.publish_realtime(
-							"data_import_progress",
-							{
-								"current": current_index,
-								"total": total_payload_count,
-								"skipping": True,
-								"data_import": self.data_import.name,
-							},
-						)
-					continue
+		batch_size = get_batch_size()
+		self.start_time = timeit.default_timer()
+		self.processed = 0
+
+		payloads_to_import = []
+		for i, payload in enumerate(payloads):
+			row_indexes = [row.row_number for row in payload.rows]
+			if imported_rows.intersection(row_indexes):
+				print("Skipping imported rows", row_indexes)
+				self.publish_progress(i + 1, total_payload_count, skipping=True)
+				continue
 
-				try:
-					start = timeit.default_timer()
-					doc = self.process_doc(doc)
-					processing_time = timeit.default_timer() - start
-					eta = self.get_eta(current_index, total_payload_count, processing_time)
-
-					if self.console:
-						update_progress_bar(
-							"Importing {0} records".format(total_payload_count),
-							current_index,
-							total_payload_count,
-						)
-					elif total_payload_count > 5:
-						frappe.publish_realtime(
-							"data_import_progress",
-							{
-								"current": current_index,
-								"total": total_payload_count,
-								"docname": doc.name,
-								"data_import": self.data_import.name,
-								"success": True,
-								"row_indexes": row_indexes,
-								"eta": eta,
-							},
-						)
-
-					import_log.append(
-						frappe._dict(success=True, docname=doc.name, row_indexes=row_indexes)
-					)
-					# commit after every successful import
-					frappe.db.commit()
-
-				except Exception:
-					import_log.append(
-						frappe._dict(
-							success=False,
-							exception=frappe.get_traceback(),
-							messages=frappe.local.message_log,
-							row_indexes=row_indexes,
-						)
-					)
-					frappe.clear_messages()
-					# rollback if exception
-					frappe.db.rollback()
+			payloads_to_import.append(
+				frappe._dict(doc=payload.doc, row_indexes=row_indexes, index=i + 1)
+			)
+
+		if self.can_import_in_parallel(len(payloads_to_import)):
+			self.enqueue_parallel_import(payloads_to_import, import_log, total_payload_count)
+			return
+
+		for batch in frappe.utils.create_batch(payloads_to_import, batch_size):
+			batch_log = self.import_batch(batch)
+			import_log += batch_log
+			self.publish_progress(batch[-1].index, total_payload_count, batch_log[-1])
+
+		self.set_import_status(import_log, total_payload_count)
+		self.after_import()
+
+		return import_log
+
+	def set_import_flags(self):
+		# set user lang for translations
+		frappe.cache().hdel("lang", frappe.session.user)
+		frappe.set_user_lang(frappe.session.user)
+
+		# set flags
+		frappe.flags.in_import = True
+		frappe.flags.mute_emails = self.data_import.mute_emails
+
+	def import_batch(self, payloads):
+		"""Imports the payloads and commits once for the whole batch. If any document fails,
+		the batch is rolled back and imported again one document at a time so that errors
+		are logged for the rows of the failed documents only.
+
+		Emails queued, jobs enqueued after commit and realtime events of the rolled back
+		documents are discarded along with them. Side effects that are not deferred until
+		commit (jobs enqueued right away, emails sent immediately, requests to other
+		services) have already happened and happen again when the documents are retried."""
+		log = []
+		try:
+			for payload in payloads:
+				doc = self.process_doc(payload.doc)
+				log.append(
+					frappe._dict(success=True, docname=doc.name, row_indexes=payload.row_indexes)
+				)
+			frappe.db.commit()
+		except Exception:
+			self.rollback()
+			log = [self.import_payload(payload) for payload in payloads]
+
+		self.processed += len(payloads)
+		return log
+
+	def import_payload(self, payload):
+		try:
+			doc = self.process_doc(payload.doc)
+			frappe.db.commit()
+			return frappe._dict(success=True, docname=doc.name, row_indexes=payload.row_indexes)
+
+		except Exception:
+			log = frappe._dict(
+				success=False,
+				exception=frappe.get_traceback(),
+				messages=frappe.local.message_log,
+				row_indexes=payload.row_indexes,
+			)
+			# rollback if exception
+			self.rollback()
+			return log
+
+	def rollback(self):
+		frappe.db.rollback()
+		frappe.clear_messages()
+		# of documents that were rolled back
+		frappe.flags.enqueue_after_commit = []
+		frappe.local.realtime_log = []
+
+	def publish_progress(self, current, total, log=None, skipping=False):
+		"""Shows progress on the console, or publishes it at most every `progress_interval`
+		seconds (and on completion)"""
+		if self.console:
+			if not skipping:
+				update_progress_bar("Importing {0} records".format(total), current, total)
+			return
+
+		if total <= 5:
+			return
+
+		now = timeit.default_timer()
+		if current != total and now - getattr(self, "last_progress", 0) < progress_interval:
+			return
+		self.last_progress = now
+
+		progress = {
+			"current": current,
+			"total": total,
+			"data_import": self.data_import.name,
+		}
+		if skipping:
+			progress["skipping"] = True
+		else:
+			time_per_doc = (now - self.start_time) / max(self.processed, 1)
+			progress.update(
+				{
+					"docname": log.get("docname"),
+					"success": True,
+					"row_indexes": log.row_indexes,
+					"eta": self.get_eta(current, total, time_per_doc),
+				}
+			)
+
+		frappe.publish_realtime("data_import_progress", progress)
 
-		# set status
+	def set_import_status(self, import_log, total_payload_count):
 		failures = [log for log in import_log if not log.get("success")]
 		if len(failures) == total_payload_count:
 			status = "Pending"
@@ -181,9 +250,59 @@ class Importer:
 			self.data_import.db_set("status", status)
 			self.data_import.db_set("import_log", json.dumps(import_log))
 
-		self.after_import()
-
-		return import_log
+	def can_import_in_parallel(self, count):
+		workers = cint(frappe.conf.data_import_workers)
+		if workers < 2 or self.console or frappe.flags.in_test or count <= get_batch_size():
+			return False
+
+		# documents may depend on other documents of the same import
+		return not has_links_to_self(self.doctype)
+
+	def enqueue_parallel_import(self, payloads, import_log, total_payload_count):
+		"""Splits the payloads into a chunk per worker and imports them in background jobs,
+		see `import_chunk`"""
+		from frappe.utils.background_jobs import enqueue
+
+		name = self.data_import.name
+		chunk_size = int(math.ceil(len(payloads) / float(cint(frappe.conf.data_import_workers))))
+		chunks = list(frappe.utils.create_batch(payloads, chunk_size))
+
+		timeout = get_parallel_import_timeout()
+		cache = frappe.cache()
+		cache.delete_value(get_parallel_import_keys(name))
+
+		# successfully imported rows of earlier attempts, and rows of each chunk as
+		# failed until the chunk reports back
+		cache.hset("data_import_chunk_log|" + name, "previous", import_log)
+		for chunk_index, chunk in enumerate(chunks):
+			cache.hset("data_import_chunk_log|" + name, str(chunk_index), get_timed_out_log(chunk))
+
+		# counters, keys are removed by redis if the import is never finished
+		for key in get_parallel_import_keys(name)[1:]:
+			cache.set(cache.make_key(key), 0)
+		for key in get_parallel_import_keys(name):
+			cache.expire(cache.make_key(key), 2 * timeout)
+
+		cache.hset(PARALLEL_IMPORTS_KEY, name, frappe._dict(
+			deadline=time.time() + timeout,
+			chunk_count=len(chunks),
+			total_payload_count=total_payload_count,
+		))
+
+		for chunk_index, chunk in enumerate(chunks):
+			enqueue(
+				import_chunk,
+				queue="long",
+				timeout=6000,
+				event="data_import",
+				job_name="{0}-{1}".format(name, chunk_index),
+				data_import=name,
+				chunk_index=chunk_index,
+				chunk_count=len(chunks),
+				payloads=chunk,
+				import_count=len(payloads),
+				total_payload_count=total_payload_count,
+			)
 
 	def after_import(self):
 		frappe.flags.in_import = False
@@ -308,6 +427,148 @@ class Importer:
 			print(w.get("message"))
 
 
+def import_chunk(
+	data_import, chunk_index, chunk_count, payloads, import_count, total_payload_count
+):
+	"""Background job: imports a chunk of a parallel import. The job that completes
+	the last chunk merges the logs of all chunks and sets the status of the import.
+	Chunks that do not report back are handled by `fail_timed_out_imports`."""
+	data_import = frappe.get_doc("Data Import", data_import)
+	importer = Importer(data_import.reference_doctype, data_import=data_import, parse_file=False)
+	importer.set_import_flags()
+	importer.start_time = timeit.default_timer()
+	importer.processed = 0
+
+	cache = frappe.cache()
+	name = data_import.name
+	log = []
+	try:
+		for batch in frappe.utils.create_batch(payloads, get_batch_size()):
+			batch_log = importer.import_batch(batch)
+			log += batch_log
+
+			# progress of all the workers
+			current = cache.incr(cache.make_key("data_import_progress|" + name), len(batch))
+			importer.processed = current
+			importer.publish_progress(current, import_count, batch_log[-1])
+	finally:
+		importer.after_import()
+
+		if not cache.hget(PARALLEL_IMPORTS_KEY, name):
+			# the import timed out and was finished without this chunk
+			add_late_chunk_log(importer, log)
+		else:
+			cache.hset("data_import_chunk_log|" + name, str(chunk_index), log)
+			if cache.incr(cache.make_key("data_import_chunks_done|" + name)) == chunk_count:
+				finish_parallel_import(importer, chunk_count, total_payload_count)
+
+
+def finish_parallel_import(importer, chunk_count, total_payload_count, timed_out=False):
+	name = importer.data_import.name
+	cache = frappe.cache()
+
+	logs = dict(
+		(frappe.safe_decode(key), log)
+		for key, log in cache.hgetall("data_import_chunk_log|" + name).items()
+	)
+	import_log = logs.get("previous") or []
+	for chunk_index in range(chunk_count):
+		import_log += logs.get(str(chunk_index)) or []
+
+	importer.set_import_status(import_log, total_payload_count)
+	if timed_out:
+		importer.data_import.db_set("status", "Error")
+		frappe.log_error(_("Chunks of the import did not complete in time, their rows are logged as failed"),
+			title=name)
+
+	frappe.db.commit()
+	cache.delete_value(get_parallel_import_keys(name))
+	cache.hdel(PARALLEL_IMPORTS_KEY, name)
+
+	frappe.publish_realtime("data_import_refresh", {"data_import": name})
+
+
+def fail_timed_out_imports():
+	"""Scheduled job: finishes parallel imports with chunks that did not report back before
+	the timeout (e.g. their jobs were killed), rows of these chunks are logged as failed"""
+	cache = frappe.cache()
+	for name, info in iteritems(cache.hgetall(PARALLEL_IMPORTS_KEY)):
+		name = frappe.safe_decode(name)
+		if info.deadline > time.time():
+			continue
+
+		if not frappe.db.exists("Data Import", name):
+			cache.delete_value(get_parallel_import_keys(name))
+			cache.hdel(PARALLEL_IMPORTS_KEY, name)
+			continue
+
+		data_import = frappe.get_doc("Data Import", name)
+		importer = Importer(data_import.reference_doctype, data_import=data_import, parse_file=False)
+		finish_parallel_import(importer, info.chunk_count, info.total_payload_count, timed_out=True)
+
+
+def add_late_chunk_log(importer, log):
+	"""Replaces the failures logged for rows of a chunk that reported back after its
+	import timed out"""
+	data_import = importer.data_import
+	data_import.reload()
+
+	row_indexes = set(row for entry in log for row in entry.row_indexes)
+	import_log = [frappe._dict(entry) for entry in frappe.parse_json(data_import.import_log or "[]")
+		if not row_indexes.intersection(entry.get("row_indexes") or [])]
+	import_log += log
+
+	importer.set_import_status(import_log, len(import_log))
+	frappe.db.commit()
+	frappe.publish_realtime("data_import_refresh", {"data_import": data_import.name})
+
+
+def get_timed_out_log(payloads):
+	return [
+		frappe._dict(
+			success=False,
+			exception=_("Import job did not complete in time"),
+			messages=[],
+			row_indexes=payload.row_indexes,
+		)
+		for payload in payloads
+	]
+
+
+def get_parallel_import_timeout():
+	return cint(frappe.conf.data_import_timeout) or default_parallel_import_timeout
+
+
+def get_parallel_import_keys(data_import):
+	return [
+		"data_import_chunk_log|" + data_import,
+		"data_import_chunks_done|" + data_import,
+		"data_import_progress|" + data_import,
+	]
+
+
+def get_batch_size():
+	"""Number of documents imported (and committed) together"""
+	return cint(frappe.conf.data_import_batch_size) or 1000
+
+
+def has_links_to_self(doctype):
+	meta = frappe.get_meta(doctype)
+	if meta.is_nested_set():
+		return True
+
+	for df in meta.get_link_fields():
+		if df.options == doctype:
+			return True
+
+	for df in meta.get_table_fields():
+		for child_df in frappe.get_meta(df.options).get_link_fields():
+			if child_df.options == doctype:
+				return True
+
+	return False
+
+
 class ImportFile:
 	def __init__(self, doctype, file, template_options=None, import_type=None):
 		self.doctype = doctype
@@ -972,10 +1233,19 @@ class Column:
 		if self.df.fieldtype == "Link":
 			# find all values that dont exist
 			values = list(set([cstr(v) for v in self.column_values[1:] if v]))
-			exists = [
-				d.name for d in frappe.db.get_all(self.df.options, filters={"name": ("in", values)})
-			]
+			exists = []
+			for batch in frappe.utils.create_batch(values, 1000):
+				exists += [
+					d.name for d in frappe.db.get_all(self.df.options, filters={"name": ("in", batch)})
+				]
 			not_exists = list(set(values) - set(exists))
+
+			# remember which values exist so that rows don't check them one by one
+			existing_keys = set(get_link_key(self.df.options, name) for name in exists)
+			for value in values:
+				Row.link_values_exist_map[self.df.options + "::" + value] = (
+					get_link_key(self.df.options, value) in existing_keys
+				)
 			if not_exists:
 				missing_values = ", ".join(not_exists)
 				self.warnings.append(
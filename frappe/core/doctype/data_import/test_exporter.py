@@ -3,6 +3,8 @@
 # See license.txt
 from __future__ import unicode_literals
 
+import os
+import csv
 import unittest
 import six
 import frappe
@@ -106,6 +108,43 @@ class TestExporter(unittest.TestCase):
 		)
 		e.build_response()
 
-		self.assertTrue(frappe.response['result'])
-		self.assertEqual(frappe.response['doctype'], doctype_name)
-		self.assertEqual(frappe.response['type'], "csv")
+		self.assertEqual(frappe.response['filename'], doctype_name + ".csv")
+		self.assertEqual(frappe.response['type'], "file_stream")
+		with open(frappe.response['filepath']) as f:
+			self.assertEqual(len(list(csv.reader(f))), len(e.get_csv_array_for_export()))
+		os.remove(frappe.response['filepath'])
+
+	def test_export_in_pages(self):
+		if six.PY2:
+			return
+
+		for i in range(5):
+			title = "Test Page {0}".format(i)
+			if not frappe.db.exists(doctype_name, title):
+				frappe.get_doc(
+					doctype=doctype_name,
+					title=title,
+					table_field_1=[{"child_title": "Child {0}".format(i)}],
+				).insert()
+
+		e = Exporter(
+			doctype_name,
+			export_fields={doctype_name: ["title"], "table_field_1": ["child_title"]},
+			export_data=True,
+			export_filters={"title": ("like", "Test Page %")},
+		)
+		# parents and their children are fetched 2 parents at a time
+		e.child_fetch_size = 2
+
+		rows = e.get_csv_array()[1:]
+		self.assertEqual(sorted(rows), [["Test Page {0}".format(i), "Child {0}".format(i)] for i in range(5)])
+
+		e = Exporter(
+			doctype_name,
+			export_fields={doctype_name: ["title"]},
+			export_data=True,
+			export_filters={"title": ("like", "Test Page %")},
+			export_page_length=3,
+		)
+		e.child_fetch_size = 2
+		self.assertEqual(len(e.get_csv_array()), 1 + 3)
@@ -5,7 +5,9 @@ from __future__ import unicode_literals
 
 import unittest
 import frappe
-from frappe.core.doctype.data_import.importer import Importer
+import frappe.utils.background_jobs
+from frappe.core.doctype.data_import.importer import (Importer, import_chunk,
+	fail_timed_out_imports, PARALLEL_IMPORTS_KEY)
 from frappe.utils import getdate
 
 doctype_name = 'DocType for Import'
@@ -94,6 +96,91 @@ class TestImporter(unittest.TestCase):
 		self.assertEqual(updated_doc.table_field_1[0].child_description, 'child description')
 		self.assertEqual(updated_doc.table_field_1_again[0].child_title, 'child title again')
 
+	def test_import_batch_logs_failed_rows(self):
+		data_import = frappe.new_doc('Data Import')
+		data_import.import_type = 'Insert New Records'
+		data_import.reference_doctype = doctype_name
+		i = Importer(doctype_name, data_import=data_import, parse_file=False)
+		i.processed = 0
+
+		title = frappe.generate_hash(doctype_name, 8)
+		payloads = [frappe._dict(doc=frappe._dict(title=t, table_field_1=[{'child_title': 'child'}]),
+			row_indexes=[index]) for index, t in enumerate([title, title + ' 2', title], 2)]
+
+		# the duplicate fails, the batch is retried per document
+		log = i.import_batch(payloads)
+		self.assertEqual([l.success for l in log], [True, True, False])
+		self.assertEqual([l.row_indexes for l in log], [[2], [3], [4]])
+		self.assertTrue(frappe.db.exists(doctype_name, title + ' 2'))
+		self.assertEqual(i.processed, 3)
+
+	def test_parallel_import(self):
+		data_import, payloads = self.get_parallel_import()
+		jobs = self.enqueue_parallel_import(data_import, payloads)
+		self.assertEqual(len(jobs), 2)
+
+		for job in jobs:
+			import_chunk(**job)
+
+		data_import.reload()
+		self.assertEqual(data_import.status, 'Success')
+		self.assertEqual([l['row_indexes'] for l in frappe.parse_json(data_import.import_log)],
+			[[2], [3], [4], [5]])
+		self.assertTrue(frappe.db.exists(doctype_name, payloads[-1].doc.title))
+		self.assertFalse(frappe.cache().hget(PARALLEL_IMPORTS_KEY, data_import.name))
+
+	def test_parallel_import_timeout(self):
+		data_import, payloads = self.get_parallel_import()
+		jobs = self.enqueue_parallel_import(data_import, payloads)
+		import_chunk(**jobs[0])
+
+		# the job of the second chunk died without reporting back
+		cache = frappe.cache()
+		info = cache.hget(PARALLEL_IMPORTS_KEY, data_import.name)
+		info.deadline = 0
+		cache.hset(PARALLEL_IMPORTS_KEY, data_import.name, info)
+		fail_timed_out_imports()
+
+		data_import.reload()
+		self.assertEqual(data_import.status, 'Error')
+		self.assertEqual([l['success'] for l in frappe.parse_json(data_import.import_log)],
+			[True, True, False, False])
+		self.assertFalse(cache.exists(cache.make_key('data_import_chunks_done|' + data_import.name)))
+		self.assertFalse(cache.hget(PARALLEL_IMPORTS_KEY, data_import.name))
+
+		# the chunk reports back late
+		import_chunk(**jobs[1])
+		data_import.reload()
+		self.assertEqual(data_import.status, 'Success')
+		self.assertEqual(sorted(l['row_indexes'] for l in frappe.parse_json(data_import.import_log)),
+			[[2], [3], [4], [5]])
+
+	def get_parallel_import(self):
+		data_import = frappe.get_doc(doctype='Data Import', import_type='Insert New Records',
+			reference_doctype=doctype_name).insert()
+
+		title = frappe.generate_hash(doctype_name, 8)
+		payloads = [frappe._dict(doc=frappe._dict(title=title + str(index),
+			table_field_1=[{'child_title': 'child'}]), row_indexes=[index], index=index - 1)
+			for index in range(2, 6)]
+
+		return data_import, payloads
+
+	def enqueue_parallel_import(self, data_import, payloads):
+		"""Returns kwargs of the `import_chunk` jobs instead of enqueuing them"""
+		jobs = []
+		enqueue = frappe.utils.background_jobs.enqueue
+		frappe.utils.background_jobs.enqueue = lambda method, queue, timeout, event, job_name, **kwargs: jobs.append(kwargs)
+		frappe.conf.data_import_workers = 2
+		try:
+			i = Importer(doctype_name, data_import=data_import, parse_file=False)
+			i.enqueue_parallel_import(payloads, [], len(payloads))
+		finally:
+			frappe.utils.background_jobs.enqueue = enqueue
+			frappe.conf.data_import_workers = None
+
+		return jobs
+
 	def get_importer(self, doctype, import_file, update=False):
 		data_import = frappe.new_doc('Data Import')
 		data_import.import_type = 'Insert New Records' if not update else 'Update Existing Records'
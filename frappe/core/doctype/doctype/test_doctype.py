@@ -290,3 +290,13 @@ class TestDocType(unittest.TestCase):
 		field_1.search_index = 1
 
 		self.assertRaises(CannotIndexedError, doc.insert)
+
+	def test_meta_shared_across_requests(self):
+		meta = frappe.get_meta("ToDo")
+
+		# new request, same metadata version
+		frappe.local.meta_cache = {}
+		self.assertTrue(frappe.get_meta("ToDo") is meta)
+
+		frappe.clear_cache(doctype="ToDo")
+		self.assertFalse(frappe.get_meta("ToDo") is meta)
@@ -13,6 +13,7 @@ from frappe.modules import make_boilerplate
 from frappe.core.doctype.page.page import delete_custom_role
 from frappe.core.doctype.custom_role.custom_role import get_custom_allowed_roles
 from frappe.desk.reportview import append_totals_row
+from frappe.desk.report_cache import clear_cache as clear_report_cache
 from six import iteritems
 from frappe.utils.safe_exec import safe_exec
 
@@ -42,11 +43,14 @@ class Report(Document):
 		if self.report_type == "Report Builder":
 			self.update_report_json()
 
+		self.validate_cache_dependencies()
+
 	def before_insert(self):
 		self.set_doctype_roles()
 
 	def on_update(self):
 		self.export_doc()
+		clear_report_cache(self.name)
 
 	def on_trash(self):
 		if (self.is_standard == 'Yes' 
@@ -54,6 +58,13 @@ class Report(Document):
 			and not frappe.flags.in_patch):
 			frappe.throw(_("You are not allowed to delete Standard Report"))
 		delete_custom_role('report', self.name)
+		clear_report_cache(self.name)
+
+	def validate_cache_dependencies(self):
+		for doctype in (self.cache_dependencies or "").splitlines():
+			doctype = doctype.strip()
+			if doctype and not frappe.db.exists("DocType", doctype):
+				frappe.throw(_("Cache Dependency {0} is not a DocType").format(frappe.bold(doctype)))
 
 	def set_doctype_roles(self):
 		if not self.get('roles') and self.is_standard == 'No':
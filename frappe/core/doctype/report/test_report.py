@@ -163,3 +163,64 @@ data = [
 		# check values
 		self.assertTrue('System User' in [d.get('type') for d in data[1]])
 
+
+	def test_cached_script_report(self):
+		report_name = 'Test Cached Script Report'
+		if frappe.db.exists("Report", report_name):
+			frappe.delete_doc("Report", report_name)
+
+		frappe.get_doc({
+			'doctype': 'Report',
+			'ref_doctype': 'ToDo',
+			'report_name': report_name,
+			'report_type': 'Script Report',
+			'is_standard': 'No',
+			'cache_results': 1,
+			'cache_dependencies': 'Note',
+			'report_script': '''
+data = [
+	[{'fieldname': 'count', 'label': 'Count'}],
+	[{'count': frappe.db.count('ToDo')}]
+]
+'''
+		}).insert(ignore_permissions=True)
+
+		result = run(report_name, filters={'status': 'Open', 'owner': None})
+		self.assertFalse(result.get('from_cache'))
+		count = result['result'][0]['count']
+
+		# same filters, without empty values
+		result = run(report_name, filters={'status': 'Open'})
+		self.assertTrue(result.get('from_cache'))
+		self.assertEqual(result['result'][0]['count'], count)
+
+		self.assertFalse(run(report_name, filters={'status': 'Closed'}).get('from_cache'))
+
+		# write to the reference doctype, not cached while uncommitted
+		frappe.get_doc(dict(doctype='ToDo', description='test cached report')).insert()
+		result = run(report_name, filters={'status': 'Open'})
+		self.assertFalse(result.get('from_cache'))
+		self.assertEqual(result['result'][0]['count'], count + 1)
+
+		frappe.db.commit()
+		result = run(report_name, filters={'status': 'Open'})
+		self.assertFalse(result.get('from_cache'))
+		self.assertEqual(result['result'][0]['count'], count + 1)
+		self.assertTrue(run(report_name, filters={'status': 'Open'}).get('from_cache'))
+
+		# table level write to a declared dependency
+		note = frappe.get_doc(dict(doctype='Note', title='test cached report')).insert()
+		frappe.db.commit()
+		self.assertFalse(run(report_name, filters={'status': 'Open'}).get('from_cache'))
+		self.assertTrue(run(report_name, filters={'status': 'Open'}).get('from_cache'))
+
+		frappe.db.set_value('Note', note.name, 'public', 1)
+		frappe.db.commit()
+		self.assertFalse(run(report_name, filters={'status': 'Open'}).get('from_cache'))
+
+		frappe.db.sql("delete from `tabToDo` where description='test cached report'")
+		frappe.db.sql("delete from `tabNote` where title='test cached report'")
+		frappe.db.commit()
+		self.assertFalse(run(report_name, filters={'status': 'Open'}).get('from_cache'))
+
+		self.assertTrue(frappe.cache().hget('report_execution_time', report_name + ':cache_hit') is not None)
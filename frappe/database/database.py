@@ -19,6 +19,7 @@ from frappe.utils import now, getdate, cast_fieldtype
 from frappe.utils.background_jobs import execute_job, get_queue
 from frappe.model.utils.link_count import flush_local_link_count
 from frappe.utils import cint
+from frappe.database.query_cache import get_query_cache
 
 # imports - compatibility imports
 from six import (
@@ -37,6 +38,12 @@ class Database(object):
 	VARCHAR_LEN = 140
 	MAX_COLUMN_LENGTH = 64
 
+	# (pattern, replacement) applied in order to every query, see `rewrite_query`
+	QUERY_REWRITES = (
+		# replaces ifnull in query with coalesce
+		(re.compile(r'ifnull\(', flags=re.IGNORECASE), 'coalesce('),
+	)
+
 	OPTIONAL_COLUMNS = ["_user_tags", "_comments", "_assign", "_liked_by"]
 	DEFAULT_SHORTCUTS = ['_Login', '__user', '_Full Name', 'Today', '__today', "now", "Now"]
 	STANDARD_VARCHAR_COLUMNS = ('name', 'owner', 'modified_by', 'parent', 'parentfield', 'parenttype')
@@ -62,6 +69,7 @@ class Database(object):
 
 		self.transaction_writes = 0
 		self.auto_commit_on_many_writes = 0
+		self.written_tables = set()
 
 		self.password = password or frappe.conf.db_password
 		self.value_cache = {}
@@ -114,9 +122,7 @@ class Database(object):
 				{"name": "a%", "owner":"test@example.com"})
 
 		"""
-		if re.search(r'ifnull\(', query, flags=re.IGNORECASE):
-			# replaces ifnull in query with coalesce
-			query = re.sub(r'ifnull\(', 'coalesce(', query, flags=re.IGNORECASE)
+		query = self.rewrite_query(query)
 
 		if not self._conn:
 			self.connect()
@@ -128,8 +134,9 @@ class Database(object):
 		if auto_commit: self.commit()
 
 		# execute
+		monitor = getattr(frappe.local, "monitor", None)
 		try:
-			if debug:
+			if debug or monitor:
 				time_start = time()
 
 			if values!=():
@@ -158,6 +165,8 @@ class Database(object):
 				if frappe.flags.in_migrate:
 					self.log_touched_tables(query, values)
 
+				self.log_written_tables(query)
+
 			else:
 				if debug:
 					if explain:
@@ -173,6 +182,11 @@ class Database(object):
 				if frappe.flags.in_migrate:
 					self.log_touched_tables(query)
 
+				self.log_written_tables(query)
+
+			if monitor:
+				monitor.add_sql_time(time() - time_start)
+
 			if debug:
 				frappe.errprint(self._cursor.mogrify(query, values))
 				time_end = time()
@@ -211,6 +225,88 @@ class Database(object):
 		else:
 			return self._cursor.fetchall()
 
+	def sql_iter(self, query, values=(), as_dict=0, as_list=0, chunk_size=1000,
+		as_chunks=False, update=None, debug=0):
+		"""Execute a SQL query and yield the rows one by one (or as lists of upto `chunk_size`
+		rows if `as_chunks` is set) without loading the whole result in memory.
+
+		Rows are read from an unbuffered server side cursor `chunk_size` rows at a time.
+		On MariaDB the cursor is opened on a separate connection, so that other queries
+		can be run while iterating. As that connection would not see changes not yet
+		committed by this one, the whole result is fetched on this connection (like
+		`sql`) if the current transaction has written anything.
+
+		:param query: SQL query.
+		:param values: List / dict of values to be escaped and substituted in the query.
+		:param as_dict: Yield rows as dictionaries.
+		:param as_list: Yield rows as lists.
+		:param chunk_size: Number of rows fetched from the server at a time.
+		:param as_chunks: Yield lists of rows instead of single rows.
+		:param update: Update this dict to all rows (if returned `as_dict`).
+
+		Example:
+
+			for user in frappe.db.sql_iter("select name, email from tabUser", as_dict=True):
+				...
+		"""
+		query = self.rewrite_query(query)
+
+		if not self._conn:
+			self.connect()
+
+		if values!=() and not isinstance(values, (dict, tuple, list)):
+			values = (values,)
+
+		if debug:
+			frappe.errprint(query if values==() else [query, values])
+
+		cursor = self.get_unbuffered_cursor()
+		try:
+			if values!=():
+				cursor.execute(query, values)
+			else:
+				cursor.execute(query)
+
+			while True:
+				rows = cursor.fetchmany(chunk_size)
+				if not rows:
+					break
+
+				if as_dict:
+					keys = [column[0] for column in cursor.description]
+					rows = [frappe._dict(zip(keys, row)) for row in rows]
+					if update:
+						for row in rows:
+							row.update(update)
+				elif as_list:
+					rows = [list(row) for row in rows]
+
+				if as_chunks:
+					yield rows
+				else:
+					for row in rows:
+						yield row
+		finally:
+			self.close_unbuffered_cursor(cursor)
+
+	def get_unbuffered_cursor(self):
+		"""Returns a cursor that fetches rows from the server as they are read, see `sql_iter`.
+		Databases without server side cursors fetch the whole result on this connection."""
+		return self._conn.cursor()
+
+	def close_unbuffered_cursor(self, cursor):
+		cursor.close()
+
+	def rewrite_query(self, query):
+		"""Returns the query with `QUERY_REWRITES` applied. Rewritten queries are cached
+		by the original text in a per-process LRU cache."""
+		return get_query_cache(self.db_type + "_rewrite").get(query, self._rewrite_query)
+
+	def _rewrite_query(self, query):
+		for pattern, replacement in self.QUERY_REWRITES:
+			query = pattern.sub(replacement, query)
+		return query
+
 	def explain_query(self, query, values=None):
 		"""Print `EXPLAIN` in error log."""
 		try:
@@ -740,6 +836,16 @@ class Database(object):
 		self.flush_realtime_log()
 		enqueue_jobs_after_commit()
 		flush_local_link_count()
+		self.flush_written_tables()
+
+	def flush_written_tables(self):
+		"""Change data versions of cached reports that depend on tables written in the
+		committed transaction, so that results cached while it was open are not used"""
+		from frappe.desk.report_cache import update_data_versions
+
+		written_tables, self.written_tables = self.written_tables, set()
+		if written_tables:
+			update_data_versions(written_tables)
 
 	@staticmethod
 	def flush_realtime_log():
@@ -751,6 +857,7 @@ class Database(object):
 	def rollback(self):
 		"""`ROLLBACK` current transaction."""
 		self.sql("rollback")
+		self.written_tables = set()
 		self.begin()
 		for obj in frappe.local.rollback_observers:
 			if hasattr(obj, "on_rollback"):
@@ -942,55 +1049,49 @@ class Database(object):
 			frappe.throw(_('No conditions provided'))
 
 	def log_touched_tables(self, query, values=None):
-		if values:
-			query = frappe.safe_decode(self._cursor.mogrify(query, values))
-		if query.strip().lower().split()[0] in ('insert', 'delete', 'update', 'alter'):
-			# single_word_regex is designed to match following patterns
-			# `tabXxx`, tabXxx and "tabXxx"
-
-			# multi_word_regex is designed to match following patterns
-			# `tabXxx Xxx` and "tabXxx Xxx"
-
-			# ([`"]?) Captures " or ` at the begining of the table name (if provided)
-			# \1 matches the first captured group (quote character) at the end of the table name
-			# multi word table name must have surrounding quotes.
-
-			# (tab([A-Z]\w+)( [A-Z]\w+)*) Captures table names that start with "tab"
-			# and are continued with multiple words that start with a captital letter
-			# e.g. 'tabXxx' or 'tabXxx Xxx' or 'tabXxx Xxx Xxx' and so on
-
-			single_word_regex = r'([`"]?)(tab([A-Z]\w+))\1'
-			multi_word_regex = r'([`"])(tab([A-Z]\w+)( [A-Z]\w+)+)\1'
-			tables = []
-			for regex in (single_word_regex, multi_word_regex):
-				tables += [groups[1] for groups in re.findall(regex, query)]
-
+		# table names are never passed as values, so the tables are found from the
+		# query text alone and cached by it
+		tables = get_query_cache("touched_tables").get(query, get_touched_tables)
+		if tables:
 			if frappe.flags.touched_tables is None:
 				frappe.flags.touched_tables = set()
 			frappe.flags.touched_tables.update(tables)
 
-	def bulk_insert(self, doctype, fields, values, ignore_duplicates=False):
+	def log_written_tables(self, query):
+		# tables written in the current transaction, by documents, set_value,
+		# bulk_insert or raw SQL alike
+		if query.lstrip()[:6].lower() in ('update', 'insert', 'delete'):
+			self.written_tables.update(get_query_cache("touched_tables").get(query, get_touched_tables))
+
+	def bulk_insert(self, doctype, fields, values, ignore_duplicates=False, chunk_size=10000):
 		"""
 			Insert multiple records at a time
 
 			:param doctype: Doctype name
 			:param fields: list of fields
 			:params values: list of list of values
+			:param chunk_size: maximum number of rows per INSERT statement
 		"""
 		insert_list = []
 		fields = ", ".join(["`"+field+"`" for field in fields])
 
-		for idx, value in enumerate(values):
+		def flush():
+			self.sql("""INSERT {ignore_duplicates} INTO `tab{doctype}` ({fields}) VALUES {values}""".format(
+					ignore_duplicates="IGNORE" if ignore_duplicates else "",
+					doctype=doctype,
+					fields=fields,
+					values=", ".join(['%s'] * len(insert_list))
+				), tuple(insert_list))
+
+		for value in values:
 			insert_list.append(tuple(value))
-			if idx and (idx%10000 == 0 or idx < len(values)-1):
-				self.sql("""INSERT {ignore_duplicates} INTO `tab{doctype}` ({fields}) VALUES {values}""".format(
-						ignore_duplicates="IGNORE" if ignore_duplicates else "",
-						doctype=doctype,
-						fields=fields,
-						values=", ".join(['%s'] * len(insert_list))
-					), tuple(insert_list))
+			if len(insert_list) >= chunk_size:
+				flush()
 				insert_list = []
 
+		if insert_list:
+			flush()
+
 def enqueue_jobs_after_commit():
 	if frappe.flags.enqueue_after_commit and len(frappe.flags.enqueue_after_commit) > 0:
 		for job in frappe.flags.enqueue_after_commit:
@@ -1014,3 +1115,30 @@ def _cast_result(doctype, result):
 		return result
 
 	return tuple(batch)
+
+# single_word_regex is designed to match following patterns
+# `tabXxx`, tabXxx and "tabXxx"
+
+# multi_word_regex is designed to match following patterns
+# `tabXxx Xxx` and "tabXxx Xxx"
+
+# ([`"]?) Captures " or ` at the begining of the table name (if provided)
+# \1 matches the first captured group (quote character) at the end of the table name
+# multi word table name must have surrounding quotes.
+
+# (tab([A-Z]\w+)( [A-Z]\w+)*) Captures table names that start with "tab"
+# and are continued with multiple words that start with a captital letter
+# e.g. 'tabXxx' or 'tabXxx Xxx' or 'tabXxx Xxx Xxx' and so on
+single_word_regex = re.compile(r'([`"]?)(tab([A-Z]\w+))\1')
+multi_word_regex = re.compile(r'([`"])(tab([A-Z]\w+)( [A-Z]\w+)+)\1')
+
+def get_touched_tables(query):
+	"""Returns the tables written to by an insert, delete, update or alter query"""
+	if query.strip().lower().split()[0] not in ('insert', 'delete', 'update', 'alter'):
+		return ()
+
+	tables = []
+	for regex in (single_word_regex, multi_word_regex):
+		tables += [groups[1] for groups in regex.findall(query)]
+
+	return tuple(tables)
@@ -1,9 +1,10 @@
-from __future__ import unicode_literals
+from __future__ import unicode_literals, print_function
 
 import frappe
 import warnings
 
 import pymysql
+import pymysql.cursors
 from pymysql.times import TimeDelta
 from pymysql.constants 	import ER, FIELD_TYPE
 from pymysql.converters import conversions
@@ -97,6 +98,22 @@ class MariaDBDatabase(Database):
 
 		return conn
 
+	def get_unbuffered_cursor(self):
+		if self.transaction_writes:
+			# a new connection would not see the uncommitted writes of this one,
+			# fetch the whole result on this connection instead
+			return self._conn.cursor()
+
+		# a pending unbuffered result blocks the connection, so use a new one
+		return self.get_connection().cursor(pymysql.cursors.SSCursor)
+
+	def close_unbuffered_cursor(self, cursor):
+		if cursor.connection is self._conn:
+			cursor.close()
+		else:
+			# closing the cursor would read the remaining rows, close the connection instead
+			cursor.connection.close()
+
 	def get_database_size(self):
 		''''Returns database size in MB'''
 		db_size = self.sql('''
@@ -272,12 +289,14 @@ class MariaDBDatabase(Database):
 				self.sql("""alter table `tab%s`
 					add unique `%s`(%s)""" % (doctype, constraint_name, ", ".join(fields)))
 
-	def updatedb(self, doctype, meta=None):
+	def updatedb(self, doctype, meta=None, dry_run=False):
 		"""
 		Syncs a `DocType` to the table
 		* creates if required
 		* updates columns
 		* updates indices
+
+		If `dry_run` is set, the changes and their estimated cost are printed instead.
 		"""
 		res = self.sql("select issingle from `tabDocType` where name=%s", (doctype,))
 		if not res:
@@ -287,6 +306,10 @@ class MariaDBDatabase(Database):
 			db_table = MariaDBTable(doctype, meta)
 			db_table.validate()
 
+			if dry_run:
+				print(db_table.describe_changes())
+				return
+
 			self.commit()
 			db_table.sync()
 			self.begin()
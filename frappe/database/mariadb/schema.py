@@ -1,8 +1,18 @@
-from __future__ import unicode_literals
+from __future__ import unicode_literals, print_function
 
+import re
 import frappe
 from frappe import _
-from frappe.database.schema import DBTable
+from frappe.utils import cint, flt
+from frappe.database.schema import DBTable, get_definition
+
+# MariaDB error codes when the requested ALGORITHM / LOCK is not possible for an ALTER
+ER_ALTER_OPERATION_NOT_SUPPORTED = 1845
+ER_ALTER_OPERATION_NOT_SUPPORTED_REASON = 1846
+
+# algorithms of ALTER TABLE, best first
+INSTANT, INPLACE, COPY = "INSTANT", "INPLACE", "COPY"
+ALGORITHMS = (INSTANT, INPLACE, COPY)
 
 class MariaDBTable(DBTable):
 	def create(self):
@@ -37,50 +47,181 @@ class MariaDBTable(DBTable):
 				engine=self.meta.get("engine") or 'InnoDB') % (self.table_name, add_text))
 
 	def alter(self):
+		self.get_alter_plan().execute()
+
+	def get_alter_plan(self):
+		"""Returns an `AlterPlan` with all changes to the table, to be run as one `ALTER TABLE`"""
+		# changes are collected again, e.g. for `describe_changes` followed by `alter`
+		self.reset_changes()
 		for col in self.columns.values():
 			col.build_for_alter_table(self.current_columns.get(col.fieldname.lower()))
 
-		add_column_query = []
-		modify_column_query = []
-		add_index_query = []
-		drop_index_query = []
-
-		columns_to_modify =  set(self.change_type + self.add_unique + self.set_default)
+		plan = AlterPlan(self.table_name)
+		indexes = self.get_indexes()
 
 		for col in self.add_column:
-			add_column_query.append("ADD COLUMN `{}` {}".format(col.fieldname, col.get_definition()))
+			plan.add("add_column", "ADD COLUMN `{}` {}".format(col.fieldname, col.get_definition()), col.fieldname)
+
+			# index new columns in the same statement
+			if (col.set_index and not col.unique and col.fieldname not in indexes
+				and get_definition(col.fieldtype, col.precision, col.length) not in ("text", "longtext")):
+				plan.add("add_index", "ADD INDEX `{0}`(`{0}`)".format(col.fieldname), col.fieldname)
 
-		for col in columns_to_modify:
-			modify_column_query.append("MODIFY `{}` {}".format(col.fieldname, col.get_definition()))
+		for col in set(self.change_type + self.add_unique + self.set_default):
+			if col in self.change_type:
+				kind = "change_type"
+			elif col in self.add_unique:
+				kind = "add_unique"
+			else:
+				kind = "set_default"
+
+			plan.add(kind, "MODIFY `{}` {}".format(col.fieldname, col.get_definition()), col.fieldname,
+				current_type=self.current_columns[col.fieldname.lower()]["type"])
 
 		for col in self.add_index:
 			# if index key not exists
-			if not frappe.db.sql("SHOW INDEX FROM `%s` WHERE key_name = %s" %
-					(self.table_name, '%s'), col.fieldname):
-				add_index_query.append("ADD INDEX `{}`(`{}`)".format(col.fieldname, col.fieldname))
+			if col.fieldname not in indexes:
+				plan.add("add_index", "ADD INDEX `{0}`(`{0}`)".format(col.fieldname), col.fieldname)
 
 		for col in self.drop_index:
 			if col.fieldname != 'name': # primary key
 				# if index key exists
-				if frappe.db.sql("""SHOW INDEX FROM `{0}`
-					WHERE key_name=%s
-					AND Non_unique=%s""".format(self.table_name), (col.fieldname, col.unique)):
-					drop_index_query.append("drop index `{}`".format(col.fieldname))
-
-		try:
-			for query_parts in [add_column_query, modify_column_query, add_index_query, drop_index_query]:
-				if query_parts:
-					query_body = ", ".join(query_parts)
-					query = "ALTER TABLE `{}` {}".format(self.table_name, query_body)
-					frappe.db.sql(query)
-
-		except Exception as e:
-			# sanitize
-			if e.args[0]==1060:
-				frappe.throw(str(e))
-			elif e.args[0]==1062:
-				fieldname = str(e).split("'")[-2]
-				frappe.throw(_("{0} field cannot be set as unique in {1}, as there are non-unique existing values".format(
-					fieldname, self.table_name)))
-			else:
-				raise e
+				if col.fieldname in indexes and indexes[col.fieldname] == cint(col.unique):
+					plan.add("drop_index", "DROP INDEX `{}`".format(col.fieldname), col.fieldname)
+
+		return plan
+
+	def describe_changes(self):
+		"""Returns the changes that sync would make to the table, with their estimated cost"""
+		if self.is_new():
+			return "{0}: new table".format(self.table_name)
+
+		return self.get_alter_plan().describe()
+
+	def get_indexes(self):
+		"""Returns `{key_name: non_unique}` of all indexes of the table, with one query"""
+		return dict((d.Key_name, cint(d.Non_unique)) for d in
+			frappe.db.sql("SHOW INDEX FROM `{0}`".format(self.table_name), as_dict=True))
+
+
+class AlterPlan(object):
+	"""Changes to a table that are run as a single `ALTER TABLE`, with the most
+	online ALGORITHM / LOCK that MariaDB allows for all of them.
+
+	If the server refuses the expected algorithm, the next one is tried, down to
+	the default (that may copy the table and block writes)."""
+	def __init__(self, table_name):
+		self.table_name = table_name
+		self.changes = []
+
+	def add(self, kind, clause, fieldname, current_type=None):
+		self.changes.append(frappe._dict(kind=kind, clause=clause, fieldname=fieldname,
+			algorithm=get_algorithm(kind, clause, current_type), rebuild=rebuilds_table(kind)))
+
+	@property
+	def algorithm(self):
+		return max([change.algorithm for change in self.changes] or [INSTANT], key=ALGORITHMS.index)
+
+	def get_query(self, algorithm=None):
+		query = "ALTER TABLE `{}` {}".format(self.table_name, ", ".join(change.clause for change in self.changes))
+		if algorithm == INSTANT:
+			query += ", ALGORITHM=INSTANT"
+		elif algorithm == INPLACE:
+			query += ", ALGORITHM=INPLACE, LOCK=NONE"
+
+		return query
+
+	def execute(self):
+		if not self.changes:
+			return
+
+		algorithms = [a for a in ALGORITHMS[ALGORITHMS.index(self.algorithm):] if a != COPY] + [None]
+		for algorithm in algorithms:
+			try:
+				frappe.db.sql(self.get_query(algorithm))
+				return
+
+			except Exception as e:
+				if algorithm and e.args[0] in (ER_ALTER_OPERATION_NOT_SUPPORTED, ER_ALTER_OPERATION_NOT_SUPPORTED_REASON):
+					# try the next (less online) algorithm
+					continue
+
+				# sanitize
+				if e.args[0]==1060:
+					frappe.throw(str(e))
+				elif e.args[0]==1062:
+					fieldname = str(e).split("'")[-2]
+					frappe.throw(_("{0} field cannot be set as unique in {1}, as there are non-unique existing values".format(
+						fieldname, self.table_name)))
+				else:
+					raise e
+
+	def get_cost(self):
+		"""Returns the expected algorithm and the rows (and bytes) of the table it has to read or copy"""
+		stats = frappe.db.sql("""select table_rows, data_length + index_length
+			from information_schema.tables
+			where table_schema = database() and table_name = %s""", self.table_name)
+		rows, size = stats[0] if stats else (0, 0)
+
+		algorithm = self.algorithm
+		if algorithm == INSTANT or all(change.kind == "drop_index" for change in self.changes):
+			effect = "metadata only"
+		elif algorithm == INPLACE:
+			effect = "rebuilds table" if any(change.rebuild for change in self.changes) else "builds indexes"
+		else:
+			effect = "copies table, writes are blocked"
+
+		return frappe._dict(algorithm=algorithm, effect=effect, rows=cint(rows), size=flt(size))
+
+	def describe(self):
+		"""Returns the plan and its estimated cost as text"""
+		if not self.changes:
+			return "{0}: no changes".format(self.table_name)
+
+		cost = self.get_cost()
+		lines = ["{0}: {1} change(s), {2} ({3}), ~{4} rows, {5:.1f} MB".format(self.table_name,
+			len(self.changes), cost.algorithm, cost.effect, cost.rows, cost.size / 1024 / 1024)]
+
+		for change in self.changes:
+			lines.append("  {0} {1}: {2}".format(change.algorithm, change.kind, change.clause))
+
+		lines.append("  " + self.get_query(None if cost.algorithm == COPY else cost.algorithm))
+		return "\n".join(lines)
+
+def get_algorithm(kind, clause, current_type=None):
+	"""Returns the most online algorithm MariaDB is expected to allow for a change"""
+	if kind in ("add_column", "set_default"):
+		return INSTANT if supports_instant_alter() else INPLACE
+
+	elif kind in ("add_index", "drop_index", "add_unique"):
+		return INPLACE
+
+	elif kind == "change_type" and is_varchar_extension(clause, current_type):
+		return INPLACE
+
+	return COPY
+
+def rebuilds_table(kind):
+	return kind in ("add_column", "change_type")
+
+def is_varchar_extension(clause, current_type):
+	"""Returns True if `clause` only makes a varchar column longer"""
+	current_length = re.findall(r"^varchar\((\d+)\)$", current_type or "")
+	new_length = re.findall(r"^MODIFY `[^`]+` varchar\((\d+)\)", clause)
+	return bool(current_length and new_length and cint(new_length[0]) >= cint(current_length[0]))
+
+def supports_instant_alter():
+	"""ALGORITHM=INSTANT is available in MariaDB 10.3.2+ and MySQL 8.0.12+"""
+	if not hasattr(frappe.local, "db_supports_instant_alter"):
+		version = frappe.db.sql("select version()")[0][0]
+		numbers = [cint(n) for n in re.findall(r"\d+", version.split("-")[0])[:3]]
+		frappe.local.db_supports_instant_alter = numbers >= ([10, 3, 2] if "MariaDB" in version else [8, 0, 12])
+
+	return frappe.local.db_supports_instant_alter
+
+def print_alter_plan(doctype):
+	"""Print the changes that would be made to the table of `doctype` and their estimated cost, e.g.
+
+		bench --site [site] execute frappe.database.mariadb.schema.print_alter_plan --args "['GL Entry']"
+	"""
+	frappe.db.updatedb(doctype, dry_run=True)
@@ -29,6 +29,15 @@ class PostgresDatabase(Database):
 	InterfaceError = psycopg2.InterfaceError
 	REGEX_CHARACTER = '~'
 
+	QUERY_REWRITES = (
+		# replace ` with " for definitions
+		(re.compile('`'), '"'),
+		# strpos is the locate equivalent in postgres
+		(re.compile(r'locate\(([^,]+),([^)]+)\)', flags=re.IGNORECASE), r'strpos(\2, \1)'),
+		# select from requires ""
+		(re.compile('from tab([a-zA-Z]*)', flags=re.IGNORECASE), r'from "tab\1"'),
+	) + Database.QUERY_REWRITES
+
 	def setup_type_map(self):
 		self.db_type = 'postgres'
 		self.type_map = {
@@ -90,17 +99,10 @@ class PostgresDatabase(Database):
 			self.db_name, as_dict=True)
 		return db_size[0].get('database_size')
 
-	# pylint: disable=W0221
-	def sql(self, *args, **kwargs):
-		if args:
-			# since tuple is immutable
-			args = list(args)
-			args[0] = modify_query(args[0])
-			args = tuple(args)
-		elif kwargs.get('query'):
-			kwargs['query'] = modify_query(kwargs.get('query'))
-
-		return super(PostgresDatabase, self).sql(*args, **kwargs)
+	def get_unbuffered_cursor(self):
+		# named cursors are server side, WITH HOLD as the connection is in autocommit mode
+		return self._conn.cursor(name="frappe_iter_{0}".format(frappe.generate_hash(length=10)),
+			withhold=True)
 
 	def get_tables(self):
 		return [d[0] for d in self.sql("""select table_name
@@ -296,20 +298,3 @@ class PostgresDatabase(Database):
 
 	def get_database_list(self, target):
 		return [d[0] for d in self.sql("SELECT datname FROM pg_database;")]
-
-def modify_query(query):
-	""""Modifies query according to the requirements of postgres"""
-	# replace ` with " for definitions
-	query = query.replace('`', '"')
-	query = replace_locate_with_strpos(query)
-	# select from requires ""
-	if re.search('from tab', query, flags=re.IGNORECASE):
-		query = re.sub('from tab([a-zA-Z]*)', r'from "tab\1"', query, flags=re.IGNORECASE)
-
-	return query
-
-def replace_locate_with_strpos(query):
-	# strpos is the locate equivalent in postgres
-	if re.search(r'locate\(', query, flags=re.IGNORECASE):
-		query = re.sub(r'locate\(([^,]+),([^)]+)\)', r'strpos(\2, \1)', query, flags=re.IGNORECASE)
-	return query
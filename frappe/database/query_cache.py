@@ -0,0 +1,86 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""Per-process LRU caches of values derived from query text.
+
+Most queries are run many times with different values, so the result of rewriting
+a query for the database dialect (or finding the tables it touches) is cached by
+the original query text. Counters of cache hits and misses are kept for each
+cache, see `get_stats`."""
+
+from __future__ import unicode_literals
+
+import threading
+from collections import OrderedDict
+
+default_maxsize = 2048
+
+# longer queries usually have values inlined in them and are not cached
+max_query_length = 4096
+
+_caches = {}
+_lock = threading.Lock()
+
+class QueryCache(object):
+	def __init__(self, name, maxsize=None):
+		self.name = name
+		self.maxsize = maxsize or default_maxsize
+		self.data = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.uncached = 0
+
+	def get(self, query, build):
+		"""Returns the value cached for `query`, calling `build(query)` to make it if not cached"""
+		if len(query) > max_query_length:
+			self.uncached += 1
+			return build(query)
+
+		with _lock:
+			value = self.data.pop(query, None)
+			if value is not None:
+				self.data[query] = value
+				self.hits += 1
+				return value
+
+		value = build(query)
+
+		with _lock:
+			self.misses += 1
+			self.data[query] = value
+			while len(self.data) > self.maxsize:
+				self.data.popitem(last=False)
+
+		return value
+
+	def clear(self):
+		with _lock:
+			self.data.clear()
+			self.hits = self.misses = self.uncached = 0
+
+	def get_stats(self):
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"uncached": self.uncached,
+			"size": len(self.data),
+			"maxsize": self.maxsize
+		}
+
+def get_query_cache(name):
+	if name not in _caches:
+		with _lock:
+			if name not in _caches:
+				_caches[name] = QueryCache(name)
+
+	return _caches[name]
+
+def get_stats():
+	"""Returns hit/miss counters of all query caches of this process, e.g.
+
+		{"mariadb_rewrite": {"hits": 1200, "misses": 40, "uncached": 2, "size": 40, "maxsize": 2048}}
+	"""
+	return dict((name, cache.get_stats()) for name, cache in _caches.items())
+
+def clear():
+	for cache in _caches.values():
+		cache.clear()
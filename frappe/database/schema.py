@@ -16,7 +16,12 @@ class DBTable:
 		self.meta = meta or frappe.get_meta(doctype, False)
 		self.columns = {}
 		self.current_columns = {}
+		self.reset_changes()
 
+		# load
+		self.get_columns_from_docfields()
+
+	def reset_changes(self):
 		# lists for change
 		self.add_column = []
 		self.change_type = []
@@ -26,9 +31,6 @@ class DBTable:
 		self.drop_index = []
 		self.set_default = []
 
-		# load
-		self.get_columns_from_docfields()
-
 	def sync(self):
 		if self.is_new():
 			self.create()
@@ -1,32 +1,85 @@
 import json
 import frappe
 
-from frappe.utils import cstr
+from frappe.utils import cstr, cint, now_datetime
+from six import string_types
 
 queue_prefix = 'insert_queue_for_'
+dead_letter_prefix = 'insert_dead_letter_for_'
+
+# per doctype overrides can be set in site config, e.g.
+# "deferred_insert": {"Route History": {"batch_size": 1000, "flush_interval": 300}}
+default_batch_size = 500
+default_flush_interval = 3600
 
 @frappe.whitelist()
 def deferred_insert(doctype, records):
+	if not isinstance(records, string_types):
+		records = json.dumps(records, default=str)
 	frappe.cache().rpush(queue_prefix + doctype, records)
 
 def save_to_db():
 	queue_keys = frappe.cache().get_keys(queue_prefix)
 	for key in queue_keys:
-		record_count = 0
-		queue_key = get_key_name(key)
 		doctype = get_doctype_name(key)
-		while frappe.cache().llen(queue_key) > 0 and record_count <= 500:
-			records = frappe.cache().lpop(queue_key)
-			records = json.loads(records.decode('utf-8'))
-			if isinstance(records, dict):
-				record_count += 1
-				insert_record(records, doctype)
-				continue
-			for record in records:
-				record_count += 1
-				insert_record(record, doctype)
-
-	frappe.db.commit()
+		batch_size, flush_interval = get_settings(doctype)
+
+		if not is_flush_due(doctype, flush_interval):
+			continue
+
+		while True:
+			records = pop_batch(key, batch_size)
+			if not records:
+				break
+
+			insert_batch(records, doctype)
+
+			if len(records) < batch_size:
+				break
+
+		frappe.cache().hset('deferred_insert_last_flush', doctype, now_datetime())
+
+def get_settings(doctype):
+	'''Returns `(batch_size, flush_interval)` for the doctype'''
+	settings = (frappe.conf.get('deferred_insert') or {}).get(doctype) or {}
+	return (cint(settings.get('batch_size')) or default_batch_size,
+		cint(settings.get('flush_interval', default_flush_interval)))
+
+def is_flush_due(doctype, flush_interval):
+	last_flush = frappe.cache().hget('deferred_insert_last_flush', doctype)
+	return not last_flush or (now_datetime() - last_flush).total_seconds() >= flush_interval
+
+def pop_batch(key, batch_size):
+	'''Atomically remove upto `batch_size` queued entries and return the records in them'''
+	pipeline = frappe.cache().pipeline()
+	pipeline.lrange(key, 0, batch_size - 1)
+	pipeline.ltrim(key, batch_size, -1)
+	entries = pipeline.execute()[0]
+
+	records = []
+	for entry in entries:
+		entry = json.loads(frappe.safe_decode(entry))
+		if isinstance(entry, dict):
+			records.append(entry)
+		else:
+			records.extend(entry)
+
+	return records
+
+def insert_batch(records, doctype):
+	'''Insert records with multi-row inserts in one transaction. If that fails,
+	insert them one by one and park the failed records in the dead letter queue'''
+	for record in records:
+		if not record.get('doctype'):
+			record['doctype'] = doctype
+
+	try:
+		frappe.insert_many([frappe.get_doc(record) for record in records])
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		for record in records:
+			insert_record(record, doctype)
 
 def insert_record(record, doctype):
 	if not record.get('doctype'):
@@ -34,8 +87,21 @@ def insert_record(record, doctype):
 	try:
 		doc = frappe.get_doc(record)
 		doc.insert()
+		frappe.db.commit()
 	except Exception as e:
-		print(e, doctype)
+		frappe.db.rollback()
+		frappe.cache().rpush(dead_letter_prefix + doctype, json.dumps({
+			'record': record,
+			'error': cstr(e)
+		}, default=str))
+
+def requeue_dead_letters(doctype):
+	'''Move records from the dead letter queue of the doctype back to the insert queue'''
+	while True:
+		entry = frappe.cache().lpop(dead_letter_prefix + doctype)
+		if not entry:
+			break
+		deferred_insert(doctype, [json.loads(frappe.safe_decode(entry))['record']])
 
 def get_key_name(key):
 	return cstr(key).split('|')[1]
@@ -271,8 +271,9 @@ def get_all_icons():
 		filters={'standard': 1}, fields=['module_name'])]
 
 def clear_desktop_icons_cache(user=None):
+	from frappe.boot import clear_boot_section
 	frappe.cache().hdel('desktop_icons', user or frappe.session.user)
-	frappe.cache().hdel('bootinfo', user or frappe.session.user)
+	clear_boot_section('user', user or frappe.session.user)
 
 def get_user_copy(module_name, user=None):
 	'''Return user copy (Desktop Icon) of the given module_name. If user copy does not exist, create one.
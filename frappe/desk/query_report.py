@@ -19,6 +19,7 @@ from frappe.utils import (
 from frappe.model.utils import render_include
 from frappe.translate import send_translations
 import frappe.desk.reportview
+from frappe.desk import report_cache
 from frappe.permissions import get_role_permissions
 from six import string_types, iteritems
 from datetime import timedelta
@@ -201,6 +202,8 @@ def run(report_name, filters=None, user=None, ignore_prepared_report=False, cust
 		else:
 			dn = ""
 		result = get_prepared_report_result(report, filters, dn, user)
+	elif report_cache.is_enabled(report):
+		result = report_cache.get_report_result(report, filters, user, custom_columns)
 	else:
 		result = generate_report_result(report, filters, user, custom_columns)
 
@@ -469,90 +472,141 @@ def save_report(reference_report, report_name, columns):
 
 
 def get_filtered_data(ref_doctype, columns, data, user):
-	result = []
+	"""Returns rows of `data` that `user` is permitted to see.
+
+		The user permissions of each linked doctype are turned into sets of denied
+		values per column (values that exist but are not allowed), so that each row
+		is checked with a few set lookups, see `get_match_checks`"""
 	linked_doctypes = get_linked_doctypes(columns, data)
 	match_filters_per_doctype = get_user_match_filters(linked_doctypes, user=user)
-	shared = frappe.share.get_shared(ref_doctype, user)
-	columns_dict = get_columns_dict(columns)
+	if not match_filters_per_doctype:
+		return list(data)
 
+	columns_dict = get_columns_dict(columns)
 	role_permissions = get_role_permissions(frappe.get_meta(ref_doctype), user)
 	if_owner = role_permissions.get("if_owner", {}).get("report")
 
-	if match_filters_per_doctype:
-		for row in data:
-			# Why linked_doctypes.get(ref_doctype)? because if column is empty, linked_doctypes[ref_doctype] is removed
-			if linked_doctypes.get(ref_doctype) and shared and row[linked_doctypes[ref_doctype]] in shared:
-				result.append(row)
+	match_checks = get_match_checks(data, linked_doctypes, match_filters_per_doctype,
+		ref_doctype, if_owner, columns_dict, user)
+	if not match_checks:
+		return list(data)
 
-			elif has_match(row, linked_doctypes, match_filters_per_doctype, ref_doctype, if_owner, columns_dict, user):
-				result.append(row)
-	else:
-		result = list(data)
+	# Why linked_doctypes.get(ref_doctype)? because if column is empty, linked_doctypes[ref_doctype] is removed
+	shared_idx = linked_doctypes.get(ref_doctype)
+	shared = frozenset(frappe.share.get_shared(ref_doctype, user) or []) if shared_idx is not None else None
 
-	return result
+	result = []
+	for row in data:
+		if not row:
+			# allow empty rows :)
+			result.append(row)
+
+		elif shared and get_cell_value(row, shared_idx) in shared:
+			result.append(row)
 
+		elif has_match(row, match_checks, user):
+			result.append(row)
 
-def has_match(row, linked_doctypes, doctype_match_filters, ref_doctype, if_owner, columns_dict, user):
-	"""Returns True if after evaluating permissions for each linked doctype
-		- There is an owner match for the ref_doctype
-		- `and` There is a user permission match for all linked doctypes
+	return result
 
-		Returns True if the row is empty
+def has_match(row, match_checks, user):
+	"""Returns True if for each doctype in `match_checks`
+		- There is an owner match
+		- `or` For any of its user permission sets, no cell of the row has a denied value
 
 		Note:
 		Each doctype could have multiple conflicting user permission doctypes.
 		Hence even if one of the sets allows a match, it is true.
 		This behavior is equivalent to the trickling of user permissions of linked doctypes to the ref doctype.
 	"""
-	resultant_match = True
+	for owner_idx, filter_sets in match_checks:
+		if owner_idx is not None and get_cell_value(row, owner_idx)==user:
+			continue
+
+		# each doctype could have multiple conflicting user permission doctypes, hence using OR
+		if not any(all(get_cell_value(row, idx) not in denied for idx, denied in checks)
+			for checks in filter_sets):
+			# each doctype's user permissions should match the row! hence using AND
+			return False
+
+	return True
+
+def get_match_checks(data, linked_doctypes, doctype_match_filters, ref_doctype, if_owner, columns_dict, user):
+	"""Returns a list of `(owner_idx, filter_sets)` for each doctype with user permissions,
+		where `filter_sets` is a list of `[(idx, denied_values)]`, one per set of user permissions.
 
-	if not row:
-		# allow empty rows :)
-		return resultant_match
+		`denied_values` is a frozenset of the values of column `idx` that exist
+		but are not allowed. Existence of all distinct values is checked with one
+		query per linked doctype. Doctypes that match every row are left out."""
+	owner_column = columns_dict.get("owner")
+	user_idx = linked_doctypes.get("User")
+	is_owner_column = user_idx is not None and columns_dict[user_idx]==owner_column
 
+	# case handled by owner match
+	linked = [(dt, idx) for dt, idx in linked_doctypes.items()
+		if not (dt=="User" and columns_dict[idx]==owner_column)]
+
+	column_values = dict((dt, get_column_values(data, idx)) for dt, idx in linked)
+
+	allowed_sets = {}
 	for doctype, filter_list in doctype_match_filters.items():
-		matched_for_doctype = False
-
-		if doctype==ref_doctype and if_owner:
-			idx = linked_doctypes.get("User")
-			if (idx is not None
-				and row[idx]==user
-				and columns_dict[idx]==columns_dict.get("owner")):
-					# owner match is true
-					matched_for_doctype = True
-
-		if not matched_for_doctype:
-			for match_filters in filter_list:
-				match = True
-				for dt, idx in linked_doctypes.items():
-					# case handled above
-					if dt=="User" and columns_dict[idx]==columns_dict.get("owner"):
-						continue
+		allowed_sets[doctype] = [dict((dt, frozenset(match_filters[dt]))
+			for dt, idx in linked if dt in match_filters) for match_filters in filter_list]
 
-					cell_value = None
-					if isinstance(row, dict):
-						cell_value = row.get(idx)
-					elif isinstance(row, (list, tuple)):
-						cell_value = row[idx]
+	# values that are not allowed by some set of user permissions, if they exist
+	not_allowed = {}
+	for sets in allowed_sets.values():
+		for allowed_for_set in sets:
+			for dt, allowed in allowed_for_set.items():
+				not_allowed.setdefault(dt, set()).update(column_values[dt] - allowed)
 
-					if dt in match_filters and cell_value not in match_filters.get(dt) and frappe.db.exists(dt, cell_value):
-						match = False
-						break
+	existing = dict((dt, get_existing_values(dt, values)) for dt, values in not_allowed.items())
 
-				# each doctype could have multiple conflicting user permission doctypes, hence using OR
-				# so that even if one of the sets allows a match, it is true
-				matched_for_doctype = matched_for_doctype or match
+	match_checks = []
+	for doctype, sets in allowed_sets.items():
+		owner_idx = user_idx if (doctype==ref_doctype and if_owner and is_owner_column) else None
 
-				if matched_for_doctype:
-					break
+		filter_sets = []
+		for allowed_for_set in sets:
+			checks = []
+			for dt, idx in linked:
+				if dt in allowed_for_set:
+					denied = existing[dt] - allowed_for_set[dt]
+					if denied:
+						checks.append((idx, denied))
 
-		# each doctype's user permissions should match the row! hence using AND
-		resultant_match = resultant_match and matched_for_doctype
+			if not checks:
+				# this set allows every row
+				break
 
-		if not resultant_match:
-			break
+			filter_sets.append(checks)
 
-	return resultant_match
+		else:
+			match_checks.append((owner_idx, filter_sets))
+
+	return match_checks
+
+def get_column_values(data, idx):
+	"""Returns a frozenset of the distinct, non empty values of column `idx`"""
+	return frozenset(value for value in (get_cell_value(row, idx) for row in data if row) if value)
+
+def get_cell_value(row, idx):
+	if isinstance(row, dict):
+		return row.get(idx)
+	elif isinstance(row, (list, tuple)):
+		return row[idx]
+
+def get_existing_values(doctype, values, chunk_size=1000):
+	"""Returns a frozenset of `values` that are names of existing `doctype` records.
+	Names are matched case insensitively, as by the database."""
+	values = list(values)
+	existing = set()
+	for i in range(0, len(values), chunk_size):
+		chunk = values[i:i + chunk_size]
+		existing.update(cstr(name).lower() for name in frappe.db.sql_list("""select name from `tab{doctype}`
+			where name in ({values})""".format(doctype=doctype, values=", ".join(["%s"] * len(chunk))), chunk))
+
+	return frozenset(value for value in values if cstr(value).lower() in existing)
 
 def get_linked_doctypes(columns, data):
 	linked_doctypes = {}
@@ -0,0 +1,174 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""Opt-in cache of Query and Script Report results.
+
+Set "Cache Results" in a Report to reuse its result for the same filters for
+"Cache TTL" seconds. Results are cached by report, normalized filters, a
+fingerprint of the permissions of the user and the data version of each doctype
+the report depends on (its Reference DocType and "Cache Dependencies").
+
+The data version of a doctype changes after every commit of a transaction that
+wrote to its table, be it by saving documents, `frappe.db.set_value`,
+`bulk_insert` or raw SQL, so cached results are not used after a write to any
+of the dependencies. Results are not cached (or read from the cache) while the
+current transaction has written to a dependency.
+
+Writes that do not go through `frappe.db` (other processes or connections) and
+changes of Single DocTypes (stored in `tabSingles`) do not change data versions,
+cached results of reports that depend on them are only refreshed after "Cache
+TTL".
+
+Time taken by cache hits and misses is stored in the `report_execution_time`
+hash as `<report>:cache_hit` and `<report>:cache_miss`."""
+
+from __future__ import unicode_literals
+
+import json
+import time
+import hashlib
+
+import frappe
+from frappe.utils import cint, cstr
+from frappe.permissions import get_role_permissions
+from six import string_types
+
+default_ttl = 300
+
+DATA_VERSION_KEY = "report_data_version"
+CACHED_DOCTYPES_KEY = "report_cache_doctypes"
+RESULT_KEY_PREFIX = "report_result:"
+
+def is_enabled(report):
+	return cint(report.get("cache_results")) and report.report_type in ("Query Report", "Script Report")
+
+def get_report_result(report, filters=None, user=None, custom_columns=None):
+	"""Returns the result of `generate_report_result`, from the cache if a result
+	for the same filters, permissions and data version is cached"""
+	from frappe.desk.query_report import generate_report_result
+
+	start = time.time()
+	user = user or frappe.session.user
+
+	if has_pending_writes(get_dependencies(report)):
+		# the result includes uncommitted changes
+		return generate_report_result(report, filters, user, custom_columns)
+
+	key = get_cache_key(report, filters, user, custom_columns)
+
+	result = frappe.cache().get_value(key, expires=True)
+	if result is not None:
+		result["execution_time"] = record_execution_time(report.name, "cache_hit", start)
+		result["from_cache"] = 1
+		return result
+
+	result = generate_report_result(report, filters, user, custom_columns)
+	frappe.cache().set_value(key, result, expires_in_sec=cint(report.get("cache_ttl")) or default_ttl)
+	record_execution_time(report.name, "cache_miss", start)
+
+	return result
+
+def get_cache_key(report, filters, user, custom_columns=None):
+	# data versions are read before the report is run, so that a write while
+	# it runs makes its result stale
+	dependencies = get_dependencies(report)
+	versions = frappe.cache().hget_many(DATA_VERSION_KEY, dependencies)
+
+	key = get_hash([
+		report.name,
+		cstr(report.modified),
+		report.get("custom_report"),
+		report.get("custom_columns"),
+		custom_columns,
+		normalize_filters(filters),
+		get_permission_fingerprint(report, user),
+		[versions.get(doctype) for doctype in dependencies]
+	])
+
+	return RESULT_KEY_PREFIX + report.name + ":" + key
+
+def normalize_filters(filters):
+	"""Returns filters as a dict without empty values, so that filters
+	sent in a different order or with unset values share the cache"""
+	if not filters:
+		return {}
+
+	if isinstance(filters, string_types):
+		filters = json.loads(filters)
+
+	return dict((key, value) for key, value in filters.items()
+		if value not in (None, "", []) and key != "prepared_report_name")
+
+def get_permission_fingerprint(report, user):
+	"""Hash of what decides which rows of the report `user` can see: roles,
+	user permissions and documents shared with the user. The user is included
+	if rows are filtered by owner or permission query conditions."""
+	from frappe.core.doctype.user_permission.user_permission import get_user_permissions
+
+	doctype = report.ref_doctype
+	role_permissions = get_role_permissions(frappe.get_meta(doctype), user)
+	is_user_specific = bool(role_permissions.get("if_owner", {}).get("report")
+		or frappe.get_hooks("permission_query_conditions", {}).get(doctype))
+
+	return get_hash([
+		sorted(frappe.get_roles(user)),
+		get_user_permissions(user),
+		sorted(frappe.share.get_shared(doctype, user) or []),
+		user if is_user_specific else None
+	])
+
+def get_dependencies(report):
+	dependencies = [report.ref_doctype]
+	for doctype in cstr(report.get("cache_dependencies")).splitlines():
+		doctype = doctype.strip()
+		if doctype and doctype not in dependencies:
+			dependencies.append(doctype)
+
+	return dependencies
+
+def get_hash(value):
+	return hashlib.md5(frappe.safe_encode(frappe.as_json(value))).hexdigest() #nosec
+
+def record_execution_time(report_name, kind, start):
+	execution_time = time.time() - start
+	frappe.cache().hset("report_execution_time", "{0}:{1}".format(report_name, kind), execution_time)
+	return execution_time
+
+def has_pending_writes(dependencies):
+	return any(("tab" + doctype) in frappe.db.written_tables for doctype in dependencies)
+
+def update_data_versions(tables):
+	"""Called after commit with the tables written in the transaction. Changes
+	the data version of their doctypes if a cached report depends on them."""
+	if frappe.flags.in_install:
+		return
+
+	cached_doctypes = get_cached_doctypes()
+	if not cached_doctypes:
+		return
+
+	for table in tables:
+		doctype = table[3:]
+		if doctype in cached_doctypes:
+			frappe.cache().hset(DATA_VERSION_KEY, doctype, frappe.generate_hash(length=10))
+
+def get_cached_doctypes():
+	"""Returns doctypes that reports with cached results depend on"""
+	def _get():
+		if not frappe.db.has_column("Report", "cache_results"):
+			# not migrated yet
+			return []
+
+		doctypes = set()
+		for report in frappe.get_all("Report", filters={"cache_results": 1, "disabled": 0},
+			fields=["ref_doctype", "cache_dependencies"]):
+			doctypes.update(get_dependencies(report))
+
+		return list(doctypes)
+
+	return frappe.cache().get_value(CACHED_DOCTYPES_KEY, _get)
+
+def clear_cache(report_name=None):
+	"""Remove cached results of `report_name` (or all reports). Results are indexed by
+	report, so only the keys of `report_name` are read; all reports are found with `SCAN`."""
+	frappe.cache().delete_value(CACHED_DOCTYPES_KEY)
+	frappe.cache().delete_keys(RESULT_KEY_PREFIX + (report_name + ":" if report_name else ""))
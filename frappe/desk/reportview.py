@@ -4,14 +4,16 @@
 from __future__ import unicode_literals
 """build query for doclistview and return results"""
 
-import frappe, json
+import frappe, json, csv
 from six.moves import range
 import frappe.permissions
 from frappe.model.db_query import DatabaseQuery
 from frappe import _
-from six import string_types, StringIO
+from six import string_types
 from frappe.core.doctype.access_log.access_log import make_access_log
-from frappe.utils import cstr
+from frappe.utils import cint
+from frappe.utils.file_export import (write_export_file, build_file_response,
+	attach_export_file, get_export_filename)
 
 
 @frappe.whitelist()
@@ -130,12 +132,11 @@ def export_query():
 	frappe.form_dict.pop('title', None)
 
 	form_params = get_form_params()
-	form_params["limit_page_length"] = None
-	form_params["as_list"] = True
 	doctype = form_params.doctype
 	add_totals_row = None
 	file_format_type = form_params["file_format_type"]
 	title = title or doctype
+	export_in_background = cint(form_params.pop("export_in_background", 0))
 
 	del form_params["doctype"]
 	del form_params["file_format_type"]
@@ -156,55 +157,68 @@ def export_query():
 		report_name=form_params.report_name,
 		filters=form_params.filters)
 
-	db_query = DatabaseQuery(doctype)
-	ret = db_query.execute(**form_params)
+	if export_in_background:
+		frappe.enqueue("frappe.desk.reportview.export_query_to_file", queue="long",
+			doctype=doctype, form_params=form_params, add_totals_row=add_totals_row,
+			file_format_type=file_format_type, title=title)
+		frappe.msgprint(_("Export started, you will be notified with a link to the file once it is ready"))
+		return
 
-	if add_totals_row:
-		ret = append_totals_row(ret)
+	path = write_export_query_file(doctype, form_params, add_totals_row, file_format_type)
+	build_file_response(path, get_export_filename(title, file_format_type))
 
-	data = [['Sr'] + get_labels(db_query.fields, doctype)]
-	for i, row in enumerate(ret):
-		data.append([i+1] + list(row))
+def export_query_to_file(doctype, form_params, add_totals_row, file_format_type, title):
+	"""Background job: export and attach the file as a private File of the user"""
+	path = write_export_query_file(doctype, form_params, add_totals_row, file_format_type)
+	attach_export_file(path, get_export_filename(title, file_format_type))
 
-	if file_format_type == "CSV":
+def write_export_query_file(doctype, form_params, add_totals_row, file_format_type):
+	rows = get_export_rows(doctype, form_params, add_totals_row)
 
-		# convert to csv
-		import csv
+	if file_format_type == "CSV":
 		from frappe.utils.xlsxutils import handle_html
 
-		f = StringIO()
-		writer = csv.writer(f)
-		for r in data:
-			# encode only unicode type strings and not int, floats etc.
-			writer.writerow([handle_html(frappe.as_unicode(v)) \
-				if isinstance(v, string_types) else v for v in r])
+		# encode only unicode type strings and not int, floats etc.
+		rows = ([handle_html(frappe.as_unicode(v)) if isinstance(v, string_types) else v for v in row]
+			for row in rows)
+		return write_export_file(rows, "CSV", doctype, quoting=csv.QUOTE_MINIMAL)
+
+	return write_export_file(rows, "Excel", doctype)
 
-		f.seek(0)
-		frappe.response['result'] = cstr(f.read())
-		frappe.response['type'] = 'csv'
-		frappe.response['doctype'] = title
+def get_export_rows(doctype, form_params, add_totals_row=False):
+	"""Yields the header and rows of a report builder export. Rows are read from the
+	database as they are written so that the whole result is never held in memory"""
+	form_params = frappe._dict(form_params)
+	form_params["limit_page_length"] = None
+	form_params["as_list"] = True
+	form_params["as_iterator"] = True
 
-	elif file_format_type == "Excel":
+	db_query = DatabaseQuery(doctype)
+	ret = db_query.execute(**form_params)
 
-		from frappe.utils.xlsxutils import make_xlsx
-		xlsx_file = make_xlsx(data, doctype)
+	yield ['Sr'] + get_labels(db_query.fields, doctype)
 
-		frappe.response['filename'] = title + '.xlsx'
-		frappe.response['filecontent'] = xlsx_file.getvalue()
-		frappe.response['type'] = 'binary'
+	totals = None
+	idx = 0
+	for row in ret:
+		idx += 1
+		if add_totals_row:
+			totals = add_to_totals(totals, row)
+		yield [idx] + list(row)
 
+	if totals:
+		if not isinstance(totals[0], (int, float)):
+			totals[0] = 'Total'
+		yield [idx + 1] + totals
 
 def append_totals_row(data):
 	if not data:
 		return data
 	data = list(data)
-	totals = []
-	totals.extend([""]*len(data[0]))
+	totals = None
 
 	for row in data:
-		for i in range(len(row)):
-			if isinstance(row[i], (float, int)):
-				totals[i] = (totals[i] or 0) + row[i]
+		totals = add_to_totals(totals, row)
 
 	if not isinstance(totals[0], (int, float)):
 		totals[0] = 'Total'
@@ -213,6 +227,16 @@ def append_totals_row(data):
 
 	return data
 
+def add_to_totals(totals, row):
+	if totals is None:
+		totals = [""] * len(row)
+
+	for i in range(len(row)):
+		if isinstance(row[i], (float, int)):
+			totals[i] = (totals[i] or 0) + row[i]
+
+	return totals
+
 def get_labels(fields, doctype):
 	"""get column labels based on column names"""
 	labels = []
@@ -4,6 +4,8 @@
 from __future__ import unicode_literals
 import frappe
 import sys
+import time
+import threading
 from six.moves import html_parser as HTMLParser
 import smtplib, quopri, json
 from frappe import msgprint, _, safe_decode, safe_encode
@@ -11,16 +13,24 @@ from frappe.email.smtp import SMTPServer, get_outgoing_email_account
 from frappe.email.email_body import get_email, get_formatted_html, add_attachment
 from frappe.utils.verified_command import get_signed_params, verify_request
 from html2text import html2text
-from frappe.utils import get_url, nowdate, now_datetime, add_days, split_emails, cstr, cint
+from frappe.utils import (get_url, nowdate, now_datetime, add_days, add_to_date, split_emails, cstr,
+	cint, flt)
 from rq.timeouts import JobTimeoutException
 from frappe.utils.scheduler import log
 from six import text_type, string_types, PY3
+from six.moves.queue import Queue, Empty
 from email.parser import Parser
 from frappe.utils import validate_email_address
 
 
 class EmailLimitCrossedError(frappe.ValidationError): pass
 
+# minutes after which emails claimed by a flush job that did not finish are sent again
+default_claim_timeout = 30
+
+# emails sent by a thread of `flush_parallel` between commits
+default_commit_interval = 10
+
 def send(recipients=None, sender=None, subject=None, message=None, text_content=None, reference_doctype=None,
 		reference_name=None, unsubscribe_method=None, unsubscribe_params=None, unsubscribe_message=None,
 		attachments=None, reply_to=None, cc=None, bcc=None, message_id=None, in_reply_to=None, send_after=None,
@@ -337,6 +347,13 @@ def flush(from_test=False):
 		msgprint(_("Emails are muted"))
 		from_test = True
 
+	release_stale_claims(auto_commit=auto_commit)
+
+	workers = cint(frappe.conf.email_queue_workers)
+	if workers > 1 and not from_test:
+		flush_parallel(workers)
+		return
+
 	smtpserver_dict = frappe._dict()
 
 	for email in get_queue():
@@ -368,8 +385,148 @@ def get_queue():
 		limit 500''', { 'now': now_datetime() }, as_dict=True)
 
 
-def send_one(email, smtpserver=None, auto_commit=True, now=False, from_test=False):
-	'''Send Email Queue with given smtpserver'''
+def flush_parallel(workers):
+	"""Claim a batch of queued emails and send them from `workers` threads.
+
+	Each thread keeps one SMTP connection per Email Account for the whole batch and
+	commits status updates of every `email_commit_interval` (default 10) emails
+	together. Sending rate per Email Account can be limited with `email_rate_limit`
+	(emails per second) or `email_rate_limits` (per account) in site config.
+
+	Emails claimed by a job that died before sending them are set as `Not Sent`
+	again after `email_claim_timeout` (default 30) minutes. Emails sent but not yet
+	committed by a dead job are sent again, see `release_stale_claims`."""
+	emails = claim_queue(cint(frappe.conf.email_queue_batch_size) or 500)
+	if not emails:
+		return
+
+	pending = Queue()
+	for email in emails:
+		pending.put(email)
+
+	rate_limiter = EmailRateLimiter()
+	threads = [threading.Thread(target=send_from_thread,
+		args=(frappe.local.site, frappe.local.sites_path, pending, rate_limiter))
+		for i in range(min(workers, len(emails)))]
+
+	for thread in threads:
+		thread.start()
+
+	for thread in threads:
+		thread.join()
+
+def claim_queue(limit):
+	"""Mark the next `limit` sendable emails as `Sending` in one transaction, so that
+	other flush jobs skip them. Returns list of claimed emails (name, sender)."""
+	emails = frappe.db.sql('''select
+			name, sender
+		from
+			`tabEmail Queue`
+		where
+			(status='Not Sent' or status='Partially Sent') and
+			(send_after is null or send_after < %(now)s)
+		order
+			by priority desc, creation asc
+		limit %(limit)s
+		for update''', { 'now': now_datetime(), 'limit': limit }, as_dict=True)
+
+	if emails:
+		frappe.db.sql("""update `tabEmail Queue` set status='Sending', modified=%s where name in ({0})"""
+			.format(", ".join(["%s"] * len(emails))), [now_datetime()] + [e.name for e in emails])
+
+	frappe.db.commit()
+	return emails
+
+def release_stale_claims(auto_commit=True):
+	"""Set emails that were claimed more than `email_claim_timeout` minutes ago as `Not Sent`,
+	the job that claimed them was killed or timed out. Recipients that were sent to are skipped
+	when they are sent again."""
+	timeout = cint(frappe.conf.email_claim_timeout) or default_claim_timeout
+	frappe.db.sql("""update `tabEmail Queue` set status='Not Sent', modified=%s
+		where status='Sending' and modified < %s""",
+		(now_datetime(), add_to_date(now_datetime(), minutes=-timeout)), auto_commit=auto_commit)
+
+def send_from_thread(site, sites_path, pending, rate_limiter):
+	"""Send claimed emails from `pending` till it is empty, reusing SMTP connections"""
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()
+
+	commit_interval = cint(frappe.conf.email_commit_interval) or default_commit_interval
+	uncommitted = 0
+
+	smtpserver_dict = frappe._dict()
+	try:
+		while True:
+			try:
+				email = pending.get_nowait()
+			except Empty:
+				break
+
+			if cint(frappe.defaults.get_defaults().get("hold_queue"))==1:
+				# release the claim
+				frappe.db.sql("""update `tabEmail Queue` set status='Not Sent' where name=%s and status='Sending'""",
+					email.name, auto_commit=True)
+				continue
+
+			email_account = get_outgoing_email_account(raise_exception_not_set=False, sender=email.sender)
+			account = email_account.name if email_account else None
+
+			smtpserver = smtpserver_dict.get(account)
+			if not smtpserver:
+				smtpserver = SMTPServer()
+				smtpserver_dict[account] = smtpserver
+
+			rate_limiter.wait(account)
+
+			send_one(email.name, smtpserver, auto_commit=False, claimed=True)
+
+			uncommitted += 1
+			if uncommitted >= commit_interval:
+				frappe.db.commit()
+				uncommitted = 0
+
+	finally:
+		frappe.db.commit()
+
+		for smtpserver in smtpserver_dict.values():
+			if smtpserver._sess:
+				try:
+					smtpserver._sess.quit()
+				except smtplib.SMTPException:
+					pass
+
+		frappe.destroy()
+
+class EmailRateLimiter(object):
+	"""Shared between sender threads, spaces out emails sent via the same Email Account"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.next_send = {}
+		self.limits = frappe.conf.email_rate_limits or {}
+		self.default_limit = flt(frappe.conf.email_rate_limit)
+
+	def wait(self, account):
+		limit = flt(self.limits.get(account)) or self.default_limit
+		if not limit:
+			return
+
+		with self.lock:
+			now = time.time()
+			send_at = max(now, self.next_send.get(account, now))
+			self.next_send[account] = send_at + 1.0 / limit
+
+		if send_at > now:
+			time.sleep(send_at - now)
+
+def send_one(email, smtpserver=None, auto_commit=True, now=False, from_test=False, claimed=False):
+	'''Send Email Queue with given smtpserver
+
+	:param claimed: Email has been set as `Sending` by `claim_queue`. Status updates of
+		claimed emails are committed by the caller, in batches; on errors only the changes
+		made for this email are rolled back'''
+
+	if claimed:
+		frappe.db.sql("savepoint send_one")
 
 	email = frappe.db.sql('''select
 			name, status, communication, message, sender, reference_doctype,
@@ -391,9 +548,9 @@ def send_one(email, smtpserver=None, auto_commit=True, now=False, from_test=Fals
 	if cint(frappe.defaults.get_defaults().get("hold_queue"))==1 :
 		return
 
-	if email.status not in ('Not Sent','Partially Sent') :
+	if email.status not in ('Not Sent','Partially Sent') and not (claimed and email.status=='Sending'):
 		# rollback to release lock and return
-		frappe.db.rollback()
+		rollback_send_one(claimed)
 		return
 
 	frappe.db.sql("""update `tabEmail Queue` set status='Sending', modified=%s where name=%s""",
@@ -475,7 +632,7 @@ def send_one(email, smtpserver=None, auto_commit=True, now=False, from_test=Fals
 		return
 
 	except Exception as e:
-		frappe.db.rollback()
+		rollback_send_one(claimed)
 
 		if email.retry < 3:
 			frappe.db.sql("""update `tabEmail Queue` set status='Not Sent', modified=%s, retry=retry+1 where name=%s""",
@@ -499,6 +656,13 @@ def send_one(email, smtpserver=None, auto_commit=True, now=False, from_test=Fals
 			# log to Error Log
 			log('frappe.email.queue.flush', text_type(e))
 
+def rollback_send_one(claimed=False):
+	if claimed:
+		# keep status updates of other emails of the batch
+		frappe.db.sql("rollback to savepoint send_one")
+	else:
+		frappe.db.rollback()
+
 def prepare_message(email, recipient, recipients_list):
 	message = email.message
 	if not message:
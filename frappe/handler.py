@@ -7,6 +7,7 @@ from frappe import _
 import frappe.utils
 import frappe.sessions
 import frappe.desk.form.run_method
+import frappe.rate_limiter
 from frappe.utils.response import build_response
 from frappe.api import validate_auth
 from frappe.utils import cint
@@ -60,6 +61,7 @@ def execute_cmd(cmd, from_async=False):
 
 	is_whitelisted(method)
 	is_valid_http_method(method)
+	frappe.rate_limiter.apply_for_method(method, cmd)
 
 	return frappe.call(method, **frappe.form_dict)
 
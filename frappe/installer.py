@@ -179,7 +179,10 @@ def remove_app(app_name, dry_run=False, yes=False, no_backup=False, force=False)
 			frappe.db.sql_ddl("drop table `tab{0}`".format(doctype))
 
 	if not dry_run:
+		from frappe.model.sync import clear_manifest
+
 		remove_from_installed_apps(app_name)
+		clear_manifest(app_name)
 		frappe.db.commit()
 
 	click.secho("Uninstalled App {0} from Site {1}".format(app_name, frappe.local.site), fg="green")
@@ -302,8 +302,9 @@ class BaseDocument(object):
 		fieldname = [df.fieldname for df in self.meta.get_table_fields() if df.options==doctype]
 		return fieldname[0] if fieldname else None
 
-	def db_insert(self):
-		"""INSERT the document (with valid columns) in the database."""
+	def get_db_insert_values(self):
+		"""Set name and timestamps if missing and return the row (dict of valid columns)
+		that will be inserted for this document."""
 		if not self.name:
 			# name will be set by document class in most cases
 			set_new_name(self)
@@ -313,7 +314,11 @@ class BaseDocument(object):
 			self.created_by = self.modified_by = frappe.session.user
 
 		# if doctype is "DocType", don't insert null values as we don't know who is valid yet
-		d = self.get_valid_dict(convert_dates_to_str=True, ignore_nulls = self.doctype in ('DocType', 'DocField', 'DocPerm'))
+		return self.get_valid_dict(convert_dates_to_str=True, ignore_nulls = self.doctype in ('DocType', 'DocField', 'DocPerm'))
+
+	def db_insert(self):
+		"""INSERT the document (with valid columns) in the database."""
+		d = self.get_db_insert_values()
 
 		columns = list(d)
 		try:
@@ -435,17 +440,9 @@ class BaseDocument(object):
 
 		return missing
 
-	def get_invalid_links(self, is_submittable=False):
-		'''Returns list of invalid links and also updates fetch values if not set'''
-		def get_msg(df, docname):
-			if self.parentfield:
-				return "{} #{}: {}: {}".format(_("Row"), self.idx, _(df.label), docname)
-			else:
-				return "{}: {}".format(_(df.label), docname)
-
-		invalid_links = []
-		cancelled_links = []
-
+	def get_links_to_validate(self):
+		'''Yields `(docfield, linked doctype, linked name, fields to fetch)` for each
+		Link and Dynamic Link field that has a value'''
 		for df in (self.meta.get_link_fields()
 				+ self.meta.get("fields", {"fieldtype": ('=', "Dynamic Link")})):
 			docname = self.get(df.fieldname)
@@ -460,8 +457,6 @@ class BaseDocument(object):
 					if not doctype:
 						frappe.throw(_("{0} must be set first").format(self.meta.get_label(df.options)))
 
-				# MySQL is case insensitive. Preserve case of the original docname in the Link Field.
-
 				# get a map of values ot fetch along with this link query
 				# that are mapped as link_fieldname.source_fieldname in Options of
 				# Readonly or Data or Text type fields
@@ -473,38 +468,47 @@ class BaseDocument(object):
 						or (_df.get('fetch_if_empty') and not self.get(_df.fieldname))
 				]
 
-				if not fields_to_fetch:
-					# cache a single value type
-					values = frappe._dict(name=frappe.db.get_value(doctype, docname,
-						'name', cache=True))
-				else:
-					values_to_fetch = ['name'] + [_df.fetch_from.split('.')[-1]
-						for _df in fields_to_fetch]
+				yield df, doctype, docname, fields_to_fetch
+
+	def get_invalid_links(self, is_submittable=False, link_values=None):
+		'''Returns list of invalid links and also updates fetch values if not set
+
+		:param is_submittable: Check for cancelled links (set for children of submittable documents).
+		:param link_values: Values of linked documents as returned by `get_link_values`.
+			If not set, they are fetched for this document only.'''
+		def get_msg(df, docname):
+			if self.parentfield:
+				return "{} #{}: {}: {}".format(_("Row"), self.idx, _(df.label), docname)
+			else:
+				return "{}: {}".format(_(df.label), docname)
 
-					# don't cache if fetching other values too
-					values = frappe.db.get_value(doctype, docname,
-						values_to_fetch, as_dict=True)
+		invalid_links = []
+		cancelled_links = []
+
+		if link_values is None:
+			link_values = get_link_values([self])
 
-				if frappe.get_meta(doctype).issingle:
-					values.name = doctype
+		for df, doctype, docname, fields_to_fetch in self.get_links_to_validate():
+			# MySQL is case insensitive. Preserve case of the original docname in the Link Field.
+			values = link_values.get(get_link_key(doctype, docname)) or frappe._dict(name=None)
 
-				if values:
-					setattr(self, df.fieldname, values.name)
+			setattr(self, df.fieldname, values.name)
 
-					for _df in fields_to_fetch:
-						if self.is_new() or self.docstatus != 1 or _df.allow_on_submit:
-							self.set_fetch_from_value(doctype, _df, values)
+			if values.name:
+				for _df in fields_to_fetch:
+					if self.is_new() or self.docstatus != 1 or _df.allow_on_submit:
+						self.set_fetch_from_value(doctype, _df, values)
 
-					notify_link_count(doctype, docname)
+			notify_link_count(doctype, docname)
 
-					if not values.name:
-						invalid_links.append((df.fieldname, docname, get_msg(df, docname)))
+			if not values.name:
+				invalid_links.append((df.fieldname, docname, get_msg(df, docname)))
 
-					elif (df.fieldname != "amended_from"
-						and (is_submittable or self.meta.is_submittable) and frappe.get_meta(doctype).is_submittable
-						and cint(frappe.db.get_value(doctype, docname, "docstatus"))==2):
+			elif (df.fieldname != "amended_from"
+				and (is_submittable or self.meta.is_submittable) and frappe.get_meta(doctype).is_submittable
+				and cint(values.docstatus)==2):
 
-						cancelled_links.append((df.fieldname, docname, get_msg(df, docname)))
+				cancelled_links.append((df.fieldname, docname, get_msg(df, docname)))
 
 		return invalid_links, cancelled_links
 
@@ -833,6 +837,48 @@ class BaseDocument(object):
 			for df in self.meta.get("fields", {"fieldtype": ('=', "Text Editor")}):
 				extract_images_from_doc(self, df.fieldname)
 
+def get_link_key(doctype, name):
+	'''Key of a linked document in the dict returned by `get_link_values`'''
+	name = cstr(name)
+	if frappe.db.db_type != 'postgres':
+		# MySQL is case insensitive
+		name = name.lower()
+	return (doctype, name)
+
+def get_link_values(docs):
+	'''Returns values of all documents linked from `docs` as a dict of
+	`(doctype, name)` (see `get_link_key`) and values. Values include `name`,
+	`docstatus` of submittable doctypes and the source of fetch_from fields.
+
+	Linked documents are loaded with one query per linked doctype.'''
+	to_fetch = {}
+	for doc in docs:
+		for df, doctype, docname, fields_to_fetch in doc.get_links_to_validate():
+			names, fields = to_fetch.setdefault(doctype, (set(), set(["name"])))
+			names.add(docname)
+			fields.update(_df.fetch_from.split('.')[-1] for _df in fields_to_fetch)
+
+	link_values = {}
+	for doctype, (names, fields) in iteritems(to_fetch):
+		meta = frappe.get_meta(doctype)
+		if meta.is_submittable:
+			fields.add("docstatus")
+
+		if meta.issingle:
+			values = frappe.db.get_value(doctype, doctype, list(fields), as_dict=True) or frappe._dict()
+			values.name = doctype
+			for name in names:
+				link_values[get_link_key(doctype, name)] = values
+			continue
+
+		names = list(names)
+		for i in range(0, len(names), 1000):
+			for values in frappe.get_all(doctype, filters={"name": ("in", names[i:i + 1000])},
+				fields=list(fields)):
+				link_values[get_link_key(doctype, values.name)] = values
+
+	return link_values
+
 def _filter(data, filters, limit=None):
 	"""pass filters as:
 		{"key": "val", "key": ["!=", "val"],
@@ -37,7 +37,8 @@ class DatabaseQuery(object):
 		ignore_permissions=False, user=None, with_comment_count=False,
 		join='left join', distinct=False, start=None, page_length=None, limit=None,
 		ignore_ifnull=False, save_user_settings=False, save_user_settings_fields=False,
-		update=None, add_total_row=None, user_settings=None, reference_doctype=None, return_query=False, strict=True):
+		update=None, add_total_row=None, user_settings=None, reference_doctype=None, return_query=False, strict=True,
+		as_iterator=False):
 		if not ignore_permissions and not frappe.has_permission(self.doctype, "read", user=user):
 			frappe.flags.error_message = _('Insufficient Permission for {0}').format(frappe.bold(self.doctype))
 			raise frappe.PermissionError(self.doctype)
@@ -81,6 +82,7 @@ class DatabaseQuery(object):
 		self.update = update
 		self.user_settings_fields = copy.deepcopy(self.fields)
 		self.return_query = return_query
+		self.as_iterator = as_iterator
 		self.strict = strict
 
 		# for contextual user permission check
@@ -97,7 +99,7 @@ class DatabaseQuery(object):
 			if return_query:
 				return result
 
-		if with_comment_count and not as_list and self.doctype:
+		if with_comment_count and not as_list and not as_iterator and self.doctype:
 			self.add_comment_count(result)
 
 		if save_user_settings:
@@ -126,6 +128,9 @@ class DatabaseQuery(object):
 
 		if self.return_query:
 			return query
+		elif self.as_iterator:
+			return frappe.db.sql_iter(query, as_dict=not self.as_list, as_list=self.as_list,
+				debug=self.debug, update=self.update)
 		else:
 			return frappe.db.sql(query, as_dict=not self.as_list, debug=self.debug, update=self.update)
 
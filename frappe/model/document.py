@@ -7,7 +7,7 @@ import time
 from frappe import _, msgprint
 from frappe.utils import flt, cstr, now, get_datetime_str, file_lock, date_diff
 from frappe.utils.background_jobs import enqueue
-from frappe.model.base_document import BaseDocument, get_controller
+from frappe.model.base_document import BaseDocument, get_controller, get_link_values
 from frappe.model.naming import set_new_name
 from six import iteritems, string_types
 from werkzeug.exceptions import NotFound, Forbidden
@@ -144,7 +144,8 @@ class Document(BaseDocument):
 			self._fix_numeric_types()
 
 		else:
-			d = frappe.db.get_value(self.doctype, self.name, "*", as_dict=1)
+			# matched case insensitively by the database, the name may differ in case
+			d = next(iter(get_parent_values(self.doctype, [self.name]).values()), None)
 			if not d:
 				frappe.throw(_("{0} {1} not found").format(_(self.doctype), self.name), frappe.DoesNotExistError)
 
@@ -156,14 +157,12 @@ class Document(BaseDocument):
 		else:
 			table_fields = self.meta.get_table_fields()
 
+		self.set_children_from_db(table_fields,
+			get_child_values(self.doctype, [self.name], table_fields).get(self.name) or {})
+
+	def set_children_from_db(self, table_fields, children):
 		for df in table_fields:
-			children = frappe.db.get_values(df.options,
-				{"parent": self.name, "parenttype": self.doctype, "parentfield": df.fieldname},
-				"*", as_dict=True, order_by="idx asc")
-			if children:
-				self.set(df.fieldname, children)
-			else:
-				self.set(df.fieldname, [])
+			self.set(df.fieldname, children.get(df.fieldname) or [])
 
 		# sometimes __setup__ can depend on child values, hence calling again at the end
 		if hasattr(self, "__setup__"):
@@ -202,6 +201,31 @@ class Document(BaseDocument):
 		if self.flags.in_print:
 			return
 
+		self.run_before_insert(ignore_permissions=ignore_permissions, ignore_links=ignore_links,
+			ignore_mandatory=ignore_mandatory)
+
+		# run validate, on update etc.
+
+		# parent
+		if getattr(self.meta, "issingle", 0):
+			self.update_single(self.get_valid_dict())
+		else:
+			try:
+				self.db_insert()
+			except frappe.DuplicateEntryError as e:
+				if not ignore_if_duplicate:
+					raise e
+
+		# children
+		for d in self.get_all_children():
+			d.db_insert()
+
+		self.run_after_insert()
+		return self
+
+	def run_before_insert(self, ignore_permissions=None, ignore_links=None, ignore_mandatory=None):
+		"""Run permission checks, naming, validations and `before_insert`, `validate`,
+		`before_save` methods. Called by `insert` before the rows are written."""
 		self.flags.notifications_executed = []
 
 		if ignore_permissions!=None:
@@ -232,25 +256,9 @@ class Document(BaseDocument):
 		self.set_docstatus()
 		self.flags.in_insert = False
 
-		# follow document on document creation
-
-
-		# run validate, on update etc.
-
-		# parent
-		if getattr(self.meta, "issingle", 0):
-			self.update_single(self.get_valid_dict())
-		else:
-			try:
-				self.db_insert()
-			except frappe.DuplicateEntryError as e:
-				if not ignore_if_duplicate:
-					raise e
-
-		# children
-		for d in self.get_all_children():
-			d.db_insert()
-
+	def run_after_insert(self):
+		"""Run `after_insert`, `on_update` methods and follow the document.
+		Called by `insert` after the rows are written."""
 		self.run_method("after_insert")
 		self.flags.in_insert = True
 
@@ -266,7 +274,6 @@ class Document(BaseDocument):
 
 		if not (frappe.flags.in_migrate or frappe.local.flags.in_install or frappe.flags.in_setup_wizard):
 			follow_document(self.doctype, self.name, frappe.session.user)
-		return self
 
 	def save(self, *args, **kwargs):
 		"""Wrapper for _save"""
@@ -753,10 +760,14 @@ class Document(BaseDocument):
 		if self.flags.ignore_links or self._action == "cancel":
 			return
 
-		invalid_links, cancelled_links = self.get_invalid_links()
+		# load all linked documents of parent and children together
+		link_values = get_link_values([self] + self.get_all_children())
+
+		invalid_links, cancelled_links = self.get_invalid_links(link_values=link_values)
 
 		for d in self.get_all_children():
-			result = d.get_invalid_links(is_submittable=self.meta.is_submittable)
+			result = d.get_invalid_links(is_submittable=self.meta.is_submittable,
+				link_values=link_values)
 			invalid_links.extend(result[0])
 			cancelled_links.extend(result[1])
 
@@ -1261,6 +1272,63 @@ class Document(BaseDocument):
 		users = set([assignment.owner for assignment in assignments])
 		return users
 
+def get_docs(doctype, names):
+	"""Returns `Document` objects of `names` (in the same order). Parents are loaded
+	with one query and each child table with one query for all documents.
+
+	:param doctype: DocType of the documents (not a single DocType).
+	:param names: list of document names."""
+	names = list(names)
+	values = get_parent_values(doctype, names)
+
+	# names are matched case insensitively by the database
+	values_by_lower_name = {name.lower(): d for name, d in iteritems(values)}
+	table_fields = frappe.get_meta(doctype).get_table_fields()
+	children = get_child_values(doctype, list(values), table_fields)
+	controller = get_controller(doctype)
+
+	docs = []
+	for name in names:
+		d = values.get(name) or values_by_lower_name.get(cstr(name).lower())
+		if not d:
+			frappe.throw(_("{0} {1} not found").format(_(doctype), name), frappe.DoesNotExistError)
+
+		# through the constructor, controllers may set up attributes in `__init__`
+		d.doctype = doctype
+		doc = controller(d)
+		doc.set_children_from_db(table_fields, children.get(d.name) or {})
+		docs.append(doc)
+
+	return docs
+
+def get_parent_values(doctype, names, chunk_size=1000):
+	"""Returns rows of `names` as `{name: row}`"""
+	out = {}
+	for i in range(0, len(names), chunk_size):
+		chunk = names[i:i + chunk_size]
+		for d in frappe.db.sql("""select * from `tab{doctype}` where name in ({names})""".format(
+				doctype=doctype, names=", ".join(["%s"] * len(chunk))), chunk, as_dict=True):
+			out[d.name] = d
+
+	return out
+
+def get_child_values(doctype, names, table_fields, chunk_size=1000):
+	"""Returns child rows of parents `names` as `{parent: {fieldname: [rows]}}`,
+	with one query per table field (and chunk of names)"""
+	out = {}
+	for df in table_fields:
+		for i in range(0, len(names), chunk_size):
+			chunk = names[i:i + chunk_size]
+			children = frappe.db.sql("""select * from `tab{child}`
+				where parent in ({names}) and parenttype=%s and parentfield=%s
+				order by idx asc""".format(child=df.options, names=", ".join(["%s"] * len(chunk))),
+				chunk + [doctype, df.fieldname], as_dict=True)
+
+			for child in children:
+				out.setdefault(child.parent, {}).setdefault(df.fieldname, []).append(child)
+
+	return out
+
 def execute_action(doctype, name, action, **kwargs):
 	'''Execute an action on a document (called by background worker)'''
 	doc = frappe.get_doc(doctype, name)
@@ -1278,3 +1346,47 @@ def execute_action(doctype, name, action, **kwargs):
 
 		doc.add_comment('Comment', _('Action Failed') + '<br><br>' + msg)
 		doc.notify_update()
+
+def bulk_insert(docs, ignore_permissions=None, ignore_links=None, ignore_mandatory=None, chunk_size=10000):
+	'''Insert many new documents, writing parent and child rows with multi-row INSERTs
+	instead of one INSERT per row.
+
+	Each document runs the same permission checks, naming and validations as
+	`Document.insert`. `after_insert` and `on_update` methods are run once all rows
+	have been written. Links between documents of the same batch are not resolved,
+	as the rows do not exist when links are validated.
+
+	:param docs: list of `Document` objects or document dicts.
+	:param chunk_size: maximum number of rows per INSERT statement.'''
+	docs = [get_doc(d) for d in docs]
+
+	# rows to insert, grouped by (doctype, columns)
+	rows = {}
+	for doc in docs:
+		if doc.meta.issingle:
+			frappe.throw(_("Cannot bulk insert Single DocType {0}").format(frappe.bold(doc.doctype)))
+
+		doc.run_before_insert(ignore_permissions=ignore_permissions, ignore_links=ignore_links,
+			ignore_mandatory=ignore_mandatory)
+
+		for d in [doc] + doc.get_all_children():
+			values = d.get_db_insert_values()
+			rows.setdefault((d.doctype, tuple(values)), []).append(list(values.values()))
+
+	for (doctype, columns), values in iteritems(rows):
+		try:
+			frappe.db.bulk_insert(doctype, columns, values, chunk_size=chunk_size)
+		except Exception as e:
+			if frappe.db.is_primary_key_violation(e):
+				raise frappe.DuplicateEntryError(doctype, None, e)
+			elif frappe.db.is_unique_key_violation(e):
+				raise frappe.UniqueValidationError(doctype, None, e)
+			else:
+				raise
+
+	for doc in docs:
+		for d in [doc] + doc.get_all_children():
+			d.set("__islocal", False)
+		doc.run_after_insert()
+
+	return docs
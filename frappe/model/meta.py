@@ -30,18 +30,34 @@ from frappe import _
 def get_meta(doctype, cached=True):
 	if cached:
 		if not frappe.local.meta_cache.get(doctype):
-			meta = frappe.cache().hget("meta", doctype)
-			if meta:
-				meta = Meta(meta)
-			else:
-				meta = Meta(doctype)
-				frappe.cache().hset('meta', doctype, meta.as_dict())
-			frappe.local.meta_cache[doctype] = meta
+			frappe.local.meta_cache[doctype] = get_cached_meta(doctype)
 
 		return frappe.local.meta_cache[doctype]
 	else:
 		return load_meta(doctype)
 
+def get_cached_meta(doctype):
+	"""Returns `Meta` from the worker process cache if it was built for the current
+	`metadata_version`, else from redis (or the database)."""
+	from frappe.utils.process_cache import get_process_cache
+
+	version = frappe.cache().get_value("metadata_version") or frappe.reset_metadata_version()
+	process_cache = get_process_cache("meta_cache")
+
+	cached = process_cache.get(doctype)
+	if cached and cached[0] == version:
+		return cached[1]
+
+	meta = frappe.cache().hget("meta", doctype)
+	if meta:
+		meta = Meta(meta)
+	else:
+		meta = Meta(doctype)
+		frappe.cache().hset('meta', doctype, meta.as_dict())
+
+	process_cache.set(doctype, (version, meta))
+	return meta
+
 def load_meta(doctype):
 	return Meta(doctype)
 
@@ -5,43 +5,76 @@ from __future__ import unicode_literals, print_function
 """
 	Sync's doctype and docfields from txt files to database
 	perms will get synced only if none exist
+
+	The content hash of each synced file is stored in a sync manifest (rows of
+	`tabDefaultValue` with parent `__sync_manifest`) along with the doctype, name
+	and modified timestamp of its document. Files that did not change since they
+	were last synced are skipped, unless their document was deleted or modified
+	in the database since (checked with one query per doctype).
+
+	Set in site (or common) config to import changed files in worker processes:
+
+		"sync_workers": 4
+
+	Files are imported in groups, DocTypes first and then other documents.
+	Files of a group are imported in parallel, files that fail in a worker
+	(e.g. on a deadlock) are imported again one by one. Apps are always synced
+	in this process while they are being installed.
 """
 import frappe
 import os
-from frappe.modules.import_file import import_file_by_path
+import time
+import hashlib
+import json
+import multiprocessing
+from frappe.modules.import_file import import_file_by_path, read_doc_from_file
 from frappe.modules.patch_handler import block_user
-from frappe.utils import update_progress_bar
+from frappe.utils import update_progress_bar, cint, now, get_datetime_str
+
+MANIFEST_PARENT = "__sync_manifest"
+# length of `defkey`, longer keys are hashed
+MAX_KEY_LENGTH = 140
+
+default_workers = 1
+
+# these need to go first at time of install
+frappe_core_doctypes = (("core", "docfield"),
+	("core", "docperm"),
+	("core", "role"),
+	("core", "has_role"),
+	("core", "doctype"),
+	("core", "user"),
+	("custom", "custom_field"),
+	("custom", "property_setter"),
+	("website", "web_form"),
+	("website", "web_form_field"),
+	("website", "portal_menu_item"),
+	("data_migration", "data_migration_mapping_detail"),
+	("data_migration", "data_migration_mapping"),
+	("data_migration", "data_migration_plan_mapping"),
+	("data_migration", "data_migration_plan"))
 
 def sync_all(force=0, verbose=False, reset_permissions=False):
 	block_user(True)
 
+	summary = []
 	for app in frappe.get_installed_apps():
-		sync_for(app, force, verbose=verbose, reset_permissions=reset_permissions)
+		summary.append(sync_for(app, force, verbose=verbose, reset_permissions=reset_permissions))
 
 	block_user(False)
 
 	frappe.clear_cache()
 
+	print_summary(summary)
+
 def sync_for(app_name, force=0, sync_everything = False, verbose=False, reset_permissions=False):
+	"""Import changed DocType, Page, Report etc. files of `app_name`.
+	Returns a dict with counts of files and time taken."""
+	start = time.time()
 	files = []
 
 	if app_name == "frappe":
-		# these need to go first at time of install
-		for d in (("core", "docfield"),
-			("core", "docperm"),
-			("core", "role"),
-			("core", "has_role"),
-			("core", "doctype"),
-			("core", "user"),
-			("custom", "custom_field"),
-			("custom", "property_setter"),
-			("website", "web_form"),
-			("website", "web_form_field"),
-			("website", "portal_menu_item"),
-			("data_migration", "data_migration_mapping_detail"),
-			("data_migration", "data_migration_mapping"),
-			("data_migration", "data_migration_plan_mapping"),
-			("data_migration", "data_migration_plan")):
+		for d in frappe_core_doctypes:
 			files.append(os.path.join(frappe.get_app_path("frappe"), d[0],
 				"doctype", d[1], d[1] + ".json"))
 
@@ -49,21 +82,52 @@ def sync_for(app_name, force=0, sync_everything = False, verbose=False, reset_pe
 		folder = os.path.dirname(frappe.get_module(app_name + "." + module_name).__file__)
 		get_doc_files(files, folder, force, sync_everything, verbose=verbose)
 
-	l = len(files)
-	if l:
-		for i, doc_path in enumerate(files):
-			import_file_by_path(doc_path, force=force, ignore_version=True,
-				reset_permissions=reset_permissions, for_sync=True)
-			#print module_name + ' | ' + doctype + ' | ' + name
+	manifest = get_manifest(app_name)
+	hashes = {}
+	changed, unchanged = set(), []
+	for doc_path in files:
+		key = get_manifest_key(app_name, doc_path)
+		hashes[key] = get_file_hash(doc_path)
+		entry = manifest.get(key)
+		if force or not entry or entry.hash != hashes[key]:
+			changed.add(doc_path)
+		else:
+			unchanged.append((doc_path, entry))
 
-			frappe.db.commit()
+	changed.update(get_changed_documents(unchanged))
+	# keep the order of files, core doctypes go first
+	changed = [doc_path for doc_path in files if doc_path in changed]
+
+	stats = frappe._dict(app=app_name, files=len(files), imported=len(changed), retried=0)
 
-			# show progress bar
-			update_progress_bar("Updating DocTypes for {0}".format(app_name), i, l)
+	if changed:
+		workers = get_workers()
+		label = "Updating DocTypes for {0}".format(app_name)
+		done = 0
+
+		for group, parallel in get_import_groups(app_name, changed):
+			if parallel and workers > 1 and len(group) > 1:
+				failed = import_in_workers(group, workers, label, done, len(changed),
+					force=force, reset_permissions=reset_permissions)
+				stats.retried += len(failed)
+			else:
+				failed = group
+
+			for i, doc_path in enumerate(failed):
+				import_doc_file(doc_path, force=force, reset_permissions=reset_permissions)
+				update_progress_bar(label, done + i, len(changed))
+
+			update_manifest(dict((key, get_manifest_value(hashes[key], doc_path)) for key, doc_path in
+				((get_manifest_key(app_name, doc_path), doc_path) for doc_path in group)))
+			frappe.db.commit()
+			done += len(group)
 
 		# print each progress bar on new line
 		print()
 
+	stats.time = time.time() - start
+	return stats
+
 def get_doc_files(files, start_path, force=0, sync_everything = False, verbose=False):
 	"""walk and sync all doctypes and pages"""
 
@@ -80,3 +144,173 @@ def get_doc_files(files, start_path, force=0, sync_everything = False, verbose=F
 					if os.path.exists(doc_path):
 						if not doc_path in files:
 							files.append(doc_path)
+
+def get_import_groups(app_name, files):
+	"""Returns `(files, parallel)` groups in the order they must be imported:
+	frappe's core doctypes one by one, then other DocTypes and then other documents
+	(Reports, Print Formats etc. of these DocTypes)"""
+	core_doctypes, doctypes, others = [], [], []
+
+	core_doctype_paths = [os.path.join(frappe.get_app_path("frappe"), d[0], "doctype", d[1], d[1] + ".json")
+		for d in frappe_core_doctypes] if app_name == "frappe" else []
+
+	for doc_path in files:
+		if doc_path in core_doctype_paths:
+			core_doctypes.append(doc_path)
+		elif os.path.basename(os.path.dirname(os.path.dirname(doc_path))) == "doctype":
+			doctypes.append(doc_path)
+		else:
+			others.append(doc_path)
+
+	return [(group, parallel) for group, parallel in ((core_doctypes, False), (doctypes, True), (others, True))
+		if group]
+
+def import_doc_file(doc_path, force=0, reset_permissions=False):
+	import_file_by_path(doc_path, force=force, ignore_version=True,
+		reset_permissions=reset_permissions, for_sync=True)
+	frappe.db.commit()
+
+def import_in_workers(files, workers, label, done, total, force=0, reset_permissions=False):
+	"""Import `files` in a pool of `workers` processes. Returns the files that failed."""
+	failed = []
+
+	# workers are forked and connect to the database on their own
+	frappe.db.commit()
+	frappe.db.close()
+
+	pool = multiprocessing.Pool(min(workers, len(files)), initializer=init_sync_worker)
+	try:
+		tasks = [(doc_path, force, reset_permissions) for doc_path in files]
+		for i, (doc_path, touched_tables, error) in enumerate(pool.imap_unordered(import_in_worker, tasks)):
+			if error:
+				failed.append(doc_path)
+			elif touched_tables and frappe.flags.touched_tables is not None:
+				frappe.flags.touched_tables.update(touched_tables)
+
+			update_progress_bar(label, done + i, total)
+	finally:
+		pool.close()
+		pool.join()
+		frappe.db.connect()
+
+	# documents imported by workers are not in caches of this process
+	frappe.local.cache = {}
+	frappe.local.meta_cache = {}
+	frappe.local.document_cache = {}
+
+	return failed
+
+def init_sync_worker():
+	frappe.db.connect()
+	if frappe.flags.touched_tables is not None:
+		frappe.flags.touched_tables = set()
+
+def import_in_worker(args):
+	doc_path, force, reset_permissions = args
+	try:
+		import_doc_file(doc_path, force=force, reset_permissions=reset_permissions)
+	except Exception:
+		frappe.db.rollback()
+		return doc_path, None, frappe.get_traceback()
+
+	touched_tables = list(frappe.flags.touched_tables or [])
+	if frappe.flags.touched_tables is not None:
+		frappe.flags.touched_tables = set()
+
+	return doc_path, touched_tables, None
+
+def get_workers():
+	if frappe.flags.in_install:
+		return 1
+
+	return max(cint(frappe.conf.get("sync_workers") or default_workers), 1)
+
+def get_file_hash(path):
+	with open(path, "rb") as f:
+		return hashlib.md5(f.read()).hexdigest() #nosec
+
+def get_manifest_key(app_name, doc_path):
+	key = app_name + "/" + os.path.relpath(doc_path, frappe.get_app_path(app_name)).replace(os.sep, "/")
+	if len(key) > MAX_KEY_LENGTH:
+		key = app_name + "/" + hashlib.md5(frappe.safe_encode(key)).hexdigest() #nosec
+
+	return key
+
+def get_manifest_value(file_hash, doc_path):
+	"""Returns the content hash of the file with doctype, name and modified of its document"""
+	doc = read_doc_from_file(doc_path)
+	if isinstance(doc, list):
+		doc = doc[0] if doc else {}
+
+	return json.dumps([file_hash, doc.get("doctype"), doc.get("name"), doc.get("modified")])
+
+def get_manifest(app_name):
+	"""Returns `{manifest key: {hash, doctype, name, modified}}` of files of `app_name`
+	synced earlier"""
+	manifest = {}
+	for key, value in frappe.db.sql("""select defkey, defvalue from `tabDefaultValue`
+		where parent=%s and defkey like %s""", (MANIFEST_PARENT, app_name + "/%")):
+		try:
+			file_hash, doctype, name, modified = json.loads(value)
+		except ValueError:
+			# only the content hash, document is not checked
+			file_hash, doctype, name, modified = value, None, None, None
+
+		manifest[key] = frappe._dict(hash=file_hash, doctype=doctype, name=name, modified=modified)
+
+	return manifest
+
+def get_changed_documents(entries, chunk_size=500):
+	"""Returns paths of unchanged files, `[(doc_path, manifest entry)]`, whose documents
+	were deleted or modified in the database since they were synced"""
+	by_doctype = {}
+	for doc_path, entry in entries:
+		# singles keep their timestamp in `tabSingles`
+		if entry.doctype and entry.name and entry.doctype != entry.name:
+			by_doctype.setdefault(entry.doctype, []).append((doc_path, entry))
+
+	changed = []
+	tables = frappe.db.get_tables() if by_doctype else []
+	for doctype, doctype_entries in by_doctype.items():
+		modified = {}
+		if ("tab" + doctype) in tables:
+			names = [entry.name for doc_path, entry in doctype_entries]
+			for i in range(0, len(names), chunk_size):
+				chunk = names[i:i + chunk_size]
+				modified.update(frappe.db.sql("""select name, modified from `tab{0}` where name in ({1})""".format(
+					doctype, ", ".join(["%s"] * len(chunk))), chunk))
+
+		for doc_path, entry in doctype_entries:
+			if entry.name not in modified or (entry.modified
+				and get_datetime_str(modified[entry.name]) != entry.modified):
+				changed.append(doc_path)
+
+	return changed
+
+def update_manifest(hashes, chunk_size=500):
+	keys = list(hashes)
+	timestamp = now()
+
+	for i in range(0, len(keys), chunk_size):
+		chunk = keys[i:i + chunk_size]
+		frappe.db.sql("""delete from `tabDefaultValue` where parent=%s and defkey in ({0})""".format(
+			", ".join(["%s"] * len(chunk))), [MANIFEST_PARENT] + chunk)
+
+		frappe.db.bulk_insert("DefaultValue",
+			["name", "creation", "modified", "owner", "modified_by", "parent", "parenttype", "parentfield", "defkey", "defvalue"],
+			[(frappe.generate_hash(length=10), timestamp, timestamp, "Administrator", "Administrator",
+				MANIFEST_PARENT, MANIFEST_PARENT, "system_defaults", key, hashes[key]) for key in chunk])
+
+def clear_manifest(app_name=None):
+	"""Forget synced files of `app_name` (or all apps), so that they are imported
+	(if their timestamps changed) on the next sync"""
+	if app_name:
+		frappe.db.sql("""delete from `tabDefaultValue` where parent=%s and defkey like %s""",
+			(MANIFEST_PARENT, app_name + "/%"))
+	else:
+		frappe.db.sql("""delete from `tabDefaultValue` where parent=%s""", MANIFEST_PARENT)
+
+def print_summary(summary):
+	print("Synced DocTypes in {0:.2f}s".format(sum(stats.time for stats in summary)))
+	for stats in summary:
+		print("  {app}: {imported} of {files} files imported ({retried} retried) in {time:.2f}s".format(**stats))
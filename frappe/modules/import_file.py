@@ -9,7 +9,7 @@ from frappe.utils import get_datetime_str
 from frappe.model.base_document import get_controller
 
 ignore_values = {
-	"Report": ["disabled", "prepared_report", "add_total_row"],
+	"Report": ["disabled", "prepared_report", "add_total_row", "cache_results", "cache_ttl", "cache_dependencies"],
 	"Print Format": ["disabled"],
 	"Notification": ["enabled"],
 	"Print Style": ["disabled"]
@@ -4,27 +4,66 @@
 
 from __future__ import unicode_literals
 
+from collections import Counter
 from datetime import datetime
+import atexit
 import json
+import random
+import sys
+import time
 import traceback
 import frappe
 import os
 import uuid
 import rq
+from six import iteritems
+from frappe.utils import cint, flt
 
 
 MONITOR_REDIS_KEY = "monitor-transactions"
+MONITOR_HISTOGRAM_KEY = "monitor-histogram"
 MONITOR_MAX_ENTRIES = 1000000
 
+# upper bounds (in milliseconds) of the buckets of the latency histograms
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Settings in site config:
+#
+# 	"monitor": 1,
+# 	"monitor_sample_rate": 0.1,  # fraction of requests and jobs that are logged (default: 1)
+# 	"monitor_buffer_size": 100,  # entries kept in the process before they are written (default: 100)
+# 	"monitor_flush_interval": 5  # seconds after which buffered entries are written (default: 5)
+#
+# Entries are buffered per process (requests only, jobs run in a forked process
+# and are written right away) and written along with the latency histograms in
+# one pipelined round trip, buffered entries are also written when the process exits.
+#
+# Histograms are kept for whitelisted methods, DocTypes of `/api/resource` and
+# first segments of other paths, requests to anything else (not found or failed)
+# are counted under "request:other", so that clients can not add arbitrary fields.
+default_buffer_size = 100
+default_flush_interval = 5
+
+_buffer = []
+_histogram = Counter()
+_last_flush = time.time()
+
 
 def start(transaction_type="request", method=None, kwargs=None):
-	if frappe.conf.monitor:
+	if frappe.conf.monitor and is_sampled():
 		frappe.local.monitor = Monitor(transaction_type, method, kwargs)
 
 
 def stop(response=None):
 	if hasattr(frappe.local, "monitor"):
-		frappe.local.monitor.dump(response)
+		monitor = frappe.local.monitor
+		del frappe.local.monitor
+		monitor.dump(response)
+
+
+def is_sampled():
+	sample_rate = frappe.conf.monitor_sample_rate
+	return sample_rate is None or random.random() < flt(sample_rate)
 
 
 def log_file():
@@ -40,6 +79,8 @@ class Monitor:
 					"timestamp": datetime.utcnow(),
 					"transaction_type": transaction_type,
 					"uuid": str(uuid.uuid4()),
+					"sql": frappe._dict({"count": 0, "duration": 0}),
+					"redis": frappe._dict({"count": 0, "duration": 0}),
 				}
 			)
 
@@ -71,6 +112,16 @@ class Monitor:
 			waitdiff = self.data.timestamp - job.enqueued_at
 			self.data.job.wait = int(waitdiff.total_seconds() * 1000000)
 
+	def add_sql_time(self, seconds):
+		"""Called by `Database.sql` for every query"""
+		self.data.sql.count += 1
+		self.data.sql.duration += int(seconds * 1000000)
+
+	def add_redis_time(self, seconds):
+		"""Called by `RedisWrapper` for every command"""
+		self.data.redis.count += 1
+		self.data.redis.duration += int(seconds * 1000000)
+
 	def dump(self, response=None):
 		try:
 			timediff = datetime.utcnow() - self.data.timestamp
@@ -92,10 +143,110 @@ class Monitor:
 			traceback.print_exc()
 
 	def store(self):
-		if frappe.cache().llen(MONITOR_REDIS_KEY) > MONITOR_MAX_ENTRIES:
-			frappe.cache().ltrim(MONITOR_REDIS_KEY, 1, -1)
+		cache = frappe.cache()
 		serialized = json.dumps(self.data, sort_keys=True, default=str)
-		frappe.cache().rpush(MONITOR_REDIS_KEY, serialized)
+		_buffer.append((cache.make_key(MONITOR_REDIS_KEY), serialized))
+		add_to_histogram(cache.make_key(MONITOR_HISTOGRAM_KEY), self.get_endpoint(),
+			self.data.duration)
+
+		if (self.data.transaction_type != "request"
+			or len(_buffer) >= (cint(frappe.conf.monitor_buffer_size) or default_buffer_size)
+			or time.time() - _last_flush >= (flt(frappe.conf.monitor_flush_interval) or default_flush_interval)):
+			flush_buffer()
+
+	def get_endpoint(self):
+		"""Name under which the duration is added to the latency histogram"""
+		if self.data.transaction_type != "request":
+			return "{0}:{1}".format(self.data.transaction_type, self.data.job.method)
+
+		path = self.data.request.path
+		status_code = self.data.request.status_code
+		endpoint = None
+
+		if frappe.form_dict.cmd or path.startswith("/api/method/"):
+			endpoint = get_whitelisted_method(frappe.form_dict.cmd or path.split("/")[3])
+		elif status_code == 404:
+			pass
+		elif path.startswith("/api/resource/"):
+			# without document names
+			endpoint = "/".join(path.split("/")[:4])
+		elif status_code < 400:
+			endpoint = "/" + path.split("/")[1]
+
+		return "request:" + (endpoint or "other")
+
+
+def get_whitelisted_method(cmd):
+	"""Returns `cmd` if it is the name of a whitelisted method. Methods are not imported
+	here, methods called by the request are already imported by the handler."""
+	if cmd in frappe.get_hooks("override_whitelisted_methods", {}):
+		return cmd
+
+	modulename, _, methodname = cmd.rpartition(".")
+	module = sys.modules.get(modulename or "frappe.handler")
+	if module and getattr(module, methodname, None) in frappe.whitelisted:
+		return cmd
+
+
+def add_to_histogram(key, endpoint, duration):
+	"""Count `duration` (microseconds) in the bucket of the endpoint, along with the
+	count and sum of durations"""
+	milliseconds = duration / 1000.0
+	bucket = next((b for b in HISTOGRAM_BUCKETS if milliseconds <= b), "inf")
+
+	_histogram[(key, "{0}|le_{1}".format(endpoint, bucket))] += 1
+	_histogram[(key, endpoint + "|count")] += 1
+	_histogram[(key, endpoint + "|sum")] += duration
+
+
+def flush_buffer():
+	"""Write buffered entries and histogram counts of this process in one round trip"""
+	global _buffer, _histogram, _last_flush
+
+	entries, histogram = _buffer, _histogram
+	_buffer, _histogram, _last_flush = [], Counter(), time.time()
+
+	if not (entries or histogram):
+		return
+
+	entries_by_key = {}
+	for key, entry in entries:
+		entries_by_key.setdefault(key, []).append(entry)
+
+	try:
+		pipeline = frappe.cache().pipeline(transaction=False)
+		for key, key_entries in iteritems(entries_by_key):
+			pipeline.rpush(key, *key_entries)
+			pipeline.ltrim(key, -MONITOR_MAX_ENTRIES, -1)
+
+		for (key, field), value in iteritems(histogram):
+			pipeline.hincrby(key, field, value)
+
+		pipeline.execute()
+	except Exception:
+		traceback.print_exc()
+
+
+atexit.register(flush_buffer)
+
+
+def get_histogram():
+	"""Returns latency histograms of this site by endpoint, e.g.
+
+		{"request:frappe.ping": {"count": 10, "sum": 21000, "buckets": {"5": 8, "10": 2}}}
+
+	`sum` is in microseconds, bucket names are upper bounds in milliseconds."""
+	out = {}
+	cache = frappe.cache()
+	for field, value in cache.hscan_iter(cache.make_key(MONITOR_HISTOGRAM_KEY)):
+		endpoint, name = frappe.safe_decode(field).rsplit("|", 1)
+		histogram = out.setdefault(endpoint, {"count": 0, "sum": 0, "buckets": {}})
+		if name.startswith("le_"):
+			histogram["buckets"][name[3:]] = cint(value)
+		else:
+			histogram[name] = cint(value)
+
+	return out
 
 
 def flush():
@@ -102,6 +102,11 @@ frappe.Application = Class.extend({
 			}
 		});
 
+		// boot info sections shared by all users changed
+		frappe.realtime.on("boot_sections_changed", frappe.utils.debounce(() => {
+			this.refresh_bootinfo();
+		}, 5000));
+
 		frappe.realtime.on("version-update", function() {
 			var dialog = frappe.msgprint({
 				message:__("The application has been updated to a new version, please refresh this page"),
@@ -248,6 +253,25 @@ frappe.Application = Class.extend({
 		}
 	},
 
+	refresh_bootinfo: function() {
+		// fetch only the sections of boot info whose content changed
+		return frappe.call({
+			method: "frappe.sessions.get_boot_sections",
+			type: "GET",
+			args: {
+				hashes: JSON.stringify(frappe.boot.boot_hashes || {})
+			}
+		}).then(r => {
+			if (!r.message) return;
+
+			$.each(r.message.sections, (name, section) => {
+				$.extend(frappe.boot, section);
+			});
+			frappe.boot.boot_hashes = r.message.hashes;
+			this.load_bootinfo();
+		});
+	},
+
 	load_user_permissions: function() {
 		frappe.defaults.update_user_permissions();
 
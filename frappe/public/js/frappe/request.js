@@ -113,6 +113,10 @@ frappe.request.call = function(opts) {
 		200: function(data, xhr) {
 			opts.success_callback && opts.success_callback(data, xhr.responseText);
 		},
+		304: function(data, xhr) {
+			// not modified (ETag matched If-None-Match), there is no body
+			opts.success_callback && opts.success_callback({}, "");
+		},
 		401: function(xhr) {
 			if(frappe.app.session_expired_dialog && frappe.app.session_expired_dialog.display) {
 				frappe.app.redirect_to_login();
@@ -220,6 +224,7 @@ frappe.request.call = function(opts) {
 		.done(function(data, textStatus, xhr) {
 			try {
 				if(typeof data === "string") data = JSON.parse(data);
+				if(!data) data = {};
 
 				// sync attached docs
 				if(data.docs || data.docinfo) {
@@ -1368,6 +1368,13 @@ frappe.views.ReportView = class ReportView extends frappe.views.ListView {
 						});
 					}
 
+					fields.push({
+						fieldtype: 'Check',
+						fieldname: 'export_in_background',
+						label: __('Export in Background'),
+						description: __('You will be notified with a link to the file once it is ready')
+					});
+
 					const d = new frappe.ui.Dialog({
 						title: __("Export Report: {0}",[__(this.doctype)]),
 						fields: fields,
@@ -1393,7 +1400,15 @@ frappe.views.ReportView = class ReportView extends frappe.views.ListView {
 								delete args.page_length;
 							}
 
-							open_url_post(frappe.request.url, args);
+							if (data.export_in_background) {
+								args.export_in_background = 1;
+								frappe.call({
+									method: args.cmd,
+									args: args
+								});
+							} else {
+								open_url_post(frappe.request.url, args);
+							}
 
 							d.hide();
 						},
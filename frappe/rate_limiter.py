@@ -10,35 +10,144 @@ from frappe import _
 from frappe.utils import cint
 from werkzeug.wrappers import Response
 
+# Site wide limits are set in site config. The limit is the time (in seconds) that
+# requests may take in the window, e.g. 10 minutes in any hour for each user:
+#
+# 	"rate_limit": {"limit": 600, "window": 3600, "key": "user"}
+#
+# `key` is one of "site" (default, one counter for the site), "user" (ip address for
+# Guest), "ip", "api_key" (the API key the request is authenticated with, requests
+# are counted by ip address until the key is authenticated) or "endpoint". Whitelisted methods can also limit the number of calls:
+#
+# 	@frappe.whitelist(allow_guest=True, rate_limit={"limit": 5, "window": 60, "key": "ip"})
+#
+# Usage is counted over a sliding window: the counter of the previous window is
+# weighed by how much of it overlaps the window ending now. It is checked (and for
+# method limits, charged) with one atomic script call.
+
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+local limit, window, spent, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+
+local used = current + math.floor(previous * (window - spent) / window)
+if used + cost > limit then
+	return {used, 0}
+end
+
+if cost > 0 then
+	redis.call("INCRBY", KEYS[1], cost)
+	redis.call("EXPIRE", KEYS[1], window * 2)
+end
+
+return {used + cost, 1}
+"""
+
+_script = None
+
 
 def apply():
 	rate_limit = frappe.conf.rate_limit
 	if rate_limit:
-		frappe.local.rate_limiter = RateLimiter(rate_limit["limit"], rate_limit["window"])
+		frappe.local.rate_limiter = RateLimiter(rate_limit["limit"], rate_limit["window"],
+			scope=get_scope(rate_limit.get("key")))
 		frappe.local.rate_limiter.apply()
 
 
+def apply_for_method(method, cmd):
+	"""Check (and count) the call of a whitelisted method declared with `rate_limit`"""
+	rate_limit = frappe.rate_limited_methods.get(method)
+	if rate_limit:
+		frappe.local.method_rate_limiter = MethodRateLimiter(rate_limit["limit"], rate_limit["window"],
+			scope=get_scope(rate_limit.get("key", "user"), prefix="method:" + cmd))
+		frappe.local.method_rate_limiter.apply()
+
+
+def apply_for_api_key():
+	"""Called once the request is authenticated with an API key, counts it against the key
+	instead of the ip address"""
+	rate_limit = frappe.conf.rate_limit
+	if rate_limit and rate_limit.get("key") == "api_key":
+		apply()
+
+
 def update():
 	if hasattr(frappe.local, "rate_limiter"):
 		frappe.local.rate_limiter.update()
 
 
 def respond():
+	for limiter in get_limiters():
+		if limiter.rejected:
+			return limiter.respond()
+
+
+def headers():
+	out = {}
+	for limiter in reversed(get_limiters()):
+		out.update(limiter.headers())
+	return out
+
+
+def get_limiters():
+	"""Returns active limiters, a rejected method limiter first"""
+	limiters = []
+	if getattr(frappe.local, "method_rate_limiter", None) and frappe.local.method_rate_limiter.rejected:
+		limiters.append(frappe.local.method_rate_limiter)
 	if hasattr(frappe.local, "rate_limiter"):
-		return frappe.local.rate_limiter.respond()
+		limiters.append(frappe.local.rate_limiter)
+	return limiters
+
+
+def get_scope(key, prefix=None):
+	"""Returns the name of the counter to use for `key`"""
+	scope = None
+	user = frappe.session and frappe.session.user
+	if key == "user" and user and user != "Guest":
+		scope = "user:" + user
+	elif key == "api_key" and get_api_key():
+		scope = "api_key:" + get_api_key()
+	elif key == "endpoint":
+		scope = None if prefix else "endpoint:" + (frappe.form_dict.cmd or frappe.request.path)
+	elif key in ("user", "ip", "api_key"):
+		scope = "ip:{0}".format(frappe.local.request_ip)
+
+	if prefix:
+		return "{0}:{1}".format(prefix, scope) if scope else prefix
+
+	return scope
+
+
+def get_api_key():
+	"""API key the request is authenticated with, keys sent by the client are not used
+	until they are validated (counters of made up keys would not be limited)"""
+	return getattr(frappe.local, "api_key", None)
+
+
+def get_script():
+	global _script
+	if not _script:
+		_script = frappe.cache().register_script(SLIDING_WINDOW_SCRIPT)
+	return _script
 
 
 class RateLimiter:
-	def __init__(self, limit, window):
-		self.limit = int(limit * 1000000)
+	# added to the counter when checking the limit, the duration of the request
+	# is added after the request
+	cost = 0
+
+	def __init__(self, limit, window, scope=None):
+		self.limit = self.get_limit(limit)
 		self.window = window
 
 		self.start = datetime.utcnow()
 		timestamp = get_timestamp()
 
 		self.window_number, self.spent = divmod(timestamp, self.window)
-		self.key = frappe.cache().make_key("rate-limit-counter-{}".format(self.window_number))
-		self.counter = cint(frappe.cache().get(self.key))
+		self.key = self.get_key(scope, self.window_number)
+		self.previous_key = self.get_key(scope, self.window_number - 1)
+
+		self.counter, self.allowed = self.check()
 		self.remaining = max(self.limit - self.counter, 0)
 		self.reset = self.window - self.spent
 
@@ -46,8 +155,25 @@ class RateLimiter:
 		self.duration = None
 		self.rejected = False
 
+	def get_limit(self, limit):
+		# in microseconds
+		return int(limit * 1000000)
+
+	def get_key(self, scope, window_number):
+		if scope:
+			key = "rate-limit-counter-{0}-{1}".format(scope, window_number)
+		else:
+			key = "rate-limit-counter-{}".format(window_number)
+		return frappe.cache().make_key(key)
+
+	def check(self):
+		"""Returns usage of the sliding window and whether `cost` is within the limit"""
+		counter, allowed = get_script()(keys=[self.key, self.previous_key],
+			args=[self.limit, self.window, self.spent, self.cost], client=frappe.cache())
+		return cint(counter), bool(allowed)
+
 	def apply(self):
-		if self.counter > self.limit:
+		if not self.allowed:
 			self.rejected = True
 			self.reject()
 
@@ -60,7 +186,8 @@ class RateLimiter:
 
 		pipeline = frappe.cache().pipeline()
 		pipeline.incrby(self.key, self.duration)
-		pipeline.expire(self.key, self.window)
+		# the counter is used as the previous window of the next one
+		pipeline.expire(self.key, self.window * 2)
 		pipeline.execute()
 
 	def headers(self):
@@ -81,6 +208,22 @@ class RateLimiter:
 			return Response(_("Too Many Requests"), status=429)
 
 
+class MethodRateLimiter(RateLimiter):
+	"""Limits the number of calls, a call is counted when the limit is checked"""
+	cost = 1
+
+	def get_limit(self, limit):
+		return cint(limit)
+
+	def update(self):
+		pass
+
+	def headers(self):
+		headers = super(MethodRateLimiter, self).headers()
+		headers.pop("X-RateLimit-Used", None)
+		return headers
+
+
 def get_timestamp():
 	now = frappe.utils.now_datetime()
 	epoch = datetime(1970, 1, 1)
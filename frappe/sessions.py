@@ -8,6 +8,7 @@ Boot session from cache or build
 Session bootstraps info needed by common client side activities including
 permission, homepage, default variables, system defaults etc
 """
+import ast
 import frappe, json
 from frappe import _
 import frappe.utils
@@ -18,9 +19,14 @@ import frappe.translate
 from frappe.utils.change_log import get_change_log
 import redis
 from six.moves.urllib.parse import unquote
-from six import text_type
+from six import text_type, iteritems
 from frappe.cache_manager import clear_user_cache
 
+# sessions are kept in redis with their expiry, the sessions table is only
+# updated once in this many seconds per session (overridden by
+# `session_db_update_interval` in site config)
+default_db_update_interval = 600
+
 @frappe.whitelist()
 def clear(user=None):
 	frappe.local.session_obj.update(force=True)
@@ -78,8 +84,8 @@ def get_sessions_to_clear(user=None, keep_current=False, device=None):
 def delete_session(sid=None, user=None, reason="Session Expired"):
 	from frappe.core.doctype.activity_log.feed import logout_feed
 
-	frappe.cache().hdel("session", sid)
-	frappe.cache().hdel("last_db_session_update", sid)
+	if sid:
+		frappe.cache().delete_value(get_session_cache_key(sid))
 	if sid and not user:
 		user_details = frappe.db.sql("""select user from tabSessions where sid=%s""", sid, as_dict=True)
 		if user_details: user = user_details[0].get("user")
@@ -112,23 +118,12 @@ def clear_expired_sessions():
 		delete_session(sid, reason="Session Expired")
 
 def get():
-
 	"""get session boot info"""
 	from frappe.boot import get_bootinfo, get_unseen_notes
 
-	bootinfo = None
-	if not getattr(frappe.conf,'disable_session_cache', None):
-		# check if cache exists
-		bootinfo = frappe.cache().hget("bootinfo", frappe.session.user)
-		if bootinfo:
-			bootinfo['from_cache'] = 1
-			bootinfo["user"]["recent"] = json.dumps(\
-				frappe.cache().hget("user_recent", frappe.session.user))
-
-	if not bootinfo:
-		# if not create it
-		bootinfo = get_bootinfo()
-		frappe.cache().hset("bootinfo", frappe.session.user, bootinfo)
+	bootinfo = get_bootinfo(use_cache=not getattr(frappe.conf, 'disable_session_cache', None))
+
+	if not bootinfo.from_cache:
 		try:
 			frappe.cache().ping()
 		except redis.exceptions.ConnectionError:
@@ -159,6 +154,34 @@ def get():
 
 	return bootinfo
 
+@frappe.whitelist()
+def get_boot_sections(hashes=None):
+	"""Returns the sections of boot info that changed, as `{"hashes": ..., "sections": ...}`.
+
+	:param hashes: content hashes of the sections the client has (`frappe.boot.boot_hashes`)
+
+	The ETag of the response is made of all section hashes, if it matches
+	`If-None-Match` nothing is returned (304)."""
+	from frappe.boot import load_boot_sections, get_content_hash
+
+	hashes = frappe.parse_json(hashes) or {}
+	bootinfo, sections, rebuilt = load_boot_sections(
+		use_cache=not getattr(frappe.conf, 'disable_session_cache', None))
+
+	boot_hashes = {name: entry["hash"] for name, entry in iteritems(sections)}
+	etag = get_content_hash(boot_hashes)
+
+	frappe.response["etag"] = etag
+	if frappe.request and frappe.request.if_none_match.contains(etag):
+		frappe.response["http_status_code"] = 304
+		return
+
+	return {
+		"hashes": boot_hashes,
+		"sections": {name: entry["data"] for name, entry in iteritems(sections)
+			if hashes.get(name) != entry["hash"]}
+	}
+
 def get_csrf_token():
 	if not frappe.local.session.data.csrf_token:
 		generate_csrf_token()
@@ -185,7 +208,7 @@ class Session:
 		self.user_type = user_type
 		self.full_name = full_name
 		self.data = frappe._dict({'data': frappe._dict({})})
-		self.time_diff = None
+		self.last_db_update = None
 
 		# set local session
 		frappe.local.session = self.data
@@ -243,10 +266,18 @@ class Session:
 		frappe.db.sql("""insert into `tabSessions`
 			(`sessiondata`, `user`, `lastupdate`, `sid`, `status`, `device`)
 			values (%s , %s, NOW(), %s, 'Active', %s)""",
-				(str(self.data['data']), self.data['user'], self.data['sid'], self.device))
+				(dump_session_data(self.data['data']), self.data['user'], self.data['sid'], self.device))
 
 		# also add to memcache
-		frappe.cache().hset("session", self.data.sid, self.data)
+		self.last_db_update = frappe.utils.now()
+		self.cache_session()
+
+	def cache_session(self):
+		"""Store the session in its own cache key, expiring along with the session"""
+		frappe.cache().set_value(get_session_cache_key(self.data.sid), frappe._dict({
+				"data": self.data.data,
+				"last_db_update": self.last_db_update
+			}), expires_in_sec=get_expiry_in_seconds(self.data.data.session_expiry, self.device))
 
 	def resume(self):
 		"""non-login request: load a session"""
@@ -290,22 +321,13 @@ class Session:
 		return data
 
 	def get_session_data_from_cache(self):
-		data = frappe.cache().hget("session", self.sid)
-		if data:
-			data = frappe._dict(data)
-			session_data = data.get("data", {})
-
-			# set user for correct timezone
-			self.time_diff = frappe.utils.time_diff_in_seconds(frappe.utils.now(),
-				session_data.get("last_updated"))
-			expiry = get_expiry_in_seconds(session_data.get("session_expiry"))
-
-			if self.time_diff > expiry:
-				print('deleting...')
-				self.delete_session()
-				data = None
+		# expired sessions are removed by redis
+		data = frappe.cache().get_value(get_session_cache_key(self.sid), expires=True)
+		if not data:
+			return None
 
-		return data and data.data
+		self.last_db_update = data.get("last_db_update")
+		return frappe._dict(data.get("data"))
 
 	def get_session_data_from_db(self):
 		self.device = frappe.db.sql('SELECT `device` FROM `tabSessions` WHERE `sid`=%s', self.sid)
@@ -318,7 +340,7 @@ class Session:
 			""", (self.sid, get_expiry_period_for_query(self.device)))
 
 		if rec:
-			data = frappe._dict(eval(rec and rec[0][1] or '{}'))
+			data = load_session_data(rec[0][1])
 			data.user = rec[0][0]
 		else:
 			self.delete_session()
@@ -345,15 +367,15 @@ class Session:
 		self.data['data']['lang'] = text_type(frappe.lang)
 
 		# update session in db
-		last_updated = frappe.cache().hget("last_db_session_update", self.sid)
-		time_diff = frappe.utils.time_diff_in_seconds(now, last_updated) if last_updated else None
+		time_diff = frappe.utils.time_diff_in_seconds(now, self.last_db_update) \
+			if self.last_db_update else None
 
 		# database persistence is secondary, don't update it too often
 		updated_in_db = False
-		if force or (time_diff==None) or (time_diff > 600):
+		if force or (time_diff==None) or (time_diff > get_db_update_interval()):
 			# update sessions table
 			frappe.db.sql("""update `tabSessions` set sessiondata=%s,
-				lastupdate=NOW() where sid=%s""" , (str(self.data['data']),
+				lastupdate=NOW() where sid=%s""" , (dump_session_data(self.data['data']),
 				self.data['sid']))
 
 			# update last active in user table
@@ -363,15 +385,35 @@ class Session:
 			})
 
 			frappe.db.commit()
-			frappe.cache().hset("last_db_session_update", self.sid, now)
+			self.last_db_update = now
 
 			updated_in_db = True
 
-		# set in memcache
-		frappe.cache().hset("session", self.sid, self.data)
+		# set in memcache, this also extends its expiry
+		self.cache_session()
 
 		return updated_in_db
 
+def get_session_cache_key(sid):
+	return "session:{0}".format(sid)
+
+def get_db_update_interval():
+	return cint(frappe.conf.get("session_db_update_interval")) or default_db_update_interval
+
+def dump_session_data(data):
+	return json.dumps(data, default=str)
+
+def load_session_data(sessiondata):
+	"""Returns session data stored in the sessions table. Sessions saved by older
+	versions are python literals instead of JSON."""
+	if not sessiondata:
+		return frappe._dict()
+
+	try:
+		return frappe._dict(json.loads(sessiondata))
+	except ValueError:
+		return frappe._dict(ast.literal_eval(sessiondata))
+
 def get_expiry_period_for_query(device=None):
 	if frappe.db.db_type == 'postgres':
 		return get_expiry_period(device)
@@ -0,0 +1,53 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+
+import frappe
+from frappe.boot import load_boot_sections, clear_boot_cache, clear_boot_section, get_bootinfo
+
+class TestBootSections(unittest.TestCase):
+	def setUp(self):
+		frappe.set_user("Administrator")
+		clear_boot_cache()
+
+	def test_sections_are_cached(self):
+		bootinfo, sections, rebuilt = load_boot_sections()
+		self.assertTrue(rebuilt)
+		self.assertTrue(bootinfo.user)
+		self.assertTrue(bootinfo.letter_heads is not None)
+
+		frappe.local.cache = {}
+		_bootinfo, _sections, rebuilt = load_boot_sections()
+		self.assertEqual(rebuilt, [])
+		self.assertEqual(dict((name, entry["hash"]) for name, entry in sections.items()),
+			dict((name, entry["hash"]) for name, entry in _sections.items()))
+
+	def test_clear_user_sections(self):
+		load_boot_sections()
+		clear_boot_cache("Administrator")
+
+		frappe.local.cache = {}
+		bootinfo, sections, rebuilt = load_boot_sections()
+		self.assertIn("user", rebuilt)
+		self.assertNotIn("site", rebuilt)
+
+	def test_unchanged_content_keeps_hash(self):
+		hashes = get_bootinfo().boot_hashes
+		clear_boot_section("site")
+
+		frappe.local.cache = {}
+		bootinfo = get_bootinfo()
+		self.assertFalse(bootinfo.from_cache)
+		self.assertEqual(bootinfo.boot_hashes["site"], hashes["site"])
+
+	def test_boot_session_rebuilt_with_other_sections(self):
+		load_boot_sections()
+		clear_boot_section("desk")
+
+		frappe.local.cache = {}
+		bootinfo, sections, rebuilt = load_boot_sections()
+		self.assertIn("desk", rebuilt)
+		self.assertIn("boot_session", rebuilt)
+		self.assertNotIn("user", rebuilt)
@@ -32,6 +32,51 @@ class TestDB(unittest.TestCase):
 		limit = frappe.db.get_single_value('System Settings', 'backup_limit')
 		self.assertEqual(limit, 5)
 
+	def test_sql_iter(self):
+		query = "select name, module from tabDocType order by name"
+		expected = frappe.db.sql(query, as_dict=True)
+
+		self.assertEqual(list(frappe.db.sql_iter(query, as_dict=True, chunk_size=7)), expected)
+		self.assertEqual([list(row) for row in frappe.db.sql_iter(query)],
+			[[d.name, d.module] for d in expected])
+
+		chunks = list(frappe.db.sql_iter(query, as_list=True, chunk_size=7, as_chunks=True))
+		self.assertTrue(all(len(chunk) <= 7 for chunk in chunks))
+		self.assertEqual(sum(chunks, []), [[d.name, d.module] for d in expected])
+
+		# other queries can be run while iterating
+		for row in frappe.db.sql_iter("select name from tabDocType where module=%s", "Core", as_dict=True):
+			self.assertEqual(frappe.db.get_value("DocType", row.name, "module"), "Core")
+
+		# stopping early
+		rows = frappe.get_all("DocType", fields=["name"], order_by="name", as_iterator=True)
+		self.assertEqual(next(rows).name, expected[0].name)
+		rows.close()
+
+	def test_sql_iter_sees_uncommitted_writes(self):
+		todo = frappe.get_doc(dict(doctype='ToDo', description='test sql_iter')).insert()
+		rows = frappe.get_all('ToDo', filters={'description': 'test sql_iter'}, as_iterator=True)
+		self.assertIn(todo.name, [row.name for row in rows])
+
+		frappe.db.rollback()
+
+	def test_query_rewrite_cache(self):
+		from frappe.database.query_cache import get_query_cache
+
+		cache = get_query_cache(frappe.db.db_type + "_rewrite")
+		query = "select ifnull(description, '') from tabToDo where name=%s and IFNULL(status, '')!='Closed'"
+		rewritten = frappe.db.rewrite_query(query)
+
+		self.assertNotIn('ifnull', rewritten.lower())
+		self.assertEqual(rewritten.lower().count('coalesce('), 2)
+
+		hits = cache.hits
+		self.assertEqual(frappe.db.rewrite_query(query), rewritten)
+		self.assertEqual(cache.hits, hits + 1)
+
+		frappe.db.sql(query, "_Test ToDo")
+		self.assertEqual(cache.hits, hits + 2)
+
 	def test_log_touched_tables(self):
 		frappe.flags.in_migrate = True
 		frappe.flags.touched_tables = set()
@@ -5,7 +5,7 @@ from __future__ import unicode_literals
 import frappe, unittest
 
 from frappe.model.db_query import DatabaseQuery
-from frappe.desk.reportview import get_filters_cond
+from frappe.desk.reportview import get_filters_cond, get_export_rows
 
 from frappe.permissions import add_user_permission, clear_user_permissions_for_doctype
 
@@ -347,6 +347,23 @@ class TestReportview(unittest.TestCase):
 			limit=50,
 		)
 
+	def test_export_rows(self):
+		fields = ['`tabDocType`.`name`', '`tabDocType`.`module`']
+		filters = {'module': 'Core'}
+		names = [d.name for d in frappe.get_all('DocType', filters=filters, order_by='name asc')]
+
+		rows = list(get_export_rows('DocType', dict(fields=fields, filters=filters,
+			order_by='`tabDocType`.`name` asc')))
+
+		self.assertEqual(rows[0], ['Sr', 'Name', 'Module'])
+		self.assertEqual([row[1] for row in rows[1:]], names)
+		self.assertEqual([row[0] for row in rows[1:]], list(range(1, len(names) + 1)))
+
+		# start and page length are respected
+		rows = list(get_export_rows('DocType', dict(fields=fields, filters=filters,
+			order_by='`tabDocType`.`name` asc', start=2, page_length=5)))
+		self.assertEqual([row[1] for row in rows[1:]], names[2:7])
+
 def create_event(subject="_Test Event", starts_on=None):
 	""" create a test event """
 
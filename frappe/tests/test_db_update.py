@@ -33,6 +33,33 @@ class TestDBUpdate(unittest.TestCase):
 			self.assertEqual(fieldtype, table_column.type)
 			self.assertIn(table_column.default or 'NULL', [default, "'{}'".format(default)])
 
+	def test_alter_plan(self):
+		if frappe.db.db_type != 'mariadb':
+			return
+
+		from frappe.database.mariadb.schema import MariaDBTable, AlterPlan, INPLACE, COPY
+
+		frappe.reload_doctype('User', force=True)
+		table = MariaDBTable('User')
+		table.validate()
+		self.assertEqual(table.get_alter_plan().changes, [])
+
+		# changes are not added again when the plan is built again
+		table.current_columns['middle_name']['type'] = 'varchar(100)'
+		self.assertEqual(len(table.get_alter_plan().changes), 1)
+		self.assertEqual(len(table.get_alter_plan().changes), 1)
+
+		plan = AlterPlan('tabUser')
+		plan.add('add_index', 'ADD INDEX `bio`(`bio`)', 'bio')
+		plan.add('change_type', 'MODIFY `middle_name` varchar(200)', 'middle_name', current_type='varchar(140)')
+		self.assertEqual(plan.algorithm, INPLACE)
+		self.assertEqual(plan.get_query(INPLACE), 'ALTER TABLE `tabUser` ADD INDEX `bio`(`bio`), '
+			'MODIFY `middle_name` varchar(200), ALGORITHM=INPLACE, LOCK=NONE')
+
+		plan.add('change_type', 'MODIFY `bio` int(11)', 'bio', current_type='text')
+		self.assertEqual(plan.algorithm, COPY)
+		self.assertTrue(plan.describe().startswith('tabUser: 3 change(s), COPY'))
+
 def get_fieldtype_from_def(field_def):
 	fieldtuple = frappe.db.type_map.get(field_def.fieldtype, ('', 0))
 	fieldtype = fieldtuple[0]
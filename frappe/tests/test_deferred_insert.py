@@ -0,0 +1,26 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+import frappe
+from frappe.deferred_insert import deferred_insert, save_to_db, dead_letter_prefix
+
+class TestDeferredInsert(unittest.TestCase):
+	def setUp(self):
+		frappe.cache().hdel('deferred_insert_last_flush', 'Route History')
+		frappe.cache().delete_value(dead_letter_prefix + 'Route History')
+
+	def test_deferred_insert(self):
+		route = '_test/deferred/insert'
+		deferred_insert('Route History', [{'user': 'Administrator', 'route': route} for i in range(3)])
+
+		# record with an invalid link is parked in the dead letter queue
+		deferred_insert('Route History', [{'user': '_test_missing_user', 'route': route}])
+
+		save_to_db()
+
+		self.assertEqual(frappe.db.count('Route History', {'route': route}), 3)
+		self.assertEqual(frappe.cache().llen(dead_letter_prefix + 'Route History'), 1)
+
+		frappe.db.sql('delete from `tabRoute History` where route=%s', route)
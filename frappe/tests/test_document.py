@@ -125,6 +125,32 @@ class TestDocument(unittest.TestCase):
 
 		self.assertEqual(frappe.db.get_value("User", d.name), d.name)
 
+	def test_link_validation_across_children(self):
+		from frappe.model.base_document import get_link_values, get_link_key
+
+		d = frappe.get_doc({
+			"doctype": "Event",
+			"subject": "test-doc-link-validation",
+			"starts_on": "2014-01-01",
+			"event_type": "Public",
+			"event_participants": [
+				{"reference_doctype": "User", "reference_docname": "Administrator"},
+				{"reference_doctype": "User", "reference_docname": "Guest"},
+				{"reference_doctype": "Role", "reference_docname": "system manager"}
+			]
+		})
+
+		link_values = get_link_values([d] + d.get_all_children())
+		self.assertTrue(get_link_key("User", "Guest") in link_values)
+
+		d.insert()
+
+		# case of the original name is preserved
+		self.assertEqual(d.event_participants[2].reference_docname, "System Manager")
+
+		d.append("event_participants", {"reference_doctype": "User", "reference_docname": "_Test Missing User"})
+		self.assertRaises(frappe.LinkValidationError, d.save)
+
 	def test_validate(self):
 		d = self.test_insert()
 		d.starts_on = "2014-01-01"
@@ -236,3 +262,83 @@ class TestDocument(unittest.TestCase):
 			new_current = cint(frappe.db.get_value('Series', prefix, "current", order_by="name"))
 
 			self.assertEqual(cint(old_current) - 1, new_current)
+
+	def test_bulk_insert(self):
+		docs = [frappe.get_doc({
+			"doctype": "Event",
+			"subject": "test-doc-bulk-insert {0}".format(i),
+			"starts_on": "2014-01-01",
+			"event_type": "Public",
+			"event_participants": [{"reference_doctype": "User", "reference_docname": "Administrator"}]
+		}) for i in range(5)]
+
+		frappe.insert_many(docs)
+
+		for d in docs:
+			self.assertFalse(d.is_new())
+			self.assertEqual(frappe.db.get_value("Event", d.name, "subject"), d.subject)
+			self.assertEqual(frappe.db.count("Event Participants", {"parent": d.name}), 1)
+
+	def test_cached_doc_invalidation(self):
+		d = self.test_insert()
+		cached = frappe.get_cached_doc("Event", d.name)
+		self.assertEqual(cached.subject, d.subject)
+
+		# process cache is used once the request cache is cleared, each request
+		# gets its own document
+		frappe.local.document_cache = {}
+		from_process_cache = frappe.get_cached_doc("Event", d.name)
+		self.assertFalse(from_process_cache is cached)
+		self.assertEqual(from_process_cache.as_dict(), cached.as_dict())
+
+		from_process_cache.subject = "changed in one request"
+		frappe.local.document_cache = {}
+		self.assertEqual(frappe.get_cached_doc("Event", d.name).subject, d.subject)
+
+		d.subject = "subject changed for cache"
+		d.save()
+
+		frappe.local.document_cache = {}
+		self.assertEqual(frappe.get_cached_doc("Event", d.name).subject, "subject changed for cache")
+
+	def test_get_docs(self):
+		names = [frappe.get_doc({
+			"doctype": "Event",
+			"subject": "test-get-docs {0}".format(i),
+			"starts_on": "2014-01-01",
+			"event_type": "Public",
+			"event_participants": [{"reference_doctype": "User", "reference_docname": "Administrator"}] * i
+		}).insert().name for i in range(3)]
+
+		docs = frappe.get_docs("Event", reversed(names))
+		self.assertEqual([d.name for d in docs], list(reversed(names)))
+
+		for d in docs:
+			doc = frappe.get_doc("Event", d.name)
+			self.assertEqual(d.subject, doc.subject)
+			self.assertEqual(d.as_dict(), doc.as_dict())
+			self.assertTrue(all(p.parent_doc is d for p in d.event_participants))
+
+		self.assertRaises(frappe.DoesNotExistError, frappe.get_docs, "Event", ["_does_not_exist_"])
+
+	def test_get_docs_with_controller_init(self):
+		import frappe.model.document
+		from frappe.desk.doctype.todo.todo import ToDo
+
+		class ToDoWithInit(ToDo):
+			def __init__(self, *args, **kwargs):
+				super(ToDoWithInit, self).__init__(*args, **kwargs)
+				self.status_updater = ["_test"]
+
+		name = frappe.get_doc(dict(doctype="ToDo", description="test get_docs controller")).insert().name
+
+		get_controller = frappe.model.document.get_controller
+		frappe.model.document.get_controller = lambda doctype: ToDoWithInit
+		try:
+			doc = frappe.model.document.get_docs("ToDo", [name])[0]
+		finally:
+			frappe.model.document.get_controller = get_controller
+
+		self.assertTrue(isinstance(doc, ToDoWithInit))
+		self.assertEqual(doc.status_updater, ["_test"])
+		self.assertEqual(doc.as_dict(), frappe.get_doc("ToDo", name).as_dict())
@@ -54,6 +54,35 @@ class TestEmail(unittest.TestCase):
 		self.assertEqual(len(queue_recipients), 2)
 		self.assertTrue('Unsubscribe' in frappe.safe_decode(frappe.flags.sent_mail))
 
+	def test_claim_queue(self):
+		self.test_email_queue()
+		from frappe.email.queue import claim_queue, send_one
+		emails = claim_queue(10)
+		self.assertEqual(len(emails), 1)
+		self.assertEqual(frappe.db.get_value('Email Queue', emails[0].name, 'status'), 'Sending')
+
+		# claimed emails are not claimed again
+		self.assertEqual(claim_queue(10), [])
+
+		send_one(emails[0].name, auto_commit=False, claimed=True)
+		self.assertEqual(frappe.db.get_value('Email Queue', emails[0].name, 'status'), 'Sent')
+
+	def test_release_stale_claims(self):
+		self.test_email_queue()
+		from frappe.email.queue import claim_queue, release_stale_claims
+		from frappe.utils import add_to_date, now_datetime
+		emails = claim_queue(10)
+
+		# recently claimed
+		release_stale_claims(auto_commit=False)
+		self.assertEqual(frappe.db.get_value('Email Queue', emails[0].name, 'status'), 'Sending')
+
+		# claimed by a job that did not finish
+		frappe.db.set_value('Email Queue', emails[0].name, 'modified',
+			add_to_date(now_datetime(), hours=-1), update_modified=False)
+		release_stale_claims(auto_commit=False)
+		self.assertEqual(frappe.db.get_value('Email Queue', emails[0].name, 'status'), 'Not Sent')
+
 	def test_cc_header(self):
 		# test if sending with cc's makes it into header
 		frappe.sendmail(recipients=['test@example.com'],
@@ -191,3 +191,19 @@ class TestGlobalSearch(unittest.TestCase):
 		frappe.db.commit()
 		results = global_search.web_search('unsubscribe')
 		self.assertTrue('Unsubscribe' in results[0].content)
+
+	def test_sync_keeps_last_value(self):
+		def make_value(content):
+			return dict(doctype='Event', name='_Test Global Search Sync', content=content,
+				published=0, title='', route='')
+
+		frappe.cache().delete_value('global_search_queue')
+		for content in ('first', 'second', 'third'):
+			global_search.sync_value_in_queue(make_value(content))
+
+		global_search.sync_global_search()
+
+		content = frappe.db.sql('''select content from `__global_search`
+			where doctype=%s and name=%s''', ('Event', '_Test Global Search Sync'))
+		self.assertEqual(content[0][0], 'third')
+		self.assertEqual(frappe.cache().llen('global_search_queue'), 0)
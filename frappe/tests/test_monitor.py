@@ -8,26 +8,32 @@ import frappe
 import frappe.monitor
 from frappe.tests import set_request
 from frappe.utils.response import build_response
-from frappe.monitor import MONITOR_REDIS_KEY
+from frappe.monitor import MONITOR_REDIS_KEY, MONITOR_HISTOGRAM_KEY
 
 
 class TestMonitor(unittest.TestCase):
 	def setUp(self):
 		frappe.conf.monitor = 1
-		frappe.cache().delete_value(MONITOR_REDIS_KEY)
+		frappe.cache().delete_value([MONITOR_REDIS_KEY, MONITOR_HISTOGRAM_KEY])
 
 	def test_enable_monitor(self):
 		set_request(method="GET", path="/api/method/frappe.ping")
 		response = build_response("json")
 
 		frappe.monitor.start()
+		frappe.db.sql("select 1")
 		frappe.monitor.stop(response)
 
+		# requests are buffered in the process
+		self.assertEqual(frappe.cache().llen(MONITOR_REDIS_KEY), 0)
+		frappe.monitor.flush_buffer()
+
 		logs = frappe.cache().lrange(MONITOR_REDIS_KEY, 0, -1)
 		self.assertEqual(len(logs), 1)
 
 		log = frappe.parse_json(logs[0].decode())
 		self.assertTrue(log.duration)
+		self.assertTrue(log.sql["count"] >= 1)
 		self.assertTrue(log.site)
 		self.assertTrue(log.timestamp)
 		self.assertTrue(log.uuid)
@@ -54,6 +60,7 @@ class TestMonitor(unittest.TestCase):
 		response = build_response("json")
 		frappe.monitor.start()
 		frappe.monitor.stop(response)
+		frappe.monitor.flush_buffer()
 
 		open(frappe.monitor.log_file(), "w").close()
 		frappe.monitor.flush()
@@ -65,6 +72,43 @@ class TestMonitor(unittest.TestCase):
 		log = frappe.parse_json(logs[0])
 		self.assertEqual(log.transaction_type, "request")
 
+	def test_histogram(self):
+		set_request(method="GET", path="/api/method/frappe.ping")
+		response = build_response("json")
+		for i in range(3):
+			frappe.monitor.start()
+			frappe.monitor.stop(response)
+		frappe.monitor.flush_buffer()
+
+		histogram = frappe.monitor.get_histogram()["request:frappe.ping"]
+		self.assertEqual(histogram["count"], 3)
+		self.assertEqual(sum(histogram["buckets"].values()), 3)
+
+	def test_histogram_endpoints(self):
+		for path in ("/api/method/frappe.not_a_method", "/api/method/frappe.get_doc"):
+			set_request(method="GET", path=path)
+			response = build_response("json")
+			frappe.monitor.start()
+			frappe.monitor.stop(response)
+
+		set_request(method="GET", path="/random-page")
+		response = build_response("json")
+		response.status_code = 404
+		frappe.monitor.start()
+		frappe.monitor.stop(response)
+		frappe.monitor.flush_buffer()
+
+		# methods that are not whitelisted and unknown routes are not added as endpoints
+		histogram = frappe.monitor.get_histogram()
+		self.assertEqual(list(histogram), ["request:other"])
+		self.assertEqual(histogram["request:other"]["count"], 3)
+
+	def test_sample_rate(self):
+		frappe.conf.monitor_sample_rate = 0
+		frappe.monitor.start()
+		self.assertFalse(hasattr(frappe.local, "monitor"))
+
 	def tearDown(self):
 		frappe.conf.monitor = 0
-		frappe.cache().delete_value(MONITOR_REDIS_KEY)
+		frappe.conf.monitor_sample_rate = None
+		frappe.cache().delete_value([MONITOR_REDIS_KEY, MONITOR_HISTOGRAM_KEY])
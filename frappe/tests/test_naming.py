@@ -8,6 +8,8 @@ from frappe.utils import now_datetime
 
 from frappe.model.naming import getseries
 from frappe.model.naming import append_number_if_name_exists, revert_series_if_last
+from frappe.model.naming import make_autonames, reserve_series
+import frappe.model.naming
 
 class TestNaming(unittest.TestCase):
 	def tearDown(self):
@@ -94,3 +96,61 @@ class TestNaming(unittest.TestCase):
 
 		self.assertEqual(count.get('current'), 2)
 		frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+
+	def test_series_blocks(self):
+		series = 'TESTBLOCK-{}-'.format(frappe.generate_hash(length=6))
+		frappe.conf.naming_series_block_size = {'TESTBLOCK-': 10}
+		try:
+			self.assertEqual(getseries(series, 3), '001')
+			self.assertEqual(getseries(series, 3), '002')
+
+			# one block is reserved (and committed) for the process
+			current = frappe.db.sql("""SELECT current from `tabSeries` where name = %s""", series)[0][0]
+			self.assertEqual(current, 10)
+		finally:
+			frappe.conf.naming_series_block_size = None
+			frappe.model.naming._series_blocks.clear()
+			frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+			frappe.db.commit()
+
+	def test_series_blocks_keep_after_commit_jobs(self):
+		series = 'TESTBLOCK-{}-'.format(frappe.generate_hash(length=6))
+		frappe.conf.naming_series_block_size = {'TESTBLOCK-': 10}
+		frappe.flags.enqueue_after_commit = []
+		try:
+			frappe.enqueue('frappe.ping', enqueue_after_commit=True)
+			self.assertEqual(getseries(series, 3), '001')
+
+			# the block is committed without the hooks of the current transaction
+			self.assertEqual(len(frappe.flags.enqueue_after_commit), 1)
+		finally:
+			frappe.flags.enqueue_after_commit = []
+			frappe.conf.naming_series_block_size = None
+			frappe.model.naming._series_blocks.clear()
+			frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+			frappe.db.commit()
+
+	def test_series_blocks_with_locked_series(self):
+		series = 'TESTBLOCK-{}-'.format(frappe.generate_hash(length=6))
+		frappe.conf.naming_series_block_size = {'TESTBLOCK-': 10}
+		try:
+			# reserved (and committed) in a separate transaction
+			self.assertEqual(make_autonames(series + '.###', 2), [series + '001', series + '002'])
+
+			# the series row is locked by the current transaction, numbers are not
+			# reserved on a separate connection that would wait for the lock
+			self.assertEqual(reserve_series(series), 3)
+			self.assertEqual(getseries(series, 3), '004')
+		finally:
+			frappe.db.rollback()
+			frappe.conf.naming_series_block_size = None
+			frappe.model.naming._series_blocks.clear()
+			frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
+			frappe.db.commit()
+
+	def test_make_autonames(self):
+		series = 'TESTRANGE-{}-'.format(frappe.generate_hash(length=6))
+		names = make_autonames(series + '.###.-X', 3)
+		self.assertEqual(names, [series + '001-X', series + '002-X', series + '003-X'])
+		self.assertEqual(getseries(series, 3), '004')
+		frappe.db.sql("""delete from `tabSeries` where name = %s""", series)
@@ -6,7 +6,8 @@ from __future__ import unicode_literals
 import unittest
 
 import frappe
-from frappe.desk.query_report import build_xlsx_data
+from frappe.desk.query_report import (build_xlsx_data, get_columns_dict, get_match_checks,
+	has_match, get_existing_values)
 import frappe.utils
 
 
@@ -48,3 +49,24 @@ class TestQueryReport(unittest.TestCase):
 
 		for row in xlsx_data:
 			self.assertEqual(type(row), list)
+
+	def test_match_checks(self):
+		columns = ["Role:Link/Role:120", "Description::200"]
+		data = [["System Manager", "a"], ["Guest", "b"], ["guest", "c"], ["Not A Role", "d"]]
+		match_filters = {"Role": [{"Role": ["System Manager"]}]}
+
+		match_checks = get_match_checks(data, {"Role": 0}, match_filters, "ToDo", None,
+			get_columns_dict(columns), "Administrator")
+
+		# existing roles that are not allowed are denied, names that do not exist are allowed
+		self.assertEqual(match_checks, [(None, [[(0, frozenset(["Guest", "guest"]))]])])
+		self.assertEqual([row[1] for row in data if has_match(row, match_checks, "Administrator")], ["a", "d"])
+
+		# a set of user permissions that allows every row
+		match_filters["Role"].append({"Role": ["System Manager", "Guest", "guest"]})
+		self.assertEqual(get_match_checks(data, {"Role": 0}, match_filters, "ToDo", None,
+			get_columns_dict(columns), "Administrator"), [])
+
+	def test_existing_values(self):
+		self.assertEqual(get_existing_values("Role", ["Guest", "GUEST", "Not A Role"]),
+			frozenset(["Guest", "GUEST"]))
@@ -8,7 +8,7 @@ import unittest
 import frappe
 import time
 import frappe.rate_limiter
-from frappe.rate_limiter import RateLimiter
+from frappe.rate_limiter import RateLimiter, MethodRateLimiter
 from frappe.utils import cint
 from werkzeug.wrappers import Response
 
@@ -114,3 +114,51 @@ class TestRateLimiter(unittest.TestCase):
 		self.assertEqual(limiter.duration, cint(frappe.cache().get(limiter.key)))
 
 		frappe.cache().delete(limiter.key)
+
+	def test_previous_window_is_counted(self):
+		limiter = RateLimiter(0.01, 86400)
+		frappe.cache().set(limiter.previous_key, 100000000)
+
+		limiter = RateLimiter(0.01, 86400)
+		self.assertRaises(frappe.TooManyRequestsError, limiter.apply)
+
+		frappe.cache().delete(limiter.previous_key)
+
+	def test_scoped_counters(self):
+		limiter = RateLimiter(0.01, 86400, scope="user:test1@example.com")
+		time.sleep(0.01)
+		limiter.update()
+
+		self.assertRaises(frappe.TooManyRequestsError,
+			RateLimiter(0.01, 86400, scope="user:test1@example.com").apply)
+
+		other = RateLimiter(0.01, 86400, scope="user:test2@example.com")
+		self.assertEqual(other.apply(), None)
+
+		frappe.cache().delete(limiter.key)
+
+	def test_api_key_scope(self):
+		frappe.local.request_ip = "127.0.0.1"
+
+		# keys sent by the client are not trusted until authenticated
+		self.assertEqual(frappe.rate_limiter.get_scope("api_key"), "ip:127.0.0.1")
+
+		frappe.local.api_key = "test-api-key"
+		try:
+			self.assertEqual(frappe.rate_limiter.get_scope("api_key"), "api_key:test-api-key")
+		finally:
+			del frappe.local.api_key
+
+	def test_method_limit(self):
+		limiter = MethodRateLimiter(2, 86400, scope="method:test")
+		limiter.apply()
+		MethodRateLimiter(2, 86400, scope="method:test").apply()
+
+		self.assertEqual(cint(frappe.cache().get(limiter.key)), 2)
+		self.assertRaises(frappe.TooManyRequestsError,
+			MethodRateLimiter(2, 86400, scope="method:test").apply)
+
+		# rejected calls are not counted
+		self.assertEqual(cint(frappe.cache().get(limiter.key)), 2)
+
+		frappe.cache().delete(limiter.key)
@@ -0,0 +1,172 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import redis
+import unittest
+import frappe
+
+class TestRedisWrapper(unittest.TestCase):
+	def setUp(self):
+		frappe.local.cache = {}
+
+	def test_get_values(self):
+		cache = frappe.cache()
+		cache.set_value("_test_key_1", {"a": 1})
+		cache.set_value("_test_key_2", [1, 2])
+		cache.delete_value("_test_key_3")
+		frappe.local.cache = {}
+
+		values = cache.get_values(["_test_key_1", "_test_key_2", "_test_key_3"])
+		self.assertEqual(values, {"_test_key_1": {"a": 1}, "_test_key_2": [1, 2], "_test_key_3": None})
+
+		# missing values can still be generated
+		self.assertEqual(cache.get_value("_test_key_3", generator=lambda: "generated"), "generated")
+
+	def test_hget_many(self):
+		cache = frappe.cache()
+		cache.hset("_test_hash", "a", 1)
+		cache.hset("_test_hash", "b", 2)
+		frappe.local.cache = {}
+
+		self.assertEqual(cache.hget_many("_test_hash", ["a", "b", "c"]), {"a": 1, "b": 2, "c": None})
+
+	def test_pipeline_writes(self):
+		cache = frappe.cache()
+		with cache.pipeline_writes():
+			cache.set_value("_test_pipelined", "value")
+			cache.hset("_test_pipelined_hash", "key", "value")
+
+			# visible in the request while queued
+			self.assertEqual(cache.get_value("_test_pipelined"), "value")
+
+		frappe.local.cache = {}
+		self.assertEqual(cache.get_value("_test_pipelined"), "value")
+		self.assertEqual(cache.hget("_test_pipelined_hash", "key"), "value")
+
+	def test_pipeline_writes_deletes(self):
+		cache = frappe.cache()
+		cache.set_value("_test_pipelined", "value")
+		cache.hset("_test_pipelined_hash", "key", "value")
+		frappe.local.cache = {}
+
+		with cache.pipeline_writes():
+			cache.delete_value("_test_pipelined")
+			cache.hdel("_test_pipelined_hash", "key")
+
+			# not read back from redis before the deletes are sent
+			self.assertEqual(cache.get_value("_test_pipelined"), None)
+			self.assertEqual(cache.hget("_test_pipelined_hash", "key"), None)
+			self.assertEqual(cache.hget_many("_test_pipelined_hash", ["key"]), {"key": None})
+
+		frappe.local.cache = {}
+		self.assertEqual(cache.get_value("_test_pipelined"), None)
+		self.assertEqual(cache.hget("_test_pipelined_hash", "key"), None)
+
+	def test_pipeline_writes_on_exception(self):
+		cache = frappe.cache()
+		cache.set_value("_test_pipelined", "value")
+
+		with self.assertRaises(ZeroDivisionError):
+			with cache.pipeline_writes():
+				cache.delete_value("_test_pipelined")
+				1 / 0
+
+		frappe.local.cache = {}
+		self.assertEqual(cache.get_value("_test_pipelined"), None)
+
+	def test_serializer_roundtrip(self):
+		from frappe.utils import redis_serializer
+		import datetime
+
+		value = frappe._dict(name="x", modified=datetime.datetime(2020, 1, 1, 10, 0, 0, 5), items=[{"a": 1}, (1, 2)])
+		conf = frappe.local.conf
+		original = conf.get("cache_serializer"), conf.get("cache_compression_threshold")
+
+		try:
+			for serializer in ("pickle", "marshal", "msgpack"):
+				conf.cache_serializer, conf.cache_compression_threshold = serializer, 10
+				loaded = redis_serializer.loads(redis_serializer.dumps(value))
+				self.assertEqual(loaded, value)
+				self.assertTrue(isinstance(loaded, frappe._dict))
+		finally:
+			conf.cache_serializer, conf.cache_compression_threshold = original
+
+	def test_serializer_roundtrip_with_non_string_keys(self):
+		from frappe.utils import redis_serializer
+
+		value = {1: "a", (1, "b"): [2], 1.5: {2: None}}
+		conf = frappe.local.conf
+		original = conf.get("cache_serializer")
+
+		try:
+			for serializer in ("pickle", "marshal", "msgpack"):
+				conf.cache_serializer = serializer
+				self.assertEqual(redis_serializer.loads(redis_serializer.dumps(value)), value)
+		finally:
+			conf.cache_serializer = original
+
+	def test_key_index(self):
+		cache = frappe.cache()
+		cache.set_value("_test_indexed_1", 1, user="_test_index_user@example.com")
+		cache.set_value("_test_indexed_2", 2, user="_test_index_user@example.com")
+
+		keys = cache.get_keys("user:_test_index_user@example.com")
+		self.assertEqual(len(keys), 2)
+
+		cache.delete_keys("user:_test_index_user@example.com")
+		self.assertEqual(cache.get_keys("user:_test_index_user@example.com"), [])
+		self.assertEqual(cache.get_value("_test_indexed_1", user="_test_index_user@example.com"), None)
+
+	def test_key_index_rebuild(self):
+		cache = frappe.cache()
+		user = "_test_rebuild_user@example.com"
+		index = cache.get_key_index("user:" + user)
+		cache.delete_value(index, make_keys=False)
+
+		# written before keys were indexed
+		redis.Redis.set(cache, cache.make_key("_test_unindexed", user=user), "1")
+		self.assertEqual(len(cache.get_keys("user:" + user)), 1)
+
+		# index is kept up to date after it is built
+		cache.set_value("_test_indexed", 1, user=user)
+		self.assertEqual(len(cache.get_keys("user:" + user)), 2)
+
+		# keys that do not exist anymore are dropped from the index
+		redis.Redis.delete(cache, cache.make_key("_test_unindexed", user=user))
+		self.assertEqual(len(cache.get_keys("user:" + user)), 1)
+		self.assertEqual(len(redis.Redis.smembers(cache, index)), 2)
+
+		cache.delete_keys("user:" + user)
+		self.assertEqual(cache.get_keys("user:" + user), [])
+
+	def test_report_result_key_index(self):
+		cache = frappe.cache()
+		cache.set_value("report_result:_Test Report:1", 1, expires_in_sec=60)
+		cache.set_value("report_result:_Test Report:2", 2, expires_in_sec=60)
+		cache.set_value("report_result:_Test Report 2:1", 3, expires_in_sec=60)
+
+		index = cache.get_key_index("report_result:_Test Report:")
+		self.assertEqual(len(redis.Redis.smembers(cache, index)), 2)
+		self.assertTrue(redis.Redis.ttl(cache, index) > 0)
+
+		# keys of a report are found without scanning the keyspace
+		scan_iter = cache.scan_iter
+		cache.scan_iter = None
+		try:
+			cache.delete_keys("report_result:_Test Report:")
+		finally:
+			cache.scan_iter = scan_iter
+
+		self.assertEqual(cache.get_value("report_result:_Test Report:1", expires=True), None)
+		self.assertEqual(cache.get_value("report_result:_Test Report 2:1", expires=True), 3)
+		cache.delete_keys("report_result:_Test Report 2:")
+
+	def test_get_keys_without_index(self):
+		cache = frappe.cache()
+		cache.set_value("_test_scan_1", 1)
+		cache.set_value("_test_scan_2", 2)
+
+		self.assertEqual(len(cache.get_keys("_test_scan_")), 2)
+		cache.delete_keys("_test_scan_")
+		self.assertEqual(cache.get_keys("_test_scan_"), [])
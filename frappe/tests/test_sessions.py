@@ -0,0 +1,28 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+
+import frappe
+from frappe.sessions import (get_session_cache_key, dump_session_data, load_session_data,
+	delete_session)
+
+class TestSessions(unittest.TestCase):
+	def test_session_data_serialization(self):
+		data = frappe._dict(user="test@example.com", session_expiry="06:00:00", session_country=None)
+		self.assertEqual(load_session_data(dump_session_data(data)), data)
+
+		# stored by older versions
+		self.assertEqual(load_session_data(str(dict(data))), data)
+		self.assertEqual(load_session_data(None), {})
+
+	def test_session_cache_expiry(self):
+		key = get_session_cache_key("test-session-sid")
+		frappe.cache().set_value(key, {"data": {"user": "Administrator"}}, expires_in_sec=60)
+
+		_key = frappe.cache().make_key(key)
+		self.assertTrue(0 < frappe.cache().ttl(_key) <= 60)
+
+		delete_session("test-session-sid", user="Administrator")
+		self.assertIsNone(frappe.cache().get_value(key, expires=True))
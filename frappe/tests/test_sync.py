@@ -0,0 +1,55 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+from __future__ import unicode_literals
+
+import os
+import json
+import unittest
+
+import frappe
+from frappe.model.sync import (sync_for, get_manifest, update_manifest, clear_manifest,
+	get_import_groups, get_manifest_key, MAX_KEY_LENGTH)
+
+class TestSync(unittest.TestCase):
+	def test_manifest(self):
+		key = "test_sync_app/module/doctype/test/test.json"
+		update_manifest({key: json.dumps(["abc", "DocType", "Test", "2020-01-01 00:00:00"])})
+		self.assertEqual(get_manifest("test_sync_app"), {key: {"hash": "abc", "doctype": "DocType",
+			"name": "Test", "modified": "2020-01-01 00:00:00"}})
+
+		update_manifest({key: "def"})
+		self.assertEqual(get_manifest("test_sync_app")[key].hash, "def")
+
+		clear_manifest("test_sync_app")
+		self.assertEqual(get_manifest("test_sync_app"), {})
+
+	def test_unchanged_files_are_skipped(self):
+		sync_for("frappe")
+		stats = sync_for("frappe")
+		self.assertEqual(stats.imported, 0)
+		self.assertTrue(stats.files > 0)
+
+	def test_changed_documents_are_imported(self):
+		sync_for("frappe")
+		modified = frappe.db.get_value("Report", "Transaction Log Report", "modified")
+		frappe.db.set_value("Report", "Transaction Log Report", "modified", "2000-01-01 00:00:00",
+			update_modified=False)
+
+		stats = sync_for("frappe")
+		self.assertEqual(stats.imported, 1)
+		self.assertEqual(frappe.db.get_value("Report", "Transaction Log Report", "modified"), modified)
+
+	def test_long_manifest_key(self):
+		doc_path = frappe.get_app_path("frappe", "core", *(["x" * 50] * 4))
+		key = get_manifest_key("frappe", doc_path)
+		self.assertTrue(key.startswith("frappe/"))
+		self.assertTrue(len(key) <= MAX_KEY_LENGTH)
+
+	def test_import_groups(self):
+		core_path = frappe.get_app_path("frappe")
+		files = [os.path.join(core_path, "core", "report", "transaction_log_report", "transaction_log_report.json"),
+			os.path.join(core_path, "desk", "doctype", "note", "note.json"),
+			os.path.join(core_path, "core", "doctype", "docfield", "docfield.json")]
+
+		groups = get_import_groups("frappe", files)
+		self.assertEqual(groups, [([files[2]], False), ([files[1]], True), ([files[0]], True)])
@@ -0,0 +1,101 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""Write exports row by row into a temporary file instead of building them in memory.
+
+The file is either streamed back as the response (and removed once opened) or,
+for exports run as background jobs, attached to the user as a private File."""
+
+from __future__ import unicode_literals
+
+import os
+import io
+import csv
+import shutil
+import hashlib
+import tempfile
+
+import six
+import frappe
+from frappe import _
+from frappe.utils import get_url
+from frappe.utils.csvutils import UnicodeWriter
+from frappe.utils.xlsxutils import make_xlsx
+
+extensions = {"CSV": ".csv", "Excel": ".xlsx"}
+
+def write_export_file(rows, file_type, sheet_name, quoting=csv.QUOTE_NONNUMERIC):
+	"""Write `rows` (any iterable, e.g. a generator) into a temporary CSV or Excel
+	file and return its path"""
+	path = get_temp_file_path(file_type)
+	try:
+		if file_type == "Excel":
+			make_xlsx(rows, sheet_name, file=path)
+		else:
+			write_csv(rows, path, quoting=quoting)
+	except Exception:
+		os.remove(path)
+		raise
+
+	return path
+
+def write_csv(rows, path, quoting=csv.QUOTE_NONNUMERIC):
+	with open_csv_file(path) as f:
+		writer = UnicodeWriter(quoting=quoting, file=f)
+		for row in rows:
+			writer.writerow(row)
+
+def open_csv_file(path, mode="w"):
+	"""Open a file for use with the csv module (and `UnicodeWriter`)"""
+	if six.PY2:
+		return open(path, mode + "b")
+
+	return io.open(path, mode, encoding="utf-8", newline="")
+
+def get_temp_file_path(file_type="CSV"):
+	fd, path = tempfile.mkstemp(prefix="frappe-export-", suffix=extensions.get(file_type, ".csv"))
+	os.close(fd)
+	return path
+
+def get_export_filename(title, file_type):
+	return title + extensions.get(file_type, ".csv")
+
+def build_file_response(path, filename):
+	"""Set the response to stream the file at `path`. The file is removed after it is opened."""
+	frappe.response["type"] = "file_stream"
+	frappe.response["filepath"] = path
+	frappe.response["filename"] = filename
+
+def attach_export_file(path, filename, notify=True):
+	"""Move the file at `path` into private files and create a File for it.
+	If `notify` is set, the user is sent a link to download it."""
+	content_hash = get_file_hash(path)
+	file_name = "{0}-{1}".format(content_hash[-6:], filename.replace(" ", "_"))
+	shutil.move(path, frappe.get_site_path("private", "files", file_name))
+
+	_file = frappe.get_doc({
+		"doctype": "File",
+		"file_name": filename,
+		"file_url": "/private/files/" + file_name,
+		"is_private": 1,
+		"content_hash": content_hash,
+		"folder": "Home"
+	})
+	_file.flags.ignore_duplicate_entry_error = True
+	_file.insert(ignore_permissions=True)
+
+	if notify:
+		frappe.publish_realtime("msgprint",
+			_("Your export is ready: {0}").format('<a href="{0}">{1}</a>'.format(
+				get_url(_file.file_url), filename)),
+			user=frappe.session.user)
+
+	return _file
+
+def get_file_hash(path, chunk_size=1024 * 1024):
+	"""md5 of the file, same as `get_content_hash` without reading it all in memory"""
+	md5 = hashlib.md5() #nosec
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(chunk_size), b""):
+			md5.update(chunk)
+
+	return md5.hexdigest()
@@ -8,11 +8,15 @@ import re
 import redis
 import json
 import os
+import time
+from collections import OrderedDict
 from bs4 import BeautifulSoup
-from frappe.utils import cint, strip_html_tags
+from frappe.utils import cint, strip_html_tags, now
 from frappe.model.base_document import get_controller
 from six import text_type
 
+sync_batch_size = 1000
+
 def setup_global_search_table():
 	"""
 	Creates __global_search table
@@ -95,57 +99,80 @@ def rebuild_for_doctype(doctype):
 
 		return
 
-	# Delete records
+	# Delete records, committed so that the records below are read from the database
+	# as they are processed and not all at once (see `frappe.db.sql_iter`)
 	delete_global_search_records_for_doctype(doctype)
+	frappe.db.commit()
 
 	parent_search_fields = meta.get_global_search_fields()
 	fieldnames = get_selected_fields(meta, parent_search_fields)
 
-	# Get all records from parent doctype table
-	all_records = frappe.get_all(doctype, fields=fieldnames, filters=_get_filters())
-
-	# Children data
-	all_children, child_search_fields = get_children_data(doctype, meta)
-	all_contents = []
-
-	for doc in all_records:
-		content = []
-		for field in parent_search_fields:
-			value = doc.get(field.fieldname)
-			if value:
-				content.append(get_formatted_value(value, field))
-
-		# get children data
-		for child_doctype, records in all_children.get(doc.name, {}).items():
-			for field in child_search_fields.get(child_doctype):
-				for r in records:
-					if r.get(field.fieldname):
-						content.append(get_formatted_value(r.get(field.fieldname), field))
-
-		if content:
-			# if doctype published in website, push title, route etc.
-			published = 0
-			title, route = "", ""
-			try:
-				if hasattr(get_controller(doctype), "is_website_published") and meta.allow_guest_to_view:
-					d = frappe.get_doc(doctype, doc.name)
-					published = 1 if d.is_website_published() else 0
-					title = d.get_title()
-					route = d.get("route")
-			except ImportError:
-				# some doctypes has been deleted via future patch, hence controller does not exists
-				pass
-
-			all_contents.append({
-				"doctype": frappe.db.escape(doctype),
-				"name": frappe.db.escape(doc.name),
-				"content": frappe.db.escape(' ||| '.join(content or '')),
-				"published": published,
-				"title": frappe.db.escape(title or '')[:int(frappe.db.VARCHAR_LEN)],
-				"route": frappe.db.escape(route or '')[:int(frappe.db.VARCHAR_LEN)]
-			})
-	if all_contents:
-		insert_values_for_multiple_docs(all_contents)
+	# Get all records from parent doctype table, read as they are processed
+	all_records = frappe.get_all(doctype, fields=fieldnames, filters=_get_filters(), as_iterator=True)
+
+	child_search_fields = get_child_search_fields(meta)
+	batch = []
+
+	for records in get_chunks(all_records, sync_batch_size):
+		# Children data of this chunk
+		all_children = get_children_data(doctype, child_search_fields, [doc.name for doc in records])
+
+		for doc in records:
+			content = []
+			for field in parent_search_fields:
+				value = doc.get(field.fieldname)
+				if value:
+					content.append(get_formatted_value(value, field))
+
+			# get children data
+			for child_doctype, child_records in all_children.get(doc.name, {}).items():
+				for field in child_search_fields.get(child_doctype):
+					for r in child_records:
+						if r.get(field.fieldname):
+							content.append(get_formatted_value(r.get(field.fieldname), field))
+
+			if content:
+				# if doctype published in website, push title, route etc.
+				published = 0
+				title, route = "", ""
+				try:
+					if hasattr(get_controller(doctype), "is_website_published") and meta.allow_guest_to_view:
+						d = frappe.get_doc(doctype, doc.name)
+						published = 1 if d.is_website_published() else 0
+						title = d.get_title()
+						route = d.get("route")
+				except ImportError:
+					# some doctypes has been deleted via future patch, hence controller does not exists
+					pass
+
+				batch.append({
+					"doctype": doctype,
+					"name": doc.name,
+					"content": ' ||| '.join(content or ''),
+					"published": published,
+					"title": (title or '')[:int(frappe.db.VARCHAR_LEN)],
+					"route": (route or '')[:int(frappe.db.VARCHAR_LEN)]
+				})
+
+				if len(batch) >= sync_batch_size:
+					sync_values(batch)
+					batch = []
+
+	if batch:
+		sync_values(batch)
+
+
+def get_chunks(records, chunk_size):
+	"""Yield lists of upto `chunk_size` records of the iterable `records`"""
+	chunk = []
+	for record in records:
+		chunk.append(record)
+		if len(chunk) >= chunk_size:
+			yield chunk
+			chunk = []
+
+	if chunk:
+		yield chunk
 
 
 def delete_global_search_records_for_doctype(doctype):
@@ -167,9 +194,21 @@ def get_selected_fields(meta, global_search_fields):
 	return fieldnames
 
 
-def get_children_data(doctype, meta):
+def get_child_search_fields(meta):
+	"""Returns global search fields of child tables of a doctype by child doctype"""
+	child_search_fields = frappe._dict()
+
+	for child in meta.get_table_fields():
+		search_fields = frappe.get_meta(child.options).get_global_search_fields()
+		if search_fields:
+			child_search_fields.setdefault(child.options, search_fields)
+
+	return child_search_fields
+
+
+def get_children_data(doctype, child_search_fields, parents):
 	"""
-		Get all records from all the child tables of a doctype
+		Get records of the child tables of a doctype of the given parents
 
 		all_children = {
 			"parent1": {
@@ -184,45 +223,20 @@ def get_children_data(doctype, meta):
 
 	"""
 	all_children = frappe._dict()
-	child_search_fields = frappe._dict()
 
-	for child in meta.get_table_fields():
-		child_meta = frappe.get_meta(child.options)
-		search_fields = child_meta.get_global_search_fields()
-		if search_fields:
-			child_search_fields.setdefault(child.options, search_fields)
-			child_fieldnames = get_selected_fields(child_meta, search_fields)
-			child_records = frappe.get_all(child.options, fields=child_fieldnames, filters={
-				"docstatus": ["!=", 1],
-				"parenttype": doctype
-			})
-
-			for record in child_records:
-				all_children.setdefault(record.parent, frappe._dict())\
-					.setdefault(child.options, []).append(record)
-
-	return all_children, child_search_fields
-
-
-def insert_values_for_multiple_docs(all_contents):
-	values = []
-	for content in all_contents:
-		values.append("({doctype}, {name}, {content}, {published}, {title}, {route})"
-			.format(**content))
-
-	batch_size = 50000
-	for i in range(0, len(values), batch_size):
-		batch_values = values[i:i + batch_size]
-		# ignoring duplicate keys for doctype_name
-		frappe.db.multisql({
-			'mariadb': '''INSERT IGNORE INTO `__global_search`
-				(doctype, name, content, published, title, route)
-				VALUES {0} '''.format(", ".join(batch_values)),
-			'postgres': '''INSERT INTO `__global_search`
-				(doctype, name, content, published, title, route)
-				VALUES {0}
-				ON CONFLICT("name", "doctype") DO NOTHING'''.format(", ".join(batch_values))
-			})
+	for child_doctype, search_fields in child_search_fields.items():
+		child_fieldnames = get_selected_fields(frappe.get_meta(child_doctype), search_fields)
+		child_records = frappe.get_all(child_doctype, fields=child_fieldnames, filters={
+			"docstatus": ["!=", 1],
+			"parenttype": doctype,
+			"parent": ["in", parents]
+		})
+
+		for record in child_records:
+			all_children.setdefault(record.parent, frappe._dict())\
+				.setdefault(child_doctype, []).append(record)
+
+	return all_children
 
 
 def update_global_search(doc):
@@ -354,13 +368,42 @@ def get_formatted_value(value, field):
 def sync_global_search():
 	"""
 	Inserts / updates values from `global_search_queue` to __global_search.
+	Values are popped in batches, oldest first, and written with multi-row upserts.
 	This is called via job scheduler
 	:param flags:
 	:return:
 	"""
-	while frappe.cache().llen('global_search_queue') > 0:
-		value = json.loads(frappe.cache().lpop('global_search_queue').decode('utf-8'))
-		sync_value(value)
+	start = time.time()
+	synced = 0
+
+	while True:
+		values = pop_from_queue(sync_batch_size)
+		if not values:
+			break
+		synced += sync_values(values)
+
+	if synced:
+		duration = time.time() - start
+		frappe.cache().set_value('global_search_sync_stats', {
+			'synced': synced,
+			'duration': duration,
+			'rate': synced / duration if duration else synced,
+			'timestamp': now()
+		})
+
+def pop_from_queue(count):
+	"""
+	Remove and return upto `count` of the oldest values in `global_search_queue`
+	"""
+	key = frappe.cache().make_key('global_search_queue')
+
+	# values are pushed at the head, so the oldest ones are at the tail
+	pipeline = frappe.cache().pipeline()
+	pipeline.lrange(key, -count, -1)
+	pipeline.ltrim(key, 0, -count - 1)
+	values = pipeline.execute()[0]
+
+	return [json.loads(frappe.safe_decode(value)) for value in reversed(values)]
 
 def sync_value_in_queue(value):
 	try:
@@ -375,27 +418,48 @@ def sync_value(value):
 	Sync a given document to global search
 	:param value: dict of { doctype, name, content, published, title, route }
 	'''
+	sync_values([value])
+
+def sync_values(values):
+	'''
+	Sync values to global search with one upsert. If a document occurs
+	more than once, only its last value is written.
+	:param values: list of dicts of { doctype, name, content, published, title, route }
+	:return: number of documents synced
+	'''
+	latest = OrderedDict()
+	for value in values:
+		latest[(value['doctype'], value['name'])] = value
+
+	params = []
+	for value in latest.values():
+		params.extend([value['doctype'], value['name'], value['content'],
+			value['published'], value['title'], value['route']])
+
+	rows = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(latest))
 
 	frappe.db.multisql({
 		'mariadb': '''INSERT INTO `__global_search`
 			(`doctype`, `name`, `content`, `published`, `title`, `route`)
-			VALUES (%(doctype)s, %(name)s, %(content)s, %(published)s, %(title)s, %(route)s)
+			VALUES {0}
 			ON DUPLICATE key UPDATE
-				`content`=%(content)s,
-				`published`=%(published)s,
-				`title`=%(title)s,
-				`route`=%(route)s
-		''',
+				`content`=VALUES(`content`),
+				`published`=VALUES(`published`),
+				`title`=VALUES(`title`),
+				`route`=VALUES(`route`)
+		'''.format(rows),
 		'postgres': '''INSERT INTO `__global_search`
 			(`doctype`, `name`, `content`, `published`, `title`, `route`)
-			VALUES (%(doctype)s, %(name)s, %(content)s, %(published)s, %(title)s, %(route)s)
+			VALUES {0}
 			ON CONFLICT("doctype", "name") DO UPDATE SET
-				`content`=%(content)s,
-				`published`=%(published)s,
-				`title`=%(title)s,
-				`route`=%(route)s
-		'''
-	}, value)
+				`content`=EXCLUDED.`content`,
+				`published`=EXCLUDED.`published`,
+				`title`=EXCLUDED.`title`,
+				`route`=EXCLUDED.`route`
+		'''.format(rows)
+	}, params)
+
+	return len(latest)
 
 def delete_for_document(doc):
 	"""
@@ -0,0 +1,141 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""Per-process LRU caches that sit in front of Redis.
+
+Values stored here are shared by all requests served by a worker process.
+Invalidations are published on a Redis pub/sub channel and every process drains
+the channel (without blocking) before reading its local entries. If the
+subscription is lost, all local entries are dropped since messages may have been
+missed."""
+
+from __future__ import unicode_literals
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+import redis
+import frappe
+
+invalidation_channel = "process_cache_invalidation"
+default_maxsize = 1000
+
+_caches = {}
+_pubsub = None
+_pubsub_pid = None
+_lock = threading.RLock()
+
+class ProcessCache(object):
+	"""Size limited LRU cache. Keys are scoped by site."""
+	def __init__(self, name, maxsize=None):
+		self.name = name
+		self.maxsize = maxsize or default_maxsize
+		self.data = OrderedDict()
+
+	def get(self, key):
+		if not sync():
+			return None
+
+		key = (frappe.local.site, key)
+		with _lock:
+			value = self.data.pop(key, None)
+			if value is not None:
+				self.data[key] = value
+
+		return value
+
+	def set(self, key, value):
+		if not sync():
+			return
+
+		key = (frappe.local.site, key)
+		with _lock:
+			self.data.pop(key, None)
+			self.data[key] = value
+			while len(self.data) > self.maxsize:
+				self.data.popitem(last=False)
+
+	def delete(self, key, site=None):
+		with _lock:
+			self.data.pop((site or frappe.local.site, key), None)
+
+	def clear(self, site=None):
+		with _lock:
+			if site:
+				for key in [key for key in self.data if key[0]==site]:
+					del self.data[key]
+			else:
+				self.data.clear()
+
+def get_process_cache(name):
+	"""Returns the `ProcessCache` of the given name. Size can be set via `{name}_size`
+	in site config, e.g. `document_cache_size`."""
+	if name not in _caches:
+		with _lock:
+			if name not in _caches:
+				_caches[name] = ProcessCache(name, frappe.conf.get("{0}_size".format(name)))
+
+	return _caches[name]
+
+def invalidate(name, key=None):
+	"""Remove `key` (or all keys of the current site if `key` is None) from cache `name`
+	in all processes."""
+	cache = get_process_cache(name)
+	if key is None:
+		cache.clear(frappe.local.site)
+	else:
+		cache.delete(key)
+
+	try:
+		frappe.cache().publish(invalidation_channel,
+			json.dumps({"cache": name, "site": frappe.local.site, "key": key}))
+	except redis.exceptions.ConnectionError:
+		pass
+
+def sync():
+	"""Apply invalidations published by other processes.
+
+	Returns False if the pub/sub channel can not be reached, in which case the
+	process caches must not be used."""
+	global _pubsub, _pubsub_pid
+
+	try:
+		with _lock:
+			if not _pubsub or _pubsub_pid != os.getpid():
+				# new process or lost subscription, entries may be stale
+				clear_all()
+				_pubsub = frappe.cache().pubsub(ignore_subscribe_messages=True)
+				_pubsub.subscribe(invalidation_channel)
+				_pubsub_pid = os.getpid()
+
+			while True:
+				message = _pubsub.get_message()
+				if not message:
+					break
+				apply_message(message)
+
+	except redis.exceptions.ConnectionError:
+		_pubsub = None
+		clear_all()
+		return False
+
+	return True
+
+def apply_message(message):
+	if message.get("type") != "message":
+		return
+
+	data = json.loads(frappe.safe_decode(message["data"]))
+	cache = _caches.get(data.get("cache"))
+	if not cache:
+		return
+
+	if data.get("key") is None:
+		cache.clear(data.get("site"))
+	else:
+		cache.delete(data.get("key"), site=data.get("site"))
+
+def clear_all():
+	for cache in _caches.values():
+		cache.clear()
@@ -0,0 +1,153 @@
+# Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+"""
+Serialization of values stored in the redis cache.
+
+Set in site config:
+
+	"cache_serializer": "msgpack",  # "pickle" (default), "marshal" or "msgpack"
+	"cache_compression_threshold": 4096  # zlib compress payloads larger than this (bytes)
+
+Values written with the default settings are plain pickles, same as before.
+Other settings prefix a header (format version, serializer, compression) that
+`loads` understands along with plain pickles, so switch the setting only after
+all processes of the deployment run a version that can read it.
+
+`marshal` is used only for values made of built-in types (plain `dict`, `list`,
+strings, numbers), anything else is pickled. `msgpack` (optional dependency)
+also handles `frappe._dict`, tuples, dates and decimals, install it with
+`pip install frappe[msgpack]`.
+"""
+
+from __future__ import unicode_literals
+
+import zlib
+import marshal
+import datetime
+from decimal import Decimal
+
+import frappe
+from frappe.utils import cint
+from six import text_type, binary_type, integer_types
+from six.moves import cPickle as pickle
+
+try:
+	import msgpack
+except ImportError:
+	msgpack = None
+
+MAGIC = b"\xfe\x01"
+PICKLE, MARSHAL, MSGPACK = b"p", b"m", b"M"
+NO_COMPRESSION, ZLIB = b"-", b"z"
+
+plain_types = (text_type, binary_type, float, bool, type(None)) + integer_types
+
+def dumps(value):
+	serializer = frappe.conf.get("cache_serializer") or "pickle"
+	threshold = cint(frappe.conf.get("cache_compression_threshold"))
+
+	kind, data = PICKLE, None
+	if serializer == "marshal" and is_plain(value):
+		kind, data = MARSHAL, marshal.dumps(value)
+	elif serializer == "msgpack" and msgpack:
+		try:
+			kind, data = MSGPACK, pack(value)
+		except (TypeError, ValueError):
+			pass
+
+	if data is None:
+		data = pickle.dumps(value)
+
+	compression = NO_COMPRESSION
+	if threshold and len(data) > threshold:
+		data, compression = zlib.compress(data, 1), ZLIB
+
+	if kind == PICKLE and compression == NO_COMPRESSION:
+		return data
+
+	return MAGIC + kind + compression + data
+
+def loads(data):
+	if data[:2] != MAGIC:
+		return pickle.loads(data)
+
+	kind, compression, data = data[2:3], data[3:4], data[4:]
+	if compression == ZLIB:
+		data = zlib.decompress(data)
+
+	if kind == MARSHAL:
+		return marshal.loads(data)
+	elif kind == MSGPACK:
+		if not msgpack:
+			# written by a process with msgpack installed, treat as not cached
+			return None
+		return unpack(data)
+	else:
+		return pickle.loads(data)
+
+def is_plain(value):
+	value_type = type(value)
+	if value_type in plain_types:
+		return True
+	elif value_type is list:
+		return all(is_plain(v) for v in value)
+	elif value_type is dict:
+		return all(is_plain(k) and is_plain(v) for k, v in value.items())
+
+	return False
+
+# msgpack extension types
+EXT_DICT, EXT_TUPLE, EXT_DATETIME, EXT_DATE, EXT_TIME, EXT_TIMEDELTA, EXT_DECIMAL = range(1, 8)
+
+def encode_ext(value):
+	if getattr(value, "tzinfo", None):
+		# pickle timezone aware values
+		raise TypeError("Cannot serialize {0} with timezone".format(type(value)))
+
+	if isinstance(value, frappe._dict):
+		return msgpack.ExtType(EXT_DICT, pack(dict(value)))
+	elif isinstance(value, tuple):
+		return msgpack.ExtType(EXT_TUPLE, pack(list(value)))
+	elif isinstance(value, datetime.datetime):
+		return msgpack.ExtType(EXT_DATETIME, pack(value.isoformat()))
+	elif isinstance(value, datetime.date):
+		return msgpack.ExtType(EXT_DATE, pack(value.isoformat()))
+	elif isinstance(value, datetime.time):
+		return msgpack.ExtType(EXT_TIME, pack(value.isoformat()))
+	elif isinstance(value, datetime.timedelta):
+		return msgpack.ExtType(EXT_TIMEDELTA, pack(value.total_seconds()))
+	elif isinstance(value, Decimal):
+		return msgpack.ExtType(EXT_DECIMAL, pack(text_type(value)))
+
+	raise TypeError("Cannot serialize {0}".format(type(value)))
+
+def decode_ext(code, data):
+	value = unpack(data)
+	if code == EXT_DICT:
+		return frappe._dict(value)
+	elif code == EXT_TUPLE:
+		return tuple(value)
+	elif code == EXT_DATETIME:
+		return parse_isoformat(value, "%Y-%m-%dT%H:%M:%S")
+	elif code == EXT_DATE:
+		return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+	elif code == EXT_TIME:
+		return parse_isoformat(value, "%H:%M:%S").time()
+	elif code == EXT_TIMEDELTA:
+		return datetime.timedelta(seconds=value)
+	elif code == EXT_DECIMAL:
+		return Decimal(value)
+
+	return msgpack.ExtType(code, data)
+
+def pack(value):
+	return msgpack.packb(value, use_bin_type=True, strict_types=True, default=encode_ext)
+
+def unpack(data):
+	# keys of dicts may be numbers or tuples, not only strings
+	return msgpack.unpackb(data, raw=False, strict_map_key=False, ext_hook=decode_ext)
+
+def parse_isoformat(value, format):
+	if "." in value:
+		format += ".%f"
+	return datetime.datetime.strptime(value, format)
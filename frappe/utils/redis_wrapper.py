@@ -2,12 +2,25 @@
 # MIT License. See license.txt
 from __future__ import unicode_literals
 
-import redis, frappe, re
-from six.moves import cPickle as pickle
+import redis, frappe, re, time
+from contextlib import contextmanager
 from frappe.utils import cstr
+from frappe.utils import redis_serializer
 from six import iteritems
 
 
+# keys starting with these are tracked in per-prefix sets, so that they can be
+# listed without scanning the keyspace. "user:" keys are tracked per user and
+# "report_result:" keys (see frappe.desk.report_cache) per report.
+indexed_prefixes = ("user:", "insert_queue_for_", "report_result:")
+
+# indexed prefixes of keys that may have been written before they were indexed,
+# their indexes are built with `SCAN` when they are first read
+scanned_prefixes = ("user:", "insert_queue_for_")
+
+# member of key index sets that have been built from all existing keys
+index_built_marker = b"__index_built__"
+
 class RedisWrapper(redis.Redis):
 	"""Redis client that will automatically prefix conf.db_name"""
 	def connected(self):
@@ -17,6 +30,17 @@ class RedisWrapper(redis.Redis):
 		except redis.exceptions.ConnectionError:
 			return False
 
+	def execute_command(self, *args, **options):
+		monitor = getattr(frappe.local, "monitor", None)
+		if not monitor:
+			return super(RedisWrapper, self).execute_command(*args, **options)
+
+		start = time.time()
+		try:
+			return super(RedisWrapper, self).execute_command(*args, **options)
+		finally:
+			monitor.add_redis_time(time.time() - start)
+
 	def make_key(self, key, user=None, shared=False):
 		if shared:
 			return key
@@ -43,9 +67,10 @@ class RedisWrapper(redis.Redis):
 
 		try:
 			if expires_in_sec:
-				self.setex(key, pickle.dumps(val), expires_in_sec)
+				self.write("setex", key, redis_serializer.dumps(val), expires_in_sec)
 			else:
-				self.set(key, pickle.dumps(val))
+				self.write("set", key, redis_serializer.dumps(val))
+			self.add_to_key_index(key, expires_in_sec)
 
 		except redis.exceptions.ConnectionError:
 			return None
@@ -63,6 +88,10 @@ class RedisWrapper(redis.Redis):
 
 		if key in frappe.local.cache:
 			val = frappe.local.cache[key]
+			if val is None and generator and self.in_pipeline():
+				# deleted in `pipeline_writes`
+				val = generator()
+				self.set_value(original_key, val, user=user)
 
 		else:
 			val = None
@@ -72,7 +101,7 @@ class RedisWrapper(redis.Redis):
 				pass
 
 			if val is not None:
-				val = pickle.loads(val)
+				val = redis_serializer.loads(val)
 
 			if not expires:
 				if val is None and generator:
@@ -84,6 +113,72 @@ class RedisWrapper(redis.Redis):
 
 		return val
 
+	def get_values(self, keys, user=None):
+		"""Returns a dict of cache values of `keys`. Values not in `frappe.local.cache`
+		are fetched from redis in one round trip.
+
+		:param keys: List of cache keys.
+		:param user: Prepends keys with User
+		"""
+		out = {}
+		to_fetch = []
+		for key in keys:
+			_key = self.make_key(key, user)
+			if _key in frappe.local.cache:
+				out[key] = frappe.local.cache[_key]
+			else:
+				to_fetch.append((key, _key))
+
+		if to_fetch:
+			try:
+				values = self.mget([_key for key, _key in to_fetch])
+			except redis.exceptions.ConnectionError:
+				values = [None] * len(to_fetch)
+
+			for (key, _key), value in zip(to_fetch, values):
+				if value is not None:
+					value = redis_serializer.loads(value)
+					frappe.local.cache[_key] = value
+				out[key] = value
+
+		return out
+
+	def in_pipeline(self):
+		return getattr(frappe.local, "cache_pipeline", None) is not None
+
+	def write(self, command, *args):
+		"""Run a write command directly or, inside `pipeline_writes`, queue it"""
+		pipeline = getattr(frappe.local, "cache_pipeline", None)
+		if pipeline is not None:
+			getattr(pipeline, command)(*args)
+		else:
+			getattr(super(RedisWrapper, self), command)(*args)
+
+	@contextmanager
+	def pipeline_writes(self):
+		"""Queue writes made via `set_value`, `hset`, `delete_value` and `hdel` in this
+		request and send them in one round trip on exit, also if the block raises.
+		Values written inside are read back from `frappe.local.cache`, deleted values
+		are kept there as `None` until the writes are sent.
+
+			with frappe.cache().pipeline_writes():
+				frappe.cache().hset("bootinfo", user, bootinfo)
+		"""
+		if self.in_pipeline():
+			# already batching
+			yield
+			return
+
+		frappe.local.cache_pipeline = self.pipeline(transaction=False)
+		try:
+			yield
+		finally:
+			pipeline, frappe.local.cache_pipeline = frappe.local.cache_pipeline, None
+			try:
+				pipeline.execute()
+			except redis.exceptions.ConnectionError:
+				pass
+
 	def get_all(self, key):
 		ret = {}
 		for k in self.get_keys(key):
@@ -92,15 +187,80 @@ class RedisWrapper(redis.Redis):
 		return ret
 
 	def get_keys(self, key):
-		"""Return keys starting with `key`."""
+		"""Return keys starting with `key`.
+
+		Keys of indexed prefixes are read from the index, others are found with
+		`SCAN`, which unlike `KEYS` does not block redis for the whole keyspace."""
+		index = self.get_key_index(key)
+		prefix = self.make_key(key)
+		key = self.make_key(key + "*")
+
 		try:
-			key = self.make_key(key + "*")
-			return self.keys(key)
+			if index:
+				return [k for k in self.get_indexed_keys(index) if k.startswith(prefix)]
+
+			return list(self.scan_iter(match=key, count=1000))
 
 		except redis.exceptions.ConnectionError:
 			regex = re.compile(cstr(key).replace("|", "\|").replace("*", "[\w]*"))
 			return [k for k in list(frappe.local.cache) if regex.match(k.decode())]
 
+	def get_indexed_keys(self, index):
+		"""Returns existing keys tracked in `index`.
+
+		An index of `scanned_prefixes` without the `index_built_marker` member is (re)built
+		with `SCAN`, so that keys written before they were indexed are found. Members of
+		keys that do not exist anymore (expired, or lists that were emptied) are removed."""
+		members = super(RedisWrapper, self).smembers(index)
+		prefix = cstr(index).split("key_index|", 1)[1]
+		if index_built_marker not in members and prefix.startswith(scanned_prefixes):
+			keys = list(self.scan_iter(match=self.make_key(prefix + "*"), count=1000))
+			super(RedisWrapper, self).sadd(index, index_built_marker, *keys)
+			return keys
+
+		members.discard(index_built_marker)
+		keys = list(members)
+		if not keys:
+			return keys
+
+		pipeline = self.pipeline(transaction=False)
+		for k in keys:
+			pipeline.exists(k)
+
+		existing, missing = [], []
+		for k, exists in zip(keys, pipeline.execute()):
+			(existing if exists else missing).append(k)
+
+		if missing:
+			super(RedisWrapper, self).srem(index, *missing)
+
+		return existing
+
+	def get_key_index(self, key):
+		"""Returns the name of the set that tracks keys starting with `key` (without
+		site prefix), if `key` belongs to an indexed prefix"""
+		key = cstr(key)
+		if key.startswith("user:"):
+			user = key.split(":", 2)[1]
+			return self.make_key("key_index|user:{0}:".format(user)) if user else None
+
+		if key.startswith("report_result:"):
+			report = key[len("report_result:"):].rpartition(":")[0]
+			return self.make_key("key_index|report_result:{0}:".format(report)) if report else None
+
+		for prefix in indexed_prefixes:
+			if key.startswith(prefix):
+				return self.make_key("key_index|" + prefix)
+
+	def add_to_key_index(self, _key, expires_in_sec=None):
+		"""Track `_key` (with site prefix) in its key index, if any"""
+		index = self.get_key_index(cstr(_key).split("|", 1)[-1])
+		if index:
+			self.write("sadd", index, _key)
+			if expires_in_sec and not cstr(index).split("key_index|", 1)[1].startswith(scanned_prefixes):
+				# indexes of expiring keys expire along with them
+				self.write("expire", index, expires_in_sec)
+
 	def delete_keys(self, key):
 		"""Delete keys with wildcard `*`."""
 		try:
@@ -116,23 +276,42 @@ class RedisWrapper(redis.Redis):
 		if not isinstance(keys, (list, tuple)):
 			keys = (keys, )
 
-		for key in keys:
-			if make_keys:
-				key = self.make_key(key, shared=shared)
+		if make_keys:
+			keys = [self.make_key(key, shared=shared) for key in keys]
 
-			if key in frappe.local.cache:
+		if not keys:
+			return
+
+		indexes = {}
+		in_pipeline = self.in_pipeline()
+		for key in keys:
+			if in_pipeline:
+				# until the delete is sent, redis still has the old value
+				frappe.local.cache[key] = None
+			elif key in frappe.local.cache:
 				del frappe.local.cache[key]
 
-			try:
-				self.delete(key)
-			except redis.exceptions.ConnectionError:
-				pass
+			if not shared:
+				index = self.get_key_index(cstr(key).split("|", 1)[-1])
+				if index:
+					indexes.setdefault(index, []).append(key)
+
+		try:
+			self.write("delete", *keys)
+			for index, indexed_keys in iteritems(indexes):
+				self.write("srem", index, *indexed_keys)
+		except redis.exceptions.ConnectionError:
+			pass
 
 	def lpush(self, key, value):
-		super(RedisWrapper, self).lpush(self.make_key(key), value)
+		key = self.make_key(key)
+		super(RedisWrapper, self).lpush(key, value)
+		self.add_to_key_index(key)
 
 	def rpush(self, key, value):
-		super(RedisWrapper, self).rpush(self.make_key(key), value)
+		key = self.make_key(key)
+		super(RedisWrapper, self).rpush(key, value)
+		self.add_to_key_index(key)
 
 	def lpop(self, key):
 		return super(RedisWrapper, self).lpop(self.make_key(key))
@@ -150,39 +329,51 @@ class RedisWrapper(redis.Redis):
 		_name = self.make_key(name, shared=shared)
 
 		# set in local
-		if not _name in frappe.local.cache:
+		if frappe.local.cache.get(_name) is None:
 			frappe.local.cache[_name] = {}
 		frappe.local.cache[_name][key] = value
 
 		# set in redis
 		try:
-			super(RedisWrapper, self).hset(_name,
-				key, pickle.dumps(value))
+			self.write("hset", _name, key, redis_serializer.dumps(value))
+			if not shared:
+				self.add_to_key_index(_name)
 		except redis.exceptions.ConnectionError:
 			pass
 
 	def hgetall(self, name):
-		return {key: pickle.loads(value) for key, value in
+		return {key: redis_serializer.loads(value) for key, value in
 			iteritems(super(RedisWrapper, self).hgetall(self.make_key(name)))}
 
 	def hget(self, name, key, generator=None, shared=False):
 		_name = self.make_key(name, shared=shared)
-		if not _name in frappe.local.cache:
-			frappe.local.cache[_name] = {}
-
-		if key in frappe.local.cache[_name]:
-			return frappe.local.cache[_name][key]
+		local_values = frappe.local.cache.get(_name)
 
 		value = None
-		try:
-			value = super(RedisWrapper, self).hget(_name, key)
-		except redis.exceptions.ConnectionError:
+		if local_values is None and _name in frappe.local.cache:
+			# hash deleted in `pipeline_writes`, not read from redis
 			pass
 
-		if value:
-			value = pickle.loads(value)
-			frappe.local.cache[_name][key] = value
-		elif generator:
+		elif local_values is not None and key in local_values:
+			value = local_values[key]
+			if value is not None or not generator or not self.in_pipeline():
+				return value
+
+		else:
+			if local_values is None:
+				local_values = frappe.local.cache[_name] = {}
+
+			try:
+				value = super(RedisWrapper, self).hget(_name, key)
+			except redis.exceptions.ConnectionError:
+				pass
+
+			if value:
+				value = redis_serializer.loads(value)
+				local_values[key] = value
+				return value
+
+		if generator:
 			value = generator()
 			try:
 				self.hset(name, key, value)
@@ -190,14 +381,47 @@ class RedisWrapper(redis.Redis):
 				pass
 		return value
 
+	def hget_many(self, name, keys, shared=False):
+		"""Returns a dict of values of `keys` in hash `name`. Keys not in
+		`frappe.local.cache` are fetched from redis in one round trip."""
+		_name = self.make_key(name, shared=shared)
+		if not _name in frappe.local.cache:
+			frappe.local.cache[_name] = {}
+
+		local_values = frappe.local.cache[_name]
+		if local_values is None:
+			# hash deleted in `pipeline_writes`
+			return {key: None for key in keys}
+
+		to_fetch = [key for key in keys if key not in local_values]
+
+		if to_fetch:
+			try:
+				values = super(RedisWrapper, self).hmget(_name, to_fetch)
+			except redis.exceptions.ConnectionError:
+				values = []
+
+			for key, value in zip(to_fetch, values):
+				if value:
+					local_values[key] = redis_serializer.loads(value)
+
+		return {key: local_values.get(key) for key in keys}
+
 	def hdel(self, name, key, shared=False):
 		_name = self.make_key(name, shared=shared)
 
-		if _name in frappe.local.cache:
+		if self.in_pipeline():
+			# until the delete is sent, redis still has the old value
+			if frappe.local.cache.get(_name) is not None:
+				frappe.local.cache[_name][key] = None
+			elif _name not in frappe.local.cache:
+				frappe.local.cache[_name] = {key: None}
+
+		elif frappe.local.cache.get(_name):
 			if key in frappe.local.cache[_name]:
 				del frappe.local.cache[_name][key]
 		try:
-			super(RedisWrapper, self).hdel(_name, key)
+			self.write("hdel", _name, key)
 		except redis.exceptions.ConnectionError:
 			pass
 
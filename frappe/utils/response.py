@@ -47,7 +47,8 @@ def build_response(response_type=None):
 		'pdf': as_pdf,
 		'page': as_page,
 		'redirect': redirect,
-		'binary': as_binary
+		'binary': as_binary,
+		'file_stream': as_file_stream
 	}
 
 	return response_type_map[frappe.response.get('type') or response_type]()
@@ -82,9 +83,13 @@ def as_json():
 		response.status_code = frappe.local.response['http_status_code']
 		del frappe.local.response['http_status_code']
 
+	if frappe.local.response.etag:
+		response.set_etag(frappe.local.response.pop('etag'))
+
 	response.mimetype = 'application/json'
 	response.charset = 'utf-8'
-	response.data = json.dumps(frappe.local.response, default=json_handler, separators=(',',':'))
+	if response.status_code != 304:
+		response.data = json.dumps(frappe.local.response, default=json_handler, separators=(',',':'))
 	return response
 
 def as_pdf():
@@ -102,6 +107,17 @@ def as_binary():
 	response.data = frappe.response['filecontent']
 	return response
 
+def as_file_stream():
+	'''Stream a (temporary) file from disk, it is removed once opened'''
+	filename = frappe.response['filename']
+	f = open(frappe.response['filepath'], 'rb')
+	os.remove(frappe.response['filepath'])
+
+	response = Response(wrap_file(frappe.local.request.environ, f), direct_passthrough=True)
+	response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+	response.headers["Content-Disposition"] = ("attachment; filename=\"%s\"" % filename.replace(' ', '_')).encode("utf-8")
+	return response
+
 def make_logs(response = None):
 	"""make strings for msgprint and errprint"""
 	if not response:
@@ -13,8 +13,8 @@ from openpyxl.utils import get_column_letter
 from six import BytesIO, string_types
 
 ILLEGAL_CHARACTERS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
-# return xlsx file object
-def make_xlsx(data, sheet_name, wb=None, column_widths=None):
+# return xlsx file object, if `file` (path or file object) is given the workbook is saved to it
+def make_xlsx(data, sheet_name, wb=None, column_widths=None, file=None):
 	column_widths = column_widths or []
 	if wb is None:
 		wb = openpyxl.Workbook(write_only=True)
@@ -44,7 +44,7 @@ def make_xlsx(data, sheet_name, wb=None, column_widths=None):
 
 		ws.append(clean_row)
 
-	xlsx_file = BytesIO()
+	xlsx_file = file or BytesIO()
 	wb.save(xlsx_file)
 	return xlsx_file
 
@@ -52,6 +52,10 @@ setup(
 	zip_safe=False,
 	include_package_data=True,
 	install_requires=install_requires,
+	extras_require={
+		# optional serializer of the redis cache, see frappe.utils.redis_serializer
+		'msgpack': ['msgpack>=0.6.1']
+	},
 	dependency_links=[
 		'https://github.com/frappe/python-pdfkit.git#egg=pdfkit'
 	],